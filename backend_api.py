@@ -1,12 +1,71 @@
-from fastapi import FastAPI, UploadFile, Form
-from fastapi.responses import JSONResponse, StreamingResponse
-import uvicorn
+from fastapi import FastAPI, UploadFile, Form, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
 import json
-from integrated1 import convert_to_markdown, extract_user_stories, rehighlight_in_word, stream_llm_response
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+import contextlib
+from integrated1 import (
+    ExtractionError,
+    convert_stream_to_markdown,
+    extraction_key,
+    iter_chunked_extraction,
+    parse_user_stories,
+    prepare_document,
+    stream_llm_response,
+)
+from chunking import split_markdown
+from result_cache import result_cache
+from debug_trace import DebugTrace
+from stream_json import StoryStreamParser
+from llm_client import get_llm_client
+from llm_scheduler import BATCH, INTERACTIVE, GenerationCancelled, RequestContext
+from metrics import PROMETHEUS_CONTENT_TYPE, RequestMetrics, registry
+from job_store import DONE, FINISHED, QUEUED, RUNNING, JobNotFoundError, JobStore
+from uploads import UPLOAD_CHUNK_SIZE, MaxUploadSizeMiddleware, hash_stream
+from worker_pool import JobLimiter, QueueFullError, iterate_blocking, run_blocking
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Load the model as soon as the server starts instead of on the first upload
+LLM_WARMUP = os.environ.get("LLM_WARMUP", "1") != "0"
+LLM_WARMUP_RETRY_SECONDS = float(os.environ.get("LLM_WARMUP_RETRY_SECONDS", "30"))
+# Jobs: thinking tokens are stored in batches at most this old; idle streams get a comment this often
+JOB_TOKEN_FLUSH_SECONDS = float(os.environ.get("JOB_TOKEN_FLUSH_SECONDS", "0.5"))
+JOB_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
+UPLOAD_SPOOL_BYTES = 1024 * 1024  # job uploads above this are kept in a temp file
+# How often a streaming request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "0.25"))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global job_store
+    # Opened here rather than at import, so importing the app creates no database file
+    job_store = await run_blocking(JobStore)
+    await run_blocking(job_store.recover)
+    client = get_llm_client()
+    warmup = asyncio.create_task(_warm_up(client)) if LLM_WARMUP else None
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    for task in list(_job_tasks):
+        task.cancel()
+    await asyncio.gather(*_job_tasks, return_exceptions=True)
+    job_store.close()
+
+
+async def _warm_up(client):
+    """Load the model, trying again in the background while Ollama is unreachable or failing."""
+    while not await run_blocking(client.warm_up):
+        await asyncio.sleep(LLM_WARMUP_RETRY_SECONDS)
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -19,32 +78,367 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MaxUploadSizeMiddleware)
+
+# Batch jobs have their own slots: an interactive request never waits behind them here,
+# and the LLM scheduler then gives it the model first
+job_limiter = JobLimiter()
+batch_limiter = JobLimiter()
+job_store = None  # JobStore, opened by lifespan
+_job_tasks = set()  # running job tasks, referenced so they are not garbage collected
+_jobs_changed = asyncio.Condition()  # notified whenever a job event is stored
+
+
+@app.get("/health")
+async def health():
+    # Not on the worker pool: health checks against a hung Ollama must not take the threads uploads need
+    report = await asyncio.to_thread(get_llm_client().health, LLM_WARMUP)
+    return JSONResponse(status_code=200 if report["status"] == "ok" else 503, content=report)
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 
 @app.post("/process-docx/")
-async def process_docx(file: UploadFile = None, text_content: str = Form(None)):
+async def process_docx(request: Request, file: UploadFile = None, text_content: str = Form(None),
+                       timing: bool = Form(False), priority: str = Form(INTERACTIVE)):
+    trace = DebugTrace(request_id=request.headers.get("x-request-id"))
+    try:
+        context = _request_context(request, priority)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    try:
+        _limiter(context).admit()
+    except QueueFullError as e:
+        return _busy_response(e)
+
     async def generate():
-        if file:
-            tmp_path = f"temp_{file.filename}"
-            with open(tmp_path, "wb") as f:
-                f.write(await file.read())
-            md_text, _ = convert_to_markdown(tmp_path)
-        elif text_content:
-            md_text = text_content
-        else:
-            yield "data: " + json.dumps({"error": "No input provided"}) + "\n\n"
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, context, trace))
+        try:
+            async for kind, payload in _process(file.file if file else None, file and file.filename,
+                                                text_content, trace, RequestMetrics(), context):
+                if kind == "timing" and not timing:
+                    continue
+                yield _legacy_message(kind, payload)
+        finally:
+            # Finished, or the client went away: nothing may keep generating for this request
+            context.cancel()
+            watcher.cancel()
+            if trace.enabled():
+                await run_blocking(trace.flush)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"X-Request-ID": trace.request_id},
+    )
+
+
+def _request_context(request, priority):
+    """Scheduling identity of a request: X-Client-ID header, else the client address."""
+    client_id = request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+    return RequestContext(client_id=client_id, priority=priority)
+
+
+async def _cancel_on_disconnect(request, context, trace):
+    """Cancel ``context`` as soon as the client disconnects, aborting its LLM generation."""
+    while not context.cancelled:
+        if await request.is_disconnected():
+            trace.event("client_disconnected")
+            context.cancel()
             return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+def _limiter(context):
+    return batch_limiter if context.priority == BATCH else job_limiter
+
+
+def _busy_response(error):
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Server busy, retry later", "detail": str(error)},
+        headers={"Retry-After": "5"},
+    )
+
+
+async def _process(upload, filename, text_content, trace, metrics, context=None):
+    """Run one extraction, yielding ``(kind, payload)`` events.
+
+    Kinds: ``token`` (raw LLM text), ``story``, ``progress`` (per chunk,
+    with its ``error`` when it failed), ``cache``, ``error``, ``timing``
+    (per-stage summary, when metrics are enabled) and finally ``result``
+    with the ``user_stories`` dict. LLM calls are scheduled and cancelled
+    through ``context``.
+    """
+    context = context or RequestContext()
+    async with _limiter(context).slot():
+        outcome = "ok"
+        finished = False
+        try:
+            async for event in _extract(upload, filename, text_content, trace, metrics, context):
+                if event[0] == "cache":
+                    outcome = "cache_hit"
+                elif event[0] == "error":
+                    outcome = "error"
+                elif event[0] == "result":
+                    metrics.set(stories=len(event[1].get("user_stories", [])))
+                    if metrics.enabled:
+                        yield "timing", metrics.summary()
+                    finished = True
+                yield event
+        except (asyncio.CancelledError, GeneratorExit, GenerationCancelled):
+            # Client gone or server stopping; closing right after the result still counts as done
+            if not finished:
+                outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.observe(outcome)
+
 
-        # Stream the thinking process
-        for chunk in stream_llm_response(md_text):
-            yield f"data: {chunk}\n\n"
-            
-        yield "data: ---\n\n"
-        
-        # Get and send the final stories
-        stories = extract_user_stories(md_text)
-        yield "data: " + json.dumps(stories) + "\n\n"
+async def _extract(upload, filename, text_content, trace, metrics, context):
+    if upload is not None:
+        # The upload is already spooled by the multipart parser (memory, then an
+        # auto-deleted temp file); hash and convert it straight from that stream.
+        with metrics.stage("conversion"):
+            doc_key = await run_blocking(hash_stream, upload)
+            md_text = await run_blocking(result_cache.get, "markdown", doc_key)
+            if md_text is None:
+                extension = os.path.splitext(filename or "")[1] or ".docx"
+                md_text = await run_blocking(convert_stream_to_markdown, upload, extension)
+                await run_blocking(result_cache.set, "markdown", doc_key, md_text)
+        trace.event("document", source="upload", filename=filename, markdown_chars=len(md_text))
+    elif text_content:
+        md_text = text_content
+        trace.event("document", source="text", markdown_chars=len(md_text))
+    else:
+        yield "error", "No input provided"
+        return
+    metrics.set(document_chars=len(md_text))
+    md_text = await run_blocking(prepare_document, md_text, trace, metrics)
+
+    # Same document, model and prompt as before: replay the stored result
+    stories_key = extraction_key(md_text)
+    stories = await run_blocking(result_cache.get, "stories", stories_key)
+    if stories is not None:
+        trace.event("extraction_cache_hit", key=stories_key)
+        yield "cache", {"hit": True}
+        for story in stories.get("user_stories", []):
+            yield "story", story
+        yield "result", stories
+        return
+
+    # Only a result every part of the document contributed to is stored
+    complete = True
+    chunks = split_markdown(md_text)
+    if len(chunks) > 1:
+        # Large document: map-reduce over chunks, reporting progress per chunk
+        stories = {"user_stories": []}
+        async for kind, payload in iterate_blocking(
+            iter_chunked_extraction(md_text, chunks=chunks, trace=trace, metrics=metrics, context=context)
+        ):
+            if kind == "result":
+                stories = payload
+            else:
+                if kind == "progress" and "error" in payload:
+                    complete = False
+                yield kind, payload
+    else:
+        # Stream the thinking process, sending each story as soon as its object is complete
+        parser = StoryStreamParser()
+        async for chunk in iterate_blocking(stream_llm_response(md_text, metrics, context)):
+            yield "token", chunk
+            for story in parser.feed(chunk):
+                yield "story", story
+
+        # Parse the buffered reply into the final stories (no second LLM call)
+        with metrics.stage("json_recovery"):
+            try:
+                stories = await run_blocking(parse_user_stories, parser.buffer, trace, strict=True)
+            except ExtractionError as e:
+                logger.error("Error extracting user stories: %s", str(e))
+                stories = {"user_stories": []}
+                complete = False
+        if not stories.get("user_stories") and parser.stories:
+            # Whole-reply recovery failed (e.g. truncated output) but complete objects were seen
+            trace.event("incremental_fallback", stories=len(parser.stories))
+            stories = {"user_stories": parser.stories}
+            complete = False
+
+    if complete:
+        await run_blocking(result_cache.set, "stories", stories_key, stories)
+    yield "result", stories
+
+
+def _legacy_message(kind, payload):
+    """Format a _process event the way /process-docx/ has always sent it."""
+    if kind == "token":
+        return f"data: {payload}\n\n"
+    if kind == "story":
+        return _story_event(payload)
+    if kind == "result":
+        return "data: ---\n\n" + "data: " + json.dumps(payload) + "\n\n"
+    if kind == "error":
+        return "data: " + json.dumps({"error": payload}) + "\n\n"
+    return f"event: {kind}\ndata: " + json.dumps(payload) + "\n\n"
+
+
+def _story_event(story):
+    return "event: story\ndata: " + json.dumps(story) + "\n\n"
+
+
+# ---------- Jobs ----------
+# POST /jobs starts an extraction in the background and returns its id at once;
+# GET /jobs/{id}/events streams the job's event log (resumable with Last-Event-ID)
+# and GET /jobs/{id} returns the stored result, also after a server restart.
+
+
+async def _run_job(job_id, upload, filename, text_content, timing, context):
+    trace = DebugTrace(request_id=job_id)
+    pending_tokens = []
+    last_flush = time.monotonic()
+
+    async def append(kind, payload):
+        await run_blocking(job_store.append_event, job_id, kind, payload)
+        await _notify_jobs()
+
+    async def flush_tokens():
+        nonlocal last_flush
+        if pending_tokens:
+            text = "".join(pending_tokens)
+            pending_tokens.clear()
+            await append("token", {"text": text})
+        last_flush = time.monotonic()
+
+    result, error = None, None
+    try:
+        await run_blocking(job_store.set_status, job_id, RUNNING)
+        async for kind, payload in _process(upload, filename, text_content, trace, RequestMetrics(), context):
+            if kind == "timing" and not timing:
+                continue
+            if kind == "token":
+                # Thinking tokens are batched so the event log stays small
+                pending_tokens.append(payload)
+                if time.monotonic() - last_flush >= JOB_TOKEN_FLUSH_SECONDS:
+                    await flush_tokens()
+                continue
+            await flush_tokens()
+            if kind == "result":
+                result = payload
+            elif kind == "error":
+                error = payload
+            else:
+                await append(kind, payload)
+        await flush_tokens()
+    except asyncio.CancelledError:
+        # Server shutdown: the job stays "running" and is marked interrupted on next start
+        context.cancel()
+        raise
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        error = str(e) or type(e).__name__
+    finally:
+        if upload is not None:
+            upload.close()
+        if trace.enabled():
+            await run_blocking(trace.flush)
+    await run_blocking(job_store.finish, job_id, result, error)
+    await _notify_jobs()
+
+
+async def _notify_jobs():
+    async with _jobs_changed:
+        _jobs_changed.notify_all()
+
+
+def _spool(fileobj):
+    """Copy an upload out of the request, which closes its file when the response is sent."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    shutil.copyfileobj(fileobj, spooled, UPLOAD_CHUNK_SIZE)
+    spooled.seek(0)
+    return spooled
+
+
+@app.post("/jobs")
+async def create_job(request: Request, file: UploadFile = None, text_content: str = Form(None),
+                     timing: bool = Form(False), priority: str = Form(BATCH)):
+    if not file and not text_content:
+        return JSONResponse(status_code=400, content={"error": "No input provided"})
+    try:
+        context = _request_context(request, priority)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    limiter = _limiter(context)
+    try:
+        limiter.admit()
+    except QueueFullError as e:
+        return _busy_response(e)
+    try:
+        upload = await run_blocking(_spool, file.file) if file else None
+        job_id = await run_blocking(job_store.create, file.filename if file else "text")
+    except Exception:
+        limiter.release()
+        raise
+    task = asyncio.create_task(_run_job(job_id, upload, file and file.filename, text_content, timing, context))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return JSONResponse(
+        status_code=202,
+        content={"id": job_id, "status": QUEUED, "events": f"/jobs/{job_id}/events", "result": f"/jobs/{job_id}"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    try:
+        job = await run_blocking(job_store.get, job_id)
+    except JobNotFoundError:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    result = job.pop("result") or {}
+    job["user_stories"] = result.get("user_stories") if job["status"] == DONE else None
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str, last_event_id: int = None):
+    # EventSource resends the last id it saw in the Last-Event-ID header on reconnect;
+    # the query parameter is for clients that cannot set headers.
+    header = request.headers.get("last-event-id", "")
+    after = int(header) if header.isdigit() else (last_event_id or 0)
+    try:
+        await run_blocking(job_store.events_after, job_id, after)
+    except JobNotFoundError:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    async def generate():
+        nonlocal after
+        while True:
+            idle = False
+            async with _jobs_changed:
+                status, events = await run_blocking(job_store.events_after, job_id, after)
+                if not events and status not in FINISHED:
+                    try:
+                        await asyncio.wait_for(_jobs_changed.wait(), JOB_EVENTS_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        idle = True
+            for seq, kind, data in events:
+                yield f"id: {seq}\nevent: {kind}\ndata: " + json.dumps(data) + "\n\n"
+                after = seq
+            if not events:
+                if status in FINISHED:
+                    return
+                if idle:
+                    yield ": keep-alive\n\n"
 
     return StreamingResponse(generate(), media_type="text/event-stream")
 
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -0,0 +1,253 @@
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import zipfile
+import argparse
+import collections
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from integrated1 import convert_to_markdown, extract_user_stories
+from result_cache import result_cache, sha256_hex
+from metrics import RequestMetrics
+from llm_scheduler import BATCH, GenerationCancelled, RequestContext, llm_scheduler
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+# Processes converting .docx files to Markdown (CPU-bound, MarkItDown).
+BATCH_CONVERT_WORKERS = int(os.environ.get("BATCH_CONVERT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Documents in extraction at the same time; their LLM calls still go through
+# llm_scheduler, which caps the generations sent to the model (LLM_MAX_ACTIVE).
+BATCH_DOCUMENTS = int(os.environ.get("BATCH_DOCUMENTS", "4"))
+BATCH_OUTPUT = os.environ.get("BATCH_OUTPUT", "batch_results.jsonl")
+
+EXTENSIONS = (".docx", ".md")
+
+
+# ---------- Inputs ----------
+def find_documents(patterns):
+    """The .docx/.md files named by ``patterns`` (files, directories searched recursively, or globs)."""
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names]
+        elif glob.has_magic(pattern):
+            paths = glob.glob(pattern, recursive=True)
+        else:
+            paths = [pattern]
+        for path in paths:
+            name = os.path.basename(path)
+            # "~$name.docx" is the lock file Word keeps next to an open document
+            if name.lower().endswith(EXTENSIONS) and not name.startswith("~$") and os.path.isfile(path):
+                found.setdefault(os.path.abspath(path), path)
+    return sorted(found.values())
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return sha256_hex(f.read())
+
+
+# ---------- Results file ----------
+def load_done(output):
+    """Content hashes that already have a successful record in ``output``."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Typically the last line of a run that was killed while writing it
+                logger.warning("Skipping unreadable line %d of %s", line_no, output)
+                continue
+            if record.get("status") == "ok":
+                done.add(record["sha256"])
+    return done
+
+
+def _open_output(output):
+    truncated = False
+    if os.path.exists(output) and os.path.getsize(output):
+        with open(output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            truncated = f.read(1) != b"\n"
+    f = open(output, "a", encoding="utf-8")
+    if truncated:
+        f.write("\n")  # do not glue the first record onto a half-written line
+    return f
+
+
+# ---------- Pipeline ----------
+def convert_document(path):
+    """Markdown of one input file; runs in a worker process."""
+    if path.lower().endswith(".md"):
+        with open(path, encoding="utf-8") as f:
+            md_text = f.read()
+    else:
+        # MarkItDown reads a file it cannot open as a document as plain text instead
+        if not zipfile.is_zipfile(path):
+            raise ValueError("not a .docx file (no zip archive)")
+        md_text = convert_to_markdown(path, save_md=False)[0]
+    if not md_text.strip():
+        raise ValueError("no text in document")
+    return md_text
+
+
+def extract_document(path, digest, md_text, context):
+    """Extraction record of one document: its stories, or the error that stopped it."""
+    metrics = RequestMetrics(enabled=True)
+    record = {"path": path, "sha256": digest, "markdown_chars": len(md_text)}
+    try:
+        result = extract_user_stories(md_text, metrics=metrics, context=context, strict=True)
+    except GenerationCancelled:
+        raise
+    except Exception as e:
+        record.update(status="error", stage="extraction", error=f"{type(e).__name__}: {e}")
+    else:
+        stories = result.get("user_stories", [])
+        record.update(status="ok", stories=len(stories), user_stories=stories)
+    summary = metrics.summary()
+    record.update(seconds=summary["total"], prompt_tokens=summary.get("prompt_tokens", 0),
+                  eval_tokens=summary.get("eval_tokens", 0))
+    return record
+
+
+def run_batch(paths, output=BATCH_OUTPUT, workers=BATCH_CONVERT_WORKERS, documents=BATCH_DOCUMENTS,
+              llm_concurrency=None):
+    """Convert and extract ``paths``, appending one JSON record per document to ``output``.
+
+    Documents whose content hash already has an ``ok`` record are skipped,
+    so an interrupted run resumes where it stopped; failed ones are tried
+    again. Conversion runs in ``workers`` processes, extraction of up to
+    ``documents`` documents in threads, and records are written as each
+    document finishes. ``llm_concurrency`` sets llm_scheduler's limit for
+    the run only. Returns the run's totals.
+    """
+    done = load_done(output)
+    queue = collections.deque()
+    skipped = 0
+    for path in paths:
+        digest = file_hash(path)
+        if digest in done:
+            skipped += 1
+            continue
+        done.add(digest)  # the same file twice in one run is extracted once
+        queue.append((path, digest))
+
+    totals = {"documents": len(paths), "skipped": skipped, "ok": 0, "failed": 0, "stories": 0,
+              "prompt_tokens": 0, "eval_tokens": 0}
+    context = RequestContext("batch", BATCH)
+    started = time.perf_counter()
+    # Spawned, not forked: extraction threads are already streaming when converters start
+    converters = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+    extractors = ThreadPoolExecutor(max_workers=max(1, documents), thread_name_prefix="batch-extract")
+    conversions = {}
+    extractions = {}
+    # Markdown held in memory is bounded: converted documents wait for at most `documents` extractors
+    in_flight = max(1, workers) + max(1, documents) * 2
+
+    def submit():
+        while queue and len(conversions) + len(extractions) < in_flight:
+            path, digest = queue.popleft()
+            md_text = result_cache.get("markdown", digest) if path.lower().endswith(".docx") else None
+            if md_text is None:
+                conversions[converters.submit(convert_document, path)] = (path, digest)
+            else:
+                extractions[extractors.submit(extract_document, path, digest, md_text, context)] = path
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        finished = totals["ok"] + totals["failed"]
+        if record["status"] == "ok":
+            totals["ok"] += 1
+            totals["stories"] += record["stories"]
+            detail = f"{record['stories']} stories in {record['seconds']:.1f}s"
+        else:
+            totals["failed"] += 1
+            detail = f"{record['stage']} failed: {record['error']}"
+        totals["prompt_tokens"] += record.get("prompt_tokens", 0)
+        totals["eval_tokens"] += record.get("eval_tokens", 0)
+        print(f"[{finished + 1}/{len(paths) - skipped}] {record['status']:5} {record['path']}: {detail}")
+
+    out = _open_output(output)
+    max_active = llm_scheduler.max_active
+    if llm_concurrency:
+        llm_scheduler.max_active = max(1, llm_concurrency)
+    try:
+        submit()
+        while conversions or extractions:
+            finished, _ = wait(list(conversions) + list(extractions), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in conversions:
+                    path, digest = conversions.pop(future)
+                    try:
+                        md_text = future.result()
+                    except Exception as e:
+                        logger.error("Error converting %s: %s", path, str(e))
+                        write({"path": path, "sha256": digest, "status": "error", "stage": "conversion",
+                               "error": f"{type(e).__name__}: {e}"})
+                        continue
+                    if path.lower().endswith(".docx"):
+                        result_cache.set("markdown", digest, md_text)
+                    extractions[extractors.submit(extract_document, path, digest, md_text, context)] = path
+                else:
+                    extractions.pop(future)
+                    write(future.result())
+            submit()
+    except KeyboardInterrupt:
+        # Finished documents are already written; the next run picks up the rest
+        print("[info] Interrupted, stopping running generations...")
+        context.cancel()
+        for future in list(conversions) + list(extractions):
+            future.cancel()
+    finally:
+        extractors.shutdown(wait=True, cancel_futures=True)
+        converters.shutdown(wait=True, cancel_futures=True)
+        out.close()
+        llm_scheduler.max_active = max_active
+
+    totals["seconds"] = time.perf_counter() - started
+    return totals
+
+
+def report(totals):
+    minutes = totals["seconds"] / 60
+    processed = totals["ok"] + totals["failed"]
+    print(f"\n{processed} document(s) in {totals['seconds']:.1f}s "
+          f"({processed / minutes if minutes else 0:.1f} docs/min): {totals['ok']} ok, {totals['failed']} failed, "
+          f"{totals['skipped']} already done; {totals['stories']} stories")
+    print(f"LLM: {totals['prompt_tokens']} prompt tokens, {totals['eval_tokens']} generated tokens "
+          f"({totals['eval_tokens'] / totals['seconds'] if totals['seconds'] else 0:.1f} tokens/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract user stories from many .docx/.md files into a resumable JSONL file.")
+    parser.add_argument("inputs", nargs="+", help="files, directories (searched recursively) or globs")
+    parser.add_argument("-o", "--output", default=BATCH_OUTPUT, help="JSONL file, appended to")
+    parser.add_argument("--workers", type=int, default=BATCH_CONVERT_WORKERS, help="conversion processes")
+    parser.add_argument("--documents", type=int, default=BATCH_DOCUMENTS,
+                        help="documents being extracted at the same time")
+    parser.add_argument("--llm-concurrency", type=int, help="generations sent to the model at once "
+                                                            "(default: LLM_MAX_ACTIVE)")
+    args = parser.parse_args()
+
+    paths = find_documents(args.inputs)
+    if not paths:
+        print("[error] No .docx or .md file found.")
+        raise SystemExit(1)
+    totals = run_batch(paths, args.output, args.workers, args.documents, args.llm_concurrency)
+    report(totals)
+    if totals["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Batch extraction CLI: throughput, resume and error records.
+
+Usage: python -m bench.bench_batch [--docs 24] [--pages 5] [--workers 2] [--documents 4] [--tps 400]
+
+Writes --docs synthetic specifications (.md, plus two .docx and one
+corrupt .docx) to a temporary directory and runs batch_extract.run_batch
+over it with bench.fake_llm.FakeOllama streaming at --tps tokens per
+second. Three runs share one JSONL file:
+
+- first run: every document is converted and extracted; the corrupt
+  .docx must give a conversion error record;
+- second run: nothing is extracted again, only the failed document is
+  retried;
+- third run, with two new documents and the LLM unreachable: both must
+  give extraction error records, not empty ``ok`` results.
+
+The exit status is 1 when one of those checks fails.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from bench.corpus import docx_from_markdown, synthetic_markdown
+from bench.fake_llm import FakeOllama, install
+
+
+def write_corpus(directory, docs, pages):
+    for i in range(docs):
+        md_text, _ = synthetic_markdown(pages, seed=i)
+        with open(os.path.join(directory, f"spec_{i:03d}.md"), "w", encoding="utf-8") as f:
+            f.write(md_text)
+    os.makedirs(os.path.join(directory, "word"), exist_ok=True)
+    for i in range(2):
+        md_text, _ = synthetic_markdown(pages, seed=1000 + i)
+        with open(os.path.join(directory, "word", f"spec_{i}.docx"), "wb") as f:
+            f.write(docx_from_markdown(md_text, seed=i))
+    with open(os.path.join(directory, "word", "corrupt.docx"), "wb") as f:
+        f.write(b"PK\x03\x04 this is not a zip archive")
+    with open(os.path.join(directory, "word", "~$spec_0.docx"), "wb") as f:
+        f.write(b"Word lock file")
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _records(output):
+    with open(output, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=24, help="synthetic .md documents")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="conversion processes")
+    parser.add_argument("--documents", type=int, default=4, help="documents extracted at the same time")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--tps", type=float, default=400.0, help="fake LLM tokens per second")
+    args = parser.parse_args()
+
+    import batch_extract
+    from llm_client import LLMClient, set_llm_client
+
+    directory = tempfile.mkdtemp(prefix="bench_batch_")
+    output = os.path.join(directory, "results.jsonl")
+    write_corpus(directory, args.docs, args.pages)
+    paths = batch_extract.find_documents([directory])
+    checks = []
+
+    def run(label):
+        print(f"\n--- {label} ---")
+        totals = batch_extract.run_batch(paths, output, args.workers, args.documents, args.llm_concurrency)
+        batch_extract.report(totals)
+        return totals
+
+    fake = install(FakeOllama(tokens_per_second=args.tps, extract=True))
+    first = run(f"first run: {len(paths)} documents")
+    print(f"fake LLM: {fake.calls} calls, at most {fake.max_active} at once")
+    checks.append(("first run: all but the corrupt file ok", first["ok"] == len(paths) - 1 and first["failed"] == 1))
+    conversion_errors = [r for r in _records(output) if r.get("stage") == "conversion"]
+    checks.append(("corrupt .docx has a conversion error record",
+                   [os.path.basename(r["path"]) for r in conversion_errors] == ["corrupt.docx"]))
+
+    calls = fake.calls
+    second = run("second run (resume)")
+    checks.append(("second run skips finished documents",
+                   second["skipped"] == len(paths) - 1 and second["failed"] == 1 and fake.calls == calls))
+
+    for i in range(2):
+        md_text, _ = synthetic_markdown(args.pages, seed=2000 + i)
+        with open(os.path.join(directory, f"new_{i}.md"), "w", encoding="utf-8") as f:
+            f.write(md_text)
+    paths = batch_extract.find_documents([directory])
+    set_llm_client(LLMClient(model="fake", host=f"http://127.0.0.1:{_closed_port()}", timeout=5))
+    third = run("third run: two new documents, LLM unreachable")
+    extraction_errors = [r for r in _records(output)[-3:] if r.get("stage") == "extraction"]
+    checks.append(("unreachable LLM gives extraction error records",
+                   third["ok"] == 0 and len(extraction_errors) == 2))
+
+    print()
+    for label, ok in checks:
+        print(f"{'ok' if ok else 'FAILED':6} {label}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
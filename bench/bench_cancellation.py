@@ -0,0 +1,163 @@
+"""Client disconnects and fair scheduling of LLM generations.
+
+Usage: python -m bench.bench_cancellation [--tps 10] [--slots 1] [--hold 0.1] [--chunks 12]
+
+- disconnect: the app runs under uvicorn and talks through LLMClient to the
+  fake Ollama HTTP server, which streams slowly (--tps tokens per second).
+  A client reads the first token of /process-docx/ and closes the
+  connection while a second client waits for the only LLM slot. Reported:
+  time until the slot passes to the waiting client and until the fake
+  server stops generating, against the token interval, and the first-token
+  latency of the waiting client. The exit status is 1 when the slot takes
+  longer than one token interval (plus 20 ms of scheduling slack) to pass.
+- fairness: LLMScheduler alone with --slots slots and generations holding
+  a slot for --hold seconds. One client queues --chunks batch chunks; then
+  another client sends an interactive request and a third client three
+  batch chunks. Waits are compared with a plain FIFO queue.
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from bench.fake_llm import FakeOllama
+from bench.fake_ollama_server import FakeOllamaServer
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, RequestContext
+
+TEXT = "Le système doit permettre aux clients de créer un compte utilisateur."
+SLACK_SECONDS = 0.02
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until(predicate, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition not reached")
+        time.sleep(0.001)
+    return time.monotonic()
+
+
+def run_disconnect(tps):
+    os.environ.setdefault("JOB_DB_PATH", os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))
+    import httpx
+    import uvicorn
+
+    import backend_api
+    import integrated1
+    from llm_client import LLMClient, set_llm_client
+    from result_cache import result_cache
+
+    interval = 1.0 / tps
+    fake = FakeOllama(tokens_per_second=tps)
+    ollama = FakeOllamaServer(fake=fake, load_seconds=0).start()
+    set_llm_client(LLMClient(model="fake", host=ollama.url))
+    result_cache.enabled = False
+    scheduler = integrated1.llm_scheduler = LLMScheduler(max_active=1)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(backend_api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    _wait_until(lambda: server.started)
+
+    next_first_token = {}
+
+    def next_client():
+        # Queued behind the first client's generation; measures when it gets its first token
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            with client.stream("POST", "/process-docx/", data={"text_content": TEXT},
+                               headers={"X-Client-ID": "second"}) as response:
+                for line in response.iter_lines():
+                    if line.startswith("data: "):
+                        next_first_token["at"] = time.monotonic()
+                        break
+
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            with client.stream("POST", "/process-docx/", data={"text_content": TEXT},
+                               headers={"X-Client-ID": "first"}) as response:
+                # Keep a reference: a dropped iter_lines() generator closes the connection
+                lines = response.iter_lines()
+                for line in lines:
+                    if line.startswith("data: "):
+                        break
+                second = threading.Thread(target=next_client)
+                second.start()
+                _wait_until(lambda: scheduler.waiting == 1)
+                remaining = len(fake.tokens()) - 1
+                closed = time.monotonic()
+            slot_freed = _wait_until(lambda: scheduler.waiting == 0) - closed
+            server_stopped = _wait_until(lambda: ollama.aborted == 1) - closed
+        second.join()
+    finally:
+        server.should_exit = True
+        ollama.stop()
+
+    print(f"disconnect ({tps:g} tokens/s, token interval {interval * 1000:.0f} ms, 1 slot)")
+    print(f"  slot free again after      {slot_freed * 1000:7.1f} ms")
+    print(f"  fake Ollama stopped after  {server_stopped * 1000:7.1f} ms  "
+          f"({remaining} tokens, {remaining * interval:.1f} s of generation saved)")
+    print(f"  next client's first token  {(next_first_token['at'] - closed) * 1000:7.1f} ms after the disconnect")
+    return slot_freed <= interval + SLACK_SECONDS
+
+
+def run_fairness(slots, hold, chunks):
+    def simulate(fair):
+        scheduler = LLMScheduler(max_active=slots)
+        waits = {}
+        lock = threading.Lock()
+
+        def generation(name, client_id, priority, delay):
+            time.sleep(delay)
+            context = RequestContext(client_id, priority) if fair else RequestContext("everyone", BATCH)
+            queued = time.monotonic()
+            with scheduler.slot(context):
+                with lock:
+                    waits[name] = time.monotonic() - queued
+                time.sleep(hold)
+
+        plan = [(f"bulk-{i}", "bulk", BATCH, 0.0) for i in range(chunks)]
+        plan.append(("alice", "alice", INTERACTIVE, hold / 2))
+        plan += [(f"bob-{i}", "bob", BATCH, hold / 2 + 0.001 * (i + 1)) for i in range(3)]
+        threads = [threading.Thread(target=generation, args=args) for args in plan]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return waits, time.monotonic() - start
+
+    print(f"\nfairness ({slots} slot(s), {hold * 1000:.0f} ms per generation, {chunks} bulk batch chunks first)")
+    print(f"  {'':10} {'alice (interactive)':>20} {'bob (3 batch), last':>20} {'bulk, last':>12} {'total':>8}")
+    for label, fair in (("FIFO", False), ("fair", True)):
+        waits, total = simulate(fair)
+        bob = max(w for name, w in waits.items() if name.startswith("bob"))
+        bulk = max(w for name, w in waits.items() if name.startswith("bulk"))
+        print(f"  {label:10} {waits['alice']:18.2f} s {bob:18.2f} s {bulk:10.2f} s {total:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tps", type=float, default=10.0, help="fake LLM tokens per second")
+    parser.add_argument("--slots", type=int, default=1, help="fairness: concurrent generations (LLM_MAX_ACTIVE)")
+    parser.add_argument("--hold", type=float, default=0.1, help="fairness: seconds per generation")
+    parser.add_argument("--chunks", type=int, default=12, help="fairness: batch chunks queued first")
+    args = parser.parse_args()
+
+    ok = run_disconnect(args.tps)
+    run_fairness(args.slots, args.hold, args.chunks)
+    if not ok:
+        print("\nslot not freed within one token interval")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
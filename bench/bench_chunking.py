@@ -0,0 +1,58 @@
+"""Single-prompt vs chunked map-reduce extraction on a synthetic spec.
+
+Usage: python -m bench.bench_chunking [--pages 100] [--fan-out 2] [--num-ctx 4096]
+
+The fake LLM only "sees" the last num_ctx tokens of its prompt, like Ollama
+truncating an overlong context, so recall of the single-prompt path drops
+on large documents while the chunked path keeps every chunk in budget.
+"""
+import argparse
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_llm import FakeOllama, install
+
+
+def _recall(expected, stories):
+    found = {" ".join(s.get("source_sentence", "").split()) for s in stories}
+    return sum(1 for sentence in expected if sentence in found) / max(1, len(expected))
+
+
+def run(pages, fan_out, num_ctx, tps, prompt_eval_ms, prompt_eval_quadratic):
+    import integrated1
+
+    md_text, expected = synthetic_markdown(pages)
+    fake_kwargs = dict(extract=True, tokens_per_second=tps, num_ctx=num_ctx,
+                       prompt_eval_ms=prompt_eval_ms, prompt_eval_quadratic=prompt_eval_quadratic)
+
+    install(FakeOllama(**fake_kwargs))
+    start = time.perf_counter()
+    raw = "".join(integrated1.stream_llm_response(md_text))
+    single = integrated1.parse_user_stories(raw).get("user_stories", [])
+    single_time = time.perf_counter() - start
+
+    fake = install(FakeOllama(**fake_kwargs))
+    start = time.perf_counter()
+    chunked = integrated1.extract_user_stories(md_text, fan_out=fan_out).get("user_stories", [])
+    chunked_time = time.perf_counter() - start
+
+    print(f"document               : {pages} pages, {len(md_text)} chars, {len(expected)} requirements")
+    print(f"single prompt          : {single_time:.2f}s, recall {_recall(expected, single):.1%}")
+    print(f"chunked ({fake.calls} chunks, x{fan_out}): {chunked_time:.2f}s, recall {_recall(expected, chunked):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--fan-out", type=int, default=2)
+    parser.add_argument("--num-ctx", type=int, default=4096)
+    parser.add_argument("--tps", type=float, default=2000.0, help="fake tokens per second")
+    parser.add_argument("--prompt-eval-ms", type=float, default=0.2, help="fake prompt cost per token")
+    parser.add_argument("--prompt-eval-quadratic", type=float, default=0.00005,
+                        help="fake prompt cost per token squared (attention)")
+    args = parser.parse_args()
+    run(args.pages, args.fan_out, args.num_ctx, args.tps, args.prompt_eval_ms, args.prompt_eval_quadratic)
+
+
+if __name__ == "__main__":
+    main()
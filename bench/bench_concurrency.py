@@ -0,0 +1,81 @@
+"""Load test for /process-docx/ against a fake LLM.
+
+Usage: python -m bench.bench_concurrency [--requests N] [--concurrent C] [--queued Q] [--tps T]
+
+With C slots, N requests that each take ~T_gen should finish in about
+ceil(N / C) * T_gen instead of N * T_gen when they overlap correctly.
+Requests beyond C + Q are answered with 429.
+
+The exit status is 1 when an accepted request did not make exactly one
+LLM call, or when more than C generations overlapped.
+"""
+import argparse
+import asyncio
+import math
+import sys
+import time
+
+import httpx
+
+from bench.fake_llm import FakeOllama, install
+
+
+async def _one(client, idx):
+    start = time.perf_counter()
+    resp = await client.post("/process-docx/", data={"text_content": f"Document {idx}. Le système doit répondre."})
+    return resp.status_code, time.perf_counter() - start
+
+
+async def run(n_requests, max_concurrent, max_queued, tps):
+    import backend_api
+    from worker_pool import JobLimiter
+
+    fake = install(FakeOllama(tokens_per_second=tps))
+    backend_api.job_limiter = JobLimiter(max_concurrent=max_concurrent, max_queued=max_queued)
+
+    transport = httpx.ASGITransport(app=backend_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Single request first to know the cost of one generation.
+        _, single = await _one(client, -1)
+        fake.calls = 0
+        fake.max_active = 0
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[_one(client, i) for i in range(n_requests)])
+        wall = time.perf_counter() - start
+
+    accepted = sum(1 for code, _ in results if code == 200)
+    rejected = sum(1 for code, _ in results if code == 429)
+    serialized = accepted * single
+    expected = math.ceil(accepted / max_concurrent) * single
+    print(f"single generation      : {single:.2f}s")
+    print(f"requests               : {n_requests} (accepted {accepted}, 429 {rejected})")
+    print(f"LLM calls              : {fake.calls} (expected {accepted}, one per request)")
+    print(f"max overlapping streams: {fake.max_active} (limit {max_concurrent})")
+    print(f"wall time              : {wall:.2f}s")
+    print(f"if serialized          : {serialized:.2f}s")
+    print(f"ideal with {max_concurrent} slots     : {expected:.2f}s")
+    return {"wall": wall, "single": single, "accepted": accepted, "rejected": rejected,
+            "calls": fake.calls, "max_active": fake.max_active}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--concurrent", type=int, default=4)
+    parser.add_argument("--queued", type=int, default=4)
+    parser.add_argument("--tps", type=float, default=200.0, help="fake tokens per second")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.requests, args.concurrent, args.queued, args.tps))
+    failures = []
+    if result["calls"] != result["accepted"]:
+        failures.append(f"{result['calls']} LLM calls for {result['accepted']} accepted requests")
+    if result["max_active"] > args.concurrent:
+        failures.append(f"{result['max_active']} overlapping generations, limit {args.concurrent}")
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Time-to-first-story vs time-to-final-list for the /process-docx/ SSE stream.
+
+Usage: python -m bench.bench_first_story [--stories 10] [--tps 50]
+
+Drives the endpoint's generator directly against a fake LLM that streams
+a reply with ``--stories`` stories at ``--tps`` tokens per second.
+"""
+import argparse
+import asyncio
+import time
+
+from bench.fake_llm import FakeOllama, install
+
+
+async def run(n_stories, tps):
+    import backend_api
+    from debug_trace import DebugTrace
+    from metrics import RequestMetrics
+
+    reply = {"user_stories": [
+        {"story": f"En tant que client, je veux la fonction {i} afin de gagner du temps.",
+         "source_sentence": f"Le système doit fournir la fonction {i}."}
+        for i in range(n_stories)
+    ]}
+    install(FakeOllama(reply=reply, tokens_per_second=tps))
+
+    start = time.perf_counter()
+    first_story = None
+    story_events = 0
+    async for kind, _ in backend_api._process(None, None, "Texte du cahier des charges.", DebugTrace(),
+                                              RequestMetrics(enabled=False)):
+        if kind == "story":
+            story_events += 1
+            if first_story is None:
+                first_story = time.perf_counter() - start
+    total = time.perf_counter() - start
+
+    print(f"stories streamed   : {story_events}/{n_stories}")
+    print(f"time to first story: {first_story:.2f}s")
+    print(f"time to final list : {total:.2f}s ({first_story / total:.0%} of the generation)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=10)
+    parser.add_argument("--tps", type=float, default=50.0, help="fake tokens per second")
+    args = parser.parse_args()
+    asyncio.run(run(args.stories, args.tps))
+
+
+if __name__ == "__main__":
+    main()
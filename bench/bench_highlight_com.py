@@ -0,0 +1,70 @@
+"""COM round-trips per highlighted sentence: per-sentence Find loop vs batch mode.
+
+Usage: python -m bench.bench_highlight_com [--pages 50] [--sentences 300]
+
+Runs realTime.highlight_sentences_in_doc (legacy) and
+realTime.highlight_sentences_batch against the same fake Word document and
+counts every COM property/method access. On a live Word instance each of
+those is a cross-process call costing roughly 0.1-1 ms.
+
+Both run on a plain document and on the same document with a table of
+contents, tables and hyperlinks, where Range positions are no longer
+Content.Text offsets. Every highlighted range must read back as one of the
+sentences; the exit status is 1 otherwise.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_word import FakeWordDocument, add_tables_and_fields, word_text_from_markdown
+
+
+def run(pages, n_sentences):
+    import realTime
+    from sentence_matching import normalize_text
+
+    md_text, requirements = synthetic_markdown(pages)
+    plain = word_text_from_markdown(md_text)
+    sentences = requirements[:n_sentences]
+    colors = [7] * len(sentences)
+    expected = {normalize_text(sentence) for sentence in sentences}
+
+    results = {}
+    ok = True
+    for layout, (text, field_codes) in [("plain", (plain, None)), ("tables+fields", add_tables_and_fields(plain))]:
+        print(f"{layout} document: {pages} pages, {len(text)} chars, {text.count(chr(7))} table marks, "
+              f"{len(field_codes or ())} hidden field runs, {len(sentences)} sentences to highlight")
+        for label, func in [
+            ("per-sentence Find", lambda doc: realTime.highlight_sentences_in_doc(doc, sentences, colors)),
+            ("batch", lambda doc: realTime.highlight_sentences_batch(doc, sentences, colors)),
+        ]:
+            doc = FakeWordDocument(text, field_codes=field_codes)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func(doc)
+                elapsed = time.perf_counter() - start
+            calls = doc.com_calls
+            wrong = sum(normalize_text(doc.Range(s, e).Text) not in expected for s, e in doc.highlights)
+            ok = ok and not wrong
+            results[(layout, label)] = (calls, len(doc.highlights), elapsed)
+            print(f"  {label:18}: {calls:6d} COM calls, {len(doc.highlights):4d} highlighted ({wrong} wrong), "
+                  f"{calls / max(1, len(doc.highlights)):6.2f} calls/sentence, {elapsed * 1000:8.1f} ms in Python")
+    return results, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=300)
+    args = parser.parse_args()
+    _, ok = run(args.pages, args.sentences)
+    if not ok:
+        print("\nsome highlighted ranges are not the sentence that was matched")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Per-document highlighting time: Word COM batch path vs the headless OOXML backend.
+
+Usage: python -m bench.bench_highlight_ooxml [--pages 50] [--docs 16] [--workers 4] [--com-call-ms 0.5]
+
+The COM side runs realTime.highlight_sentences_batch against the fake Word
+document and models each counted COM round-trip at --com-call-ms (Word
+itself is not available here; opening and saving the file are not
+included). The OOXML side is measured for real: docx_highlight on one
+document, then --docs documents through the process pool.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from bench.corpus import docx_from_markdown, synthetic_markdown
+from bench.fake_word import FakeWordDocument, word_text_from_markdown
+from docx_highlight import highlight_docx, highlight_docx_many
+
+
+def com_per_document(md_text, sentences, colors, com_call_ms):
+    try:
+        import realTime
+    except ImportError as e:
+        print(f"COM path skipped ({e})")
+        return None
+    doc = FakeWordDocument(word_text_from_markdown(md_text))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        realTime.highlight_sentences_batch(doc, sentences, colors)
+    python_seconds = time.perf_counter() - start
+    return python_seconds + doc.com_calls * com_call_ms / 1000, doc.com_calls, len(doc.highlights)
+
+
+def run(pages, n_docs, workers, n_sentences, com_call_ms):
+    md_text, requirements = synthetic_markdown(pages)
+    sentences = requirements[:n_sentences]
+    colors = [7, 4, 3] * (len(sentences) // 3 + 1)
+    colors = colors[:len(sentences)]
+    docx = docx_from_markdown(md_text)
+
+    print(f"document: {pages} pages, {len(docx) // 1024} KiB .docx, {len(sentences)} sentences to highlight")
+    com = com_per_document(md_text, sentences, colors, com_call_ms)
+    if com is not None:
+        seconds, calls, highlighted = com
+        print(f"COM batch (modelled) : {seconds * 1000:8.1f} ms/doc ({calls} COM calls at {com_call_ms} ms, "
+              f"{highlighted} highlighted), one document at a time")
+
+    start = time.perf_counter()
+    highlight_docx(docx, sentences, colors)
+    single = time.perf_counter() - start
+    print(f"OOXML, 1 process     : {single * 1000:8.1f} ms/doc")
+
+    jobs = [(docx, sentences, colors)] * n_docs
+    start = time.perf_counter()
+    outputs = highlight_docx_many(jobs, workers=workers)
+    pooled = time.perf_counter() - start
+    print(f"OOXML, {workers} workers     : {pooled / n_docs * 1000:8.1f} ms/doc effective "
+          f"({n_docs} docs in {pooled:.2f}s, {n_docs / pooled:.1f} docs/s)")
+    assert len(outputs) == n_docs
+    if com is not None:
+        print(f"speed-up vs COM      : {com[0] / single:.1f}x single, {com[0] / (pooled / n_docs):.1f}x pooled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--docs", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sentences", type=int, default=200)
+    parser.add_argument("--com-call-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    run(args.pages, args.docs, args.workers, args.sentences, args.com_call_ms)
+
+
+if __name__ == "__main__":
+    main()
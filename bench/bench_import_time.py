@@ -0,0 +1,80 @@
+"""Import-time budget for the server: `python -X importtime -c "import backend_api"`.
+
+Usage: python -m bench.bench_import_time [--module backend_api] [--runs 5] [--budget-ms 600]
+
+Imports the module in fresh interpreters, reports the median cumulative
+import time and the slowest direct imports, and checks that none of the
+heavy or Windows-only packages are loaded at import time (they must stay
+lazy). Exits with status 1 when the budget is exceeded or a deferred
+package is imported, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded on first use only: conversion, matching, OOXML, LLM client, Word/GUI, server runner
+DEFERRED = ("markitdown", "magika", "numpy", "rapidfuzz", "lxml", "ollama", "win32com", "pythoncom",
+            "tkinter", "uvicorn")
+
+
+def import_times(module):
+    """Return {module: (self_us, cumulative_us, depth)} from one -X importtime run."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = int(head.split(":", 1)[1])
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.setdefault(name.strip(), (self_us, int(cumulative_us), depth))
+    return times
+
+
+def loaded_modules(module):
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def run(module, runs, budget_ms):
+    samples = [import_times(module) for _ in range(runs)]
+    totals = [s[module][1] / 1000 for s in samples]
+    median = statistics.median(totals)
+    last = samples[-1]
+    children = sorted(((name, cum) for name, (_, cum, depth) in last.items() if depth == 1),
+                      key=lambda item: -item[1])
+    deferred = sorted({name.split(".")[0] for name in loaded_modules(module)} & set(DEFERRED))
+
+    print(f"import {module}: median {median:.0f} ms over {runs} runs (min {min(totals):.0f}, "
+          f"max {max(totals):.0f}), budget {budget_ms:.0f} ms")
+    print("slowest direct imports:")
+    for name, cum in children[:10]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+    ok = True
+    if deferred:
+        print(f"FAIL: deferred packages imported at startup: {', '.join(deferred)}")
+        ok = False
+    if median > budget_ms:
+        print(f"FAIL: import time {median:.0f} ms exceeds the {budget_ms:.0f} ms budget")
+        ok = False
+    if ok:
+        print("OK")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend_api")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "600")))
+    args = parser.parse_args()
+    sys.exit(0 if run(args.module, args.runs, args.budget_ms) else 1)
+
+
+if __name__ == "__main__":
+    main()
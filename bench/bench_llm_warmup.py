@@ -0,0 +1,80 @@
+"""Cold vs warm first-token latency and connection reuse, against the fake Ollama server.
+
+Usage: python -m bench.bench_llm_warmup [--load-seconds 2] [--requests 10]
+
+- cold: no warm-up, the first request pays the model load.
+- warm: LLMClient.warm_up() at startup, the first request does not.
+- idle: after an idle gap longer than the server's default keep-alive, a
+  client pinning the model with keep_alive stays warm, one without reloads.
+- pooling: TCP connections opened for N sequential requests by one
+  long-lived LLMClient.
+"""
+import argparse
+import time
+
+from bench.fake_llm import FakeOllama
+from bench.fake_ollama_server import FakeOllamaServer
+from llm_client import LLMClient
+
+
+def first_token_latency(client):
+    """Seconds until the first content chunk; the stream is drained so the connection is reused."""
+    start = time.perf_counter()
+    latency = None
+    for chunk in client.chat_stream([{"role": "user", "content": "Le système doit répondre."}]):
+        if latency is None and chunk["message"]["content"]:
+            latency = time.perf_counter() - start
+    return latency if latency is not None else time.perf_counter() - start
+
+
+def run(load_seconds, n_requests, idle_seconds):
+    def server(**kwargs):
+        return FakeOllamaServer(fake=FakeOllama(tokens_per_second=500), load_seconds=load_seconds, **kwargs).start()
+
+    srv = server()
+    cold = first_token_latency(LLMClient(model="fake", host=srv.url))
+    srv.stop()
+
+    srv = server()
+    client = LLMClient(model="fake", host=srv.url)
+    client.warm_up()
+    warm = first_token_latency(client)
+    health = client.health()
+    srv.stop()
+
+    results = {}
+    for label, keep_alive in (("keep_alive=30m", "30m"), ("server default", None)):
+        srv = server(default_keep_alive=idle_seconds / 2)
+        client = LLMClient(model="fake", host=srv.url, keep_alive=keep_alive)
+        client.warm_up()
+        time.sleep(idle_seconds)
+        results[label] = first_token_latency(client)
+        srv.stop()
+
+    srv = server()
+    client = LLMClient(model="fake", host=srv.url)
+    client.warm_up()
+    for _ in range(n_requests):
+        first_token_latency(client)
+    pooled = srv.connections
+    srv.stop()
+
+    print(f"model load time (fake)     : {load_seconds:.2f}s")
+    print(f"cold first token           : {cold:.3f}s")
+    print(f"warm first token           : {warm:.3f}s (warm-up took {client.warmup_seconds:.3f}s, health {health['status']})")
+    for label, latency in results.items():
+        print(f"after {idle_seconds:.1f}s idle, {label:15}: {latency:.3f}s")
+    print(f"TCP connections for warm-up + {n_requests} requests: {pooled}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load-seconds", type=float, default=2.0)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    run(args.load_seconds, args.requests, args.idle_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Sentence matching micro-benchmark: per-query extractOne vs SentenceIndex.
+
+Usage: python -m bench.bench_matching [--doc-sentences 10000] [--queries 1000]
+
+Queries are document sentences with small LLM-style edits (a dropped word,
+different quotes/case), so they go through the fuzzy path rather than the
+exact-match shortcut.
+"""
+import argparse
+import random
+import time
+
+from rapidfuzz import process
+
+from bench.corpus import ACTIONS, ACTORS, FILLER, OBJECTS
+from sentence_matching import SentenceIndex, normalize_text
+
+
+def make_document(n_sentences, seed=0):
+    rng = random.Random(seed)
+    sentences = []
+    for i in range(n_sentences):
+        if rng.random() < 0.5:
+            sentences.append(f"Le système doit permettre à {rng.choice(ACTORS)} de {rng.choice(ACTIONS)} "
+                             f"pour la {rng.choice(OBJECTS)} « ref {i} » dans un délai de {rng.randint(1, 90)} jours.")
+        else:
+            sentences.append(f"{rng.choice(FILLER)[:-1]} (article {i}).")
+    return sentences
+
+
+def perturb(sentence, rng):
+    words = sentence.split()
+    del words[rng.randrange(1, len(words) - 1)]
+    text = " ".join(words).replace("« ", '"').replace(" »", '"')  # as compaction sends it
+    return text.upper() if rng.random() < 0.1 else text
+
+
+def run(n_doc, n_queries, threshold=85):
+    rng = random.Random(1)
+    doc_sentences = make_document(n_doc)
+    doc_text = "\r".join(doc_sentences)
+    queries = [perturb(s, rng) for s in rng.sample(doc_sentences, n_queries)]
+
+    start = time.perf_counter()
+    index = SentenceIndex(doc_text)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = index.match_many(queries, threshold=threshold)
+    indexed_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baseline = [process.extractOne(normalize_text(q), index.sentences, score_cutoff=threshold) for q in queries]
+    baseline_time = time.perf_counter() - start
+
+    agree = sum(
+        1 for a, b in zip(indexed, baseline)
+        if (a is None) == (b is None) and (a is None or normalize_text(a[0]) == b[0])
+    )
+    print(f"document sentences : {len(index)}")
+    print(f"queries            : {n_queries}")
+    print(f"index build        : {build * 1000:.0f} ms")
+    print(f"SentenceIndex      : {indexed_time * 1000:.0f} ms, {sum(m is not None for m in indexed)} matched")
+    print(f"extractOne loop    : {baseline_time * 1000:.0f} ms, {sum(m is not None for m in baseline)} matched")
+    print(f"same best sentence : {agree}/{n_queries}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doc-sentences", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.doc_sentences, args.queries)
+
+
+if __name__ == "__main__":
+    main()
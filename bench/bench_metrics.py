@@ -0,0 +1,75 @@
+"""Overhead of the per-request metrics (metrics.RequestMetrics) on the extraction path.
+
+Usage: python -m bench.bench_metrics [--requests 2000] [--tokens 20000]
+
+- bookkeeping: one request's stages, LLM stats, summary() and observe().
+- streaming: integrated1.stream_llm_response over a zero-latency fake LLM,
+  metrics enabled vs disabled, i.e. the per-token cost.
+- exposition: rendering /metrics after all those observations.
+"""
+import argparse
+import json
+import time
+
+from bench.fake_llm import FakeOllama, install
+from metrics import RequestMetrics, registry
+
+
+def bookkeeping(n_requests):
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        metrics = RequestMetrics(enabled=True)
+        for stage in ("conversion", "extraction", "json_recovery"):
+            with metrics.stage(stage):
+                pass
+        metrics.first_token(0.25)
+        metrics.record_llm_stats({"done": True, "prompt_eval_count": 900, "prompt_eval_duration": 4e8,
+                                  "eval_count": 700, "eval_duration": 2.1e10, "load_duration": 1e6})
+        metrics.set(document_chars=12000, stories=12)
+        json.dumps(metrics.summary())
+        metrics.observe()
+    return (time.perf_counter() - start) / n_requests
+
+
+def streaming(n_tokens, enabled, repeats=5):
+    import integrated1
+
+    best = None
+    for _ in range(repeats):
+        metrics = RequestMetrics(enabled=enabled)
+        start = time.perf_counter()
+        for _ in integrated1.stream_llm_response("Le système doit permettre de payer.", metrics):
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / n_tokens
+
+
+def run(n_requests, n_tokens):
+    install(FakeOllama(reply={"text": "x" * (n_tokens * 4)}, tokens_per_second=0, token_chars=4))
+    per_request = bookkeeping(n_requests)
+    off = streaming(n_tokens, enabled=False)
+    on = streaming(n_tokens, enabled=True)
+    start = time.perf_counter()
+    text = registry.render()
+    render = time.perf_counter() - start
+
+    print(f"bookkeeping per request : {per_request * 1e6:8.1f} µs")
+    print(f"streaming per token     : {off * 1e9:8.0f} ns off, {on * 1e9:8.0f} ns on "
+          f"({(on - off) * 1e9:+.0f} ns/token)")
+    print(f"/metrics render         : {render * 1000:8.2f} ms ({len(text.splitlines())} lines)")
+    # A real generation runs at ~10-100 tokens/s, i.e. 10-100 ms per token.
+    print(f"overhead on a 1000-token, 30 s request: "
+          f"{(per_request + (on - off) * 1000) / 30 * 100:.4f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--tokens", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.requests, args.tokens)
+
+
+if __name__ == "__main__":
+    main()
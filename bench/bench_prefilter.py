@@ -0,0 +1,108 @@
+"""Requirement prefilter: keep-ratio, recall and extraction time on the synthetic corpus.
+
+Usage: python -m bench.bench_prefilter [--pages 100] [--thresholds 0.5,1,1.5,2,3] [--context 1]
+                                       [--min-recall 1.0] [--save-model prefilter_model.json]
+
+A full extraction (prefilter off) with bench.fake_llm.FakeOllama gives the
+source_sentence values the LLM returns; for every threshold the bench
+reports the share of the compacted text kept and the share of those
+sentences (and of the corpus' own requirement sentences) still inside the
+kept passages. The rules are then combined with the optional classifier,
+trained on a corpus generated with another seed. Finally the extraction is
+timed with the prefilter off and on at the default threshold (PREFILTER_THRESHOLD).
+
+The exit status is 1 when, at the default threshold, fewer than
+--min-recall of the full run's source sentences fall inside kept passages.
+"""
+import argparse
+import sys
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_llm import FakeOllama, install
+
+
+def _inside(sentences, text):
+    text = " ".join(text.split())
+    return sum(" ".join(s.split()) in text for s in sentences) / max(1, len(sentences))
+
+
+def labelled_units(pages, seed):
+    """Sentences of a compacted synthetic document with 1 for requirements, 0 otherwise."""
+    from compaction import compact_markdown, normalize_typography
+    from prefilter import _units
+
+    md_text, requirements = synthetic_markdown(pages, seed=seed, typography=True)
+    wanted = {normalize_typography(r) for r in requirements}
+    _, units = _units(compact_markdown(md_text))
+    return [text for _, _, _, text in units], [int(text in wanted) for _, _, _, text in units]
+
+
+def extract(md_text, prefilter, tps, eval_ms):
+    import integrated1
+
+    integrated1.PREFILTER_ENABLED = prefilter
+    fake = install(FakeOllama(tokens_per_second=tps, extract=True, prompt_eval_ms=eval_ms))
+    start = time.perf_counter()
+    stories = integrated1.extract_user_stories(md_text).get("user_stories", [])
+    return stories, time.perf_counter() - start, fake
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--thresholds", default="0.5,1,1.5,2,3")
+    parser.add_argument("--context", type=int, default=1, help="neighbouring sentences kept around a hit")
+    parser.add_argument("--tps", type=float, default=2000.0, help="fake LLM tokens per second")
+    parser.add_argument("--eval-ms", type=float, default=0.2, help="fake LLM prompt-eval cost per token")
+    parser.add_argument("--min-recall", type=float, default=1.0)
+    parser.add_argument("--save-model", help="write the trained classifier to this JSON file")
+    args = parser.parse_args()
+
+    from compaction import compact_markdown, normalize_typography
+    from prefilter import PREFILTER_THRESHOLD, Classifier, select_passages
+
+    md_text, requirements = synthetic_markdown(args.pages, typography=True)
+    requirements = [normalize_typography(r) for r in requirements]
+    compact = compact_markdown(md_text)
+    stories, full_time, fake = extract(md_text, False, args.tps, args.eval_ms)
+    sources = [s["source_sentence"] for s in stories if s.get("source_sentence")]
+    print(f"document: {args.pages} pages, {len(compact)} chars compacted, {len(requirements)} requirements, "
+          f"{len(sources)} source sentences from the full run")
+
+    start = time.perf_counter()
+    sentences, labels = labelled_units(max(10, args.pages // 2), seed=1)
+    classifier = Classifier.train(sentences, labels)
+    train_ms = (time.perf_counter() - start) * 1000
+    if args.save_model:
+        classifier.save(args.save_model)
+    print(f"classifier trained on {len(sentences)} sentences from another seed in {train_ms:.0f} ms")
+
+    print(f"\n{'scoring':10} {'threshold':>9} {'keep':>7} {'sources in':>11} {'reqs in':>8} {'time':>8}")
+    for scoring, model in (("rules", None), ("rules+clf", classifier)):
+        for threshold in (float(t) for t in args.thresholds.split(",")):
+            start = time.perf_counter()
+            kept, stats = select_passages(compact, threshold=threshold, context=args.context,
+                                          classifier=model or False)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{scoring:10} {threshold:9.1f} {stats['keep_ratio']:7.1%} {_inside(sources, kept):11.1%} "
+                  f"{_inside(requirements, kept):8.1%} {elapsed:6.0f} ms")
+
+    kept, stats = select_passages(compact, context=args.context, classifier=False)
+    recall = _inside(sources, kept)
+
+    full_prompt_tokens, full_calls = fake.prompt_tokens, fake.calls
+    stories, filtered_time, fake = extract(md_text, True, args.tps, args.eval_ms)
+    print(f"\nextraction, prefilter off: {full_time:6.2f}s, {full_calls} LLM calls, "
+          f"{full_prompt_tokens} prompt tokens, {len(sources)} stories")
+    print(f"extraction, prefilter on : {filtered_time:6.2f}s, {fake.calls} LLM calls, "
+          f"{fake.prompt_tokens} prompt tokens, {len(stories)} stories (threshold {PREFILTER_THRESHOLD})")
+
+    print(f"\nrecall check at threshold {PREFILTER_THRESHOLD}: {recall:.1%} of source sentences kept "
+          f"(minimum {args.min_recall:.0%}), keep-ratio {stats['keep_ratio']:.1%}")
+    if recall < args.min_recall:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Prompt tokens and prompt-eval time: legacy layout vs system-prefix layout, with and without compaction.
+
+Usage: python -m bench.bench_prompt [--pages 100,300,500] [--eval-ms 2.0] [--eval-quadratic 0.0002]
+
+The document is a synthetic cahier des charges with French typography and
+the noise MarkItDown leaves in real conversions: a linked table of contents,
+images, running headers/footers, page numbers, bold labels, escaped
+punctuation and tables. It is chunked like a real extraction and every chunk
+is sent in turn to bench.fake_llm.FakeOllama with its prefix cache on: the
+leading text a prompt shares with the previous one is not evaluated again.
+
+Prompt-eval time is modelled from the evaluated token counts (--eval-ms per
+token plus --eval-quadratic * n^2 for attention), so large documents do not
+need a real model or real sleeps.
+"""
+import argparse
+import re
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_llm import FakeOllama
+
+# The single user message used before the system-prefix layout: the instructions
+# came after the document, so no two chunks shared more than the opening sentence.
+LEGACY_TEMPLATE = """Voici un extrait d'un cahier des charges en français :
+
+{doc_text}
+
+{instructions}"""
+
+
+def noisy_markdown(pages):
+    """Synthetic Markdown dressed up like a MarkItDown conversion of a real Word document."""
+    md_text, requirements = synthetic_markdown(pages, typography=True)
+    toc = [f"[{n}. Exigences du module {n}\t{n + 2}](#_Toc{100000 + n})" for n in range(1, pages + 1)]
+    lines = ["![Logo du client](data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAA...)", "", "**Sommaire**", ""]
+    lines += toc + [""]
+    for line in md_text.splitlines():
+        match = re.match(r"## (\d+)\. (.*)", line)
+        if match:
+            page = int(match.group(1))
+            lines += [
+                "---", "", "Portail client – Cahier des charges v1.2", f"Page {page} sur {pages}", "",
+                f"## {page}\\. {match.group(2)}", "",
+                f"![Schéma du module {page}](media/image{page}.png)", "",
+                "| **Référence** | **Priorité** | **Lot** |  |",
+                "| --- | --- | --- | --- |",
+                f"| EX\\-{page:03d} | Haute | Lot {page % 3 + 1} |  |",
+                "|  |  |  |  |", "",
+            ]
+        else:
+            lines.append(re.sub(r"^(Remarque) :", r"**\1** :", line))
+    return "\n".join(lines), requirements
+
+
+def modelled_seconds(n_tokens, eval_ms, quadratic):
+    return (eval_ms * n_tokens + quadratic * n_tokens ** 2) / 1000.0
+
+
+def run_layout(chunks, layout, eval_ms, quadratic):
+    import integrated1
+
+    fake = FakeOllama(tokens_per_second=0, prefix_cache=True, num_ctx=10 ** 9)
+    seconds = 0.0
+    for chunk in chunks:
+        if layout == "legacy":
+            prompt = LEGACY_TEMPLATE.format(doc_text=chunk, instructions=integrated1.LLM_SYSTEM_PROMPT)
+            messages = [{"role": "user", "content": prompt}]
+        else:
+            messages = integrated1.build_messages(chunk)
+        for reply in fake.chat(model="fake", messages=messages, stream=True):
+            if reply.get("done"):
+                seconds += modelled_seconds(reply["prompt_eval_count"], eval_ms, quadratic)
+    return {"evaluated": fake.prompt_tokens, "cached": fake.cached_tokens, "seconds": seconds}
+
+
+def run(pages, eval_ms, quadratic):
+    from chunking import estimate_tokens, split_markdown
+    from compaction import compact_markdown, normalize_typography
+
+    md_text, requirements = noisy_markdown(pages)
+    start = time.perf_counter()
+    compact = compact_markdown(md_text)
+    compaction_ms = (time.perf_counter() - start) * 1000
+    kept = sum(normalize_typography(r) in compact for r in requirements) / max(1, len(requirements))
+
+    print(f"\n{pages} pages: {len(md_text)} chars, ~{estimate_tokens(md_text)} tokens raw; "
+          f"{len(compact)} chars, ~{estimate_tokens(compact)} tokens compacted "
+          f"({compaction_ms:.0f} ms, {kept:.0%} of requirements kept)")
+    print(f"  {'layout':28} {'chunks':>6} {'evaluated':>10} {'cached':>8} {'prompt eval':>12}")
+    baseline = None
+    for label, layout, text in (("legacy, raw", "legacy", md_text),
+                                ("system prefix, raw", "system", md_text),
+                                ("system prefix, compacted", "system", compact)):
+        chunks = split_markdown(text)
+        r = run_layout(chunks, layout, eval_ms, quadratic)
+        baseline = baseline or r["seconds"]
+        print(f"  {label:28} {len(chunks):6d} {r['evaluated']:10d} {r['cached']:8d} "
+              f"{r['seconds']:10.1f} s  ({r['seconds'] / baseline:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="100,300,500", help="comma-separated document sizes")
+    parser.add_argument("--eval-ms", type=float, default=2.0, help="modelled prompt-eval cost per token")
+    parser.add_argument("--eval-quadratic", type=float, default=0.0002,
+                        help="modelled attention cost, ms per token squared")
+    args = parser.parse_args()
+    for pages in (int(p) for p in args.pages.split(",")):
+        run(pages, args.eval_ms, args.eval_quadratic)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Debug-trace overhead on highlighting and extraction: off vs summary vs full.
+
+Usage: python -m bench.bench_trace [--pages 50] [--sentences 300] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_word import FakeWordDocument, word_text_from_markdown
+from debug_trace import DebugTrace
+
+
+def _best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(pages, n_sentences, repeat):
+    import integrated1
+    import realTime
+
+    md_text, requirements = synthetic_markdown(pages)
+    text = word_text_from_markdown(md_text)
+    sentences = requirements[:n_sentences]
+    colors = [7] * len(sentences)
+    reply = json.dumps({"user_stories": [{"story": f"En tant que client, {s}", "source_sentence": s}
+                                         for s in sentences]}, ensure_ascii=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def with_trace(level, func):
+            def call():
+                trace = DebugTrace(level=level, directory=tmp)
+                func(trace)
+                trace.flush()
+            return call
+
+        workloads = {
+            "highlight (Find loop)": lambda trace: realTime.highlight_sentences_in_doc(
+                FakeWordDocument(text), sentences, colors, trace=trace),
+            "highlight (batch)": lambda trace: realTime.highlight_sentences_batch(
+                FakeWordDocument(text), sentences, colors, trace=trace),
+            "parse_user_stories": lambda trace: integrated1.parse_user_stories(reply, trace=trace),
+        }
+        print(f"{'workload':24} {'off':>10} {'summary':>10} {'full':>10}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = []
+            for name, func in workloads.items():
+                timings = [_best_of(repeat, with_trace(level, func)) for level in ("off", "summary", "full")]
+                rows.append((name, timings))
+        for name, timings in rows:
+            print(f"{name:24} " + " ".join(f"{t * 1000:8.1f}ms" for t in timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.pages, args.sentences, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
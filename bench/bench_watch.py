@@ -0,0 +1,164 @@
+"""Watch mode: update latency after a single-paragraph edit vs highlighting the whole document again.
+
+Usage: python -m bench.bench_watch [--pages 300] [--com-call-ms 0.5]
+
+A realTime.DocumentWatcher highlights every requirement sentence of a
+synthetic document held by the fake Word document, then each scenario
+edits one paragraph in the middle of the document (as typed in Word) and
+polls until the debounce has passed. The update is compared with the only
+option before watch mode: realTime.highlight_sentences_batch over the whole
+edited document. Times are Python time plus the counted COM round-trips
+modelled at --com-call-ms.
+
+The document has a table of contents, tables and hyperlinks, so Range
+positions differ from Content.Text offsets. After every scenario the
+watched document's highlights must be the same as a full highlight of the
+edited text in a fresh document; the exit status is 1 otherwise. The one
+expected difference: a sentence edited away is only looked for in the
+edited paragraphs, where a full pass may move it to a similar sentence
+elsewhere ("kept" column).
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from bench.corpus import synthetic_markdown
+from bench.fake_word import FakeWordDocument, add_tables_and_fields, word_text_from_markdown
+
+
+def _paragraph_with(doc, needle):
+    """(start, end) of the paragraph containing ``needle`` nearest the middle of the document."""
+    middle = len(doc.text) // 2
+    pos = doc.text.find(needle, middle)
+    if pos < 0:
+        pos = doc.text.index(needle)
+    start = doc.text.rfind("\r", 0, pos) + 1
+    return start, doc.text.index("\r", pos)
+
+
+def scenarios(requirements):
+    """(label, edit) pairs; an edit takes the fake document and changes one paragraph."""
+    target = requirements[len(requirements) // 2]
+    typed = target.replace(" pour ", " poru ", 1)
+    moved = requirements[len(requirements) * 3 // 4]
+
+    def typo(doc):
+        start, _ = _paragraph_with(doc, target)
+        pos = doc.text.index(target, start) + target.index(" pour ")
+        doc.edit(pos, pos + 6, " poru ")
+
+    def rewrite(doc):
+        start, end = _paragraph_with(doc, typed)
+        doc.edit(start, end, "Ce paragraphe a été réécrit et ne contient plus d'exigence.")
+
+    def insert(doc):
+        start, _ = _paragraph_with(doc, "Le présent document")
+        doc.edit(start, start, "Rappel : " + moved + "\r")
+
+    return [("typo in a requirement", typo), ("paragraph rewritten", rewrite), ("paragraph inserted", insert)]
+
+
+def _kept_in_edit(text, watcher, spans):
+    """Pairs no longer in ``text`` as such that the watcher kept fuzzy-matched where a full pass did not."""
+    from sentence_matching import normalize_text
+
+    lowered = normalize_text(text).lower()
+    return [i for i, (full, watched) in enumerate(zip(spans, watcher.spans))
+            if watched is not None and watched != full and watched[2] < 100
+            and normalize_text(watcher.pairs[i][0]).lower() not in lowered]
+
+
+def _reference(doc, watcher, spans, kept):
+    """A fresh document highlighted as the full pass did, with the watcher's spans for ``kept``."""
+    import realTime
+
+    spans = list(spans)
+    for i in kept:
+        spans[i] = watcher.spans[i]
+    reference = FakeWordDocument(doc.text, field_codes=doc.field_codes)
+    word_doc = realTime.WordDocument(reference)
+    word_doc.text()
+    for (_, color), span in sorted(zip(watcher.pairs, spans), key=lambda item: item[1] or (-1,)):
+        if span is not None:
+            word_doc.highlight(span[0], span[1], color)
+    return reference
+
+
+def run(pages, com_call_ms, debounce):
+    import realTime
+    from sentence_matching import normalize_text
+
+    md_text, requirements = synthetic_markdown(pages)
+    text, field_codes = add_tables_and_fields(word_text_from_markdown(md_text))
+    colors = [7, 4, 3] * (len(requirements) // 3 + 1)
+    colors = colors[:len(requirements)]
+
+    def modelled(seconds, calls):
+        return (seconds + calls * com_call_ms / 1000) * 1000
+
+    doc = FakeWordDocument(text, field_codes=field_codes)
+    watcher = realTime.DocumentWatcher(doc, requirements, colors, debounce_seconds=debounce)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        watcher.start()
+    print(f"document: {pages} pages, {len(text)} chars, {text.count(chr(13))} paragraphs, "
+          f"{len(requirements)} sentences; first pass {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{doc.com_calls} COM calls")
+    print(f"COM round-trips modelled at {com_call_ms} ms, debounce {debounce} s\n")
+    print(f"{'edit':24} {'update':>10} {'COM':>5} {'poll':>8} {'full re-run':>12} {'COM':>6} {'speedup':>8} "
+          f"{'kept':>5}  same")
+
+    # rapidfuzz imports numpy on its first fuzzy match; a running watcher has paid that long ago
+    import numpy  # noqa: F401
+
+    ok = True
+    for label, edit in scenarios(requirements):
+        edit(doc)
+        calls = doc.com_calls
+        start = time.perf_counter()
+        assert watcher.poll(now=0.0) is None  # first sight of the edit: wait for the debounce
+        poll_seconds = time.perf_counter() - start
+        poll_calls = doc.com_calls - calls
+
+        calls = doc.com_calls
+        start = time.perf_counter()
+        stats = watcher.poll(now=debounce)
+        update_seconds = time.perf_counter() - start
+        update_calls = doc.com_calls - calls
+
+        fresh = FakeWordDocument(doc.text, field_codes=doc.field_codes)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            spans = realTime.highlight_sentences_batch(fresh, requirements, colors)
+            full_seconds = time.perf_counter() - start
+
+        # The full pass must have highlighted the ranges of the matched text, not shifted ones
+        matched = {normalize_text(doc.text[span[0]:span[1]]) for span in spans if span}
+        placed = all(normalize_text(fresh.Range(s, e).Text) in matched for s, e in fresh.highlights)
+        kept = _kept_in_edit(doc.text, watcher, spans)
+        reference = _reference(doc, watcher, spans, kept) if kept else fresh
+        same = placed and doc.highlighted_runs() == reference.highlighted_runs()
+        ok = ok and same and stats is not None
+        update_ms = modelled(update_seconds, update_calls)
+        full_ms = modelled(full_seconds, fresh.com_calls)
+        print(f"{label:24} {update_ms:7.1f} ms {update_calls:5d} {modelled(poll_seconds, poll_calls):5.1f} ms "
+              f"{full_ms:9.0f} ms {fresh.com_calls:6d} {full_ms / update_ms:7.0f}x {len(kept):5d}  "
+              f"{'yes' if same else 'NO'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--com-call-ms", type=float, default=0.5, help="modelled cost of one COM round-trip")
+    parser.add_argument("--debounce", type=float, default=1.0, help="seconds without edits before updating")
+    args = parser.parse_args()
+    if not run(args.pages, args.com_call_ms, args.debounce):
+        print("\nwatched highlights differ from a full highlight of the edited document")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Synthetic French specification ("cahier des charges") generator for the benchmarks."""
+import io
+import re
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+ACTORS = ["le client", "l'administrateur", "le gestionnaire de stock", "le vendeur", "l'utilisateur", "le comptable"]
+ACTIONS = [
+    "créer un compte utilisateur", "ajouter des produits à son panier", "payer en ligne avec une carte bancaire",
+    "mettre à jour les fiches produits", "exporter les factures au format PDF", "consulter l'historique des commandes",
+    "réinitialiser son mot de passe", "recevoir une notification par courriel", "filtrer le catalogue par catégorie",
+    "valider une commande fournisseur", "générer un rapport mensuel", "archiver les documents signés",
+]
+OBJECTS = ["commande", "facture", "fiche produit", "compte", "panier", "rapport", "contrat", "ticket"]
+FILLER = [
+    "Le présent document décrit le contexte général du projet et ses contraintes.",
+    "Cette section rappelle les définitions utilisées dans la suite du document.",
+    "Les montants sont exprimés en euros toutes taxes comprises.",
+    "Le prestataire s'engage à respecter la confidentialité des données transmises.",
+    "La maîtrise d'ouvrage est assurée par la direction des systèmes d'information.",
+    "Les délais indiqués courent à compter de la notification du marché.",
+    "Le planning prévisionnel figure en annexe du présent cahier des charges.",
+    "Toute modification du périmètre fera l'objet d'un avenant.",
+]
+# Only used with typography=True, so the plain corpus stays what the other benchmarks measured
+FILLER_TYPOGRAPHY = [
+    "Remarque : le terme \"utilisateur\" désigne toute personne authentifiée.",
+    "Le module \"Facturation\" est hors périmètre ; il fera l'objet d'un lot séparé.",
+    "Pourquoi un nouveau portail ? Parce que l'outil actuel n'est plus maintenu !",
+]
+MODALS = ["doit permettre à {actor} de", "devra permettre à {actor} de", "permet à {actor} de"]
+
+WORDS_PER_PAGE = 450
+
+
+def typeset(text, rng=None):
+    """French typography: curly apostrophes, « » or “ ” quotes, non-breaking spaces before : ; ! ?"""
+    text = text.replace("'", "\u2019")
+    if rng is None or rng.random() < 0.7:
+        text = re.sub(r'"([^"]*)"', "«\u00a0\\1\u00a0»", text)
+    else:
+        text = re.sub(r'"([^"]*)"', "\u201c\\1\u201d", text)
+    return re.sub(r" ([:;!?])", "\u00a0\\1", text)
+
+
+def requirement_sentence(rng, idx, typography=False):
+    actor = rng.choice(ACTORS)
+    modal = rng.choice(MODALS).format(actor=actor)
+    action = rng.choice(ACTIONS)
+    obj = rng.choice(OBJECTS)
+    if typography:
+        return typeset(f'Le système {modal} {action} pour la "{obj}" n° {idx}.', rng).replace("n° ", "n°\u00a0")
+    return f"Le système {modal} {action} pour la {obj} n°{idx}."
+
+
+def synthetic_markdown(pages, seed=0, requirements_per_page=4, typography=False):
+    """Return (markdown, requirement_sentences) for a document of roughly ``pages`` pages.
+
+    With ``typography`` the text uses French typesetting (« », “ ”, ’ and
+    non-breaking spaces), as real specifications written in Word do.
+    """
+    rng = random.Random(seed)
+    filler = [typeset(s, rng) for s in FILLER + FILLER_TYPOGRAPHY] if typography else FILLER
+    lines = ["# Cahier des charges", ""]
+    requirements = []
+    req_idx = 0
+    for page in range(1, pages + 1):
+        lines.append(f"## {page}. Exigences du module {page}")
+        lines.append("")
+        words = 0
+        paragraph = []
+        reqs_left = requirements_per_page
+        while words < WORDS_PER_PAGE:
+            if reqs_left and rng.random() < 0.3:
+                req_idx += 1
+                sentence = requirement_sentence(rng, req_idx, typography)
+                requirements.append(sentence)
+                reqs_left -= 1
+            else:
+                sentence = rng.choice(filler)
+            paragraph.append(sentence)
+            words += len(sentence.split())
+            if len(paragraph) >= rng.randint(3, 6):
+                lines.append(" ".join(paragraph))
+                lines.append("")
+                paragraph = []
+        if paragraph:
+            lines.append(" ".join(paragraph))
+            lines.append("")
+    return "\n".join(lines), requirements
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def docx_from_markdown(md_text, seed=0, words_per_run=4):
+    """Build a minimal .docx (bytes) with one paragraph per Markdown block.
+
+    Paragraphs are cut into runs of a few words with random bold/italic, the
+    way edited Word documents fragment text, so sentences span several runs.
+    """
+    rng = random.Random(seed)
+    body = []
+    for block in (b.strip() for b in md_text.split("\n\n")):
+        if not block:
+            continue
+        heading = block.startswith("#")
+        words = block.lstrip("#").strip().split(" ")
+        runs = []
+        for i in range(0, len(words), words_per_run):
+            text = " ".join(words[i:i + words_per_run]) + (" " if i + words_per_run < len(words) else "")
+            props = "<w:b/>" if heading or rng.random() < 0.15 else ("<w:i/>" if rng.random() < 0.1 else "")
+            rpr = f"<w:rPr>{props}<w:lang w:val=\"fr-FR\"/></w:rPr>"
+            runs.append(f'<w:r>{rpr}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>')
+        body.append("<w:p>" + "".join(runs) + "</w:p>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        "<w:body>" + "".join(body) + "<w:sectPr/></w:body></w:document>"
+    )
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("word/document.xml", document)
+    return output.getvalue()
@@ -0,0 +1,137 @@
+"""Deterministic stand-in for the Ollama chat API used by the benchmarks."""
+import os
+import json
+import re
+import threading
+import time
+
+CANNED_REPLY = {
+    "user_stories": [
+        {
+            "story": "En tant que client, je veux créer un compte utilisateur afin de passer commande.",
+            "source_sentence": "Le système doit permettre aux clients de créer un compte utilisateur.",
+        },
+        {
+            "story": "En tant qu'utilisateur, je veux ajouter des produits à mon panier afin de les acheter.",
+            "source_sentence": "Les utilisateurs doivent pouvoir ajouter des produits à leur panier.",
+        },
+    ]
+}
+
+
+REQUIREMENT_RE = re.compile(r"[^.!?\n]*\b(?:doit|devra|permet)\b[^.!?\n]*\.")
+
+
+class FakeOllama:
+    """Streams a canned JSON reply token by token at a fixed rate and counts calls.
+
+    With ``extract=True`` the reply is built from the prompt instead: every
+    requirement-like sentence of the document (the last message) visible in
+    the last ``num_ctx`` tokens of the prompt becomes a story, mimicking how
+    Ollama truncates an overlong prompt.
+    ``prompt_eval_ms`` and ``prompt_eval_quadratic`` model prompt processing.
+    With ``prefix_cache`` the leading part a prompt shares with the previous
+    one is not evaluated again, like Ollama reusing its KV cache.
+    """
+
+    def __init__(self, reply=None, tokens_per_second=200.0, token_chars=4, extract=False,
+                 num_ctx=4096, prompt_eval_ms=0.0, prompt_eval_quadratic=0.0, prefix_cache=False):
+        self.reply = json.dumps(reply or CANNED_REPLY, ensure_ascii=False)
+        self.token_interval = 1.0 / tokens_per_second if tokens_per_second else 0.0
+        self.token_chars = token_chars
+        self.extract = extract
+        self.num_ctx = num_ctx
+        self.prompt_eval_ms = prompt_eval_ms
+        self.prompt_eval_quadratic = prompt_eval_quadratic
+        self.prefix_cache = prefix_cache
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._last_prompt = ""
+        self._lock = threading.Lock()
+
+    def tokens(self, reply=None):
+        reply = self.reply if reply is None else reply
+        return [reply[i:i + self.token_chars] for i in range(0, len(reply), self.token_chars)]
+
+    def _prompt_text(self, messages):
+        return "\n".join(m.get("content", "") for m in messages or [])
+
+    def _build_reply(self, document):
+        visible = document[-int(self.num_ctx * 3.5):]
+        stories = [
+            {"story": f"En tant qu'utilisateur, je veux que {s.strip()[:60]}", "source_sentence": s.strip()}
+            for s in REQUIREMENT_RE.findall(visible)
+        ]
+        return json.dumps({"user_stories": stories}, ensure_ascii=False)
+
+    def _prompt_tokens(self, prompt):
+        """Tokens to evaluate for ``prompt`` (what Ollama reports as prompt_eval_count)."""
+        n_tokens = int(min(len(prompt) / 3.5, self.num_ctx))
+        with self._lock:
+            cached = 0
+            if self.prefix_cache:
+                shared = len(os.path.commonprefix([self._last_prompt, prompt]))
+                cached = min(int(shared / 3.5), n_tokens)
+                self._last_prompt = prompt
+            self.prompt_tokens += n_tokens - cached
+            self.cached_tokens += cached
+        return n_tokens - cached
+
+    def _prompt_eval_delay(self, n_tokens):
+        return (self.prompt_eval_ms * n_tokens + self.prompt_eval_quadratic * n_tokens ** 2) / 1000.0
+
+    def chat(self, model=None, messages=None, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        prompt = self._prompt_text(messages)
+        reply = self._build_reply(messages[-1].get("content", "")) if self.extract else self.reply
+        n_prompt = self._prompt_tokens(prompt)
+        delay = self._prompt_eval_delay(n_prompt)
+        if not stream:
+            time.sleep(delay + self.token_interval * len(self.tokens(reply)))
+            return {"message": {"content": reply}, "done": True}
+        return self._stream(reply, delay, n_prompt)
+
+    def _stream(self, reply, delay, n_prompt=0):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if delay:
+                time.sleep(delay)
+            tokens = self.tokens(reply)
+            eval_start = time.perf_counter()
+            for token in tokens:
+                if self.token_interval:
+                    time.sleep(self.token_interval)
+                yield {"message": {"content": token}, "done": False}
+            # Same statistics as Ollama's final chunk (durations in nanoseconds)
+            yield {"message": {"content": ""}, "done": True, "prompt_eval_count": n_prompt,
+                   "prompt_eval_duration": int(delay * 1e9), "eval_count": len(tokens),
+                   "eval_duration": int((time.perf_counter() - eval_start) * 1e9)}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def generate(self, model=None, prompt=None, **kwargs):
+        """Model load request (empty prompt) as sent by LLMClient.warm_up()."""
+        return {"model": model, "response": "", "done": True}
+
+    def ps(self):
+        return {"models": [{"model": "fake", "name": "fake"}]}
+
+
+def install(fake, use_cache=False, **client_kwargs):
+    """Route the LLM calls of integrated1 to ``fake`` through an LLMClient.
+
+    The result cache is switched off unless ``use_cache`` is set, so repeated
+    benchmark runs keep measuring the LLM path.
+    """
+    from llm_client import LLMClient, set_llm_client
+    from result_cache import result_cache
+    set_llm_client(LLMClient(model="fake", client=fake, **client_kwargs))
+    result_cache.enabled = use_cache
+    return fake
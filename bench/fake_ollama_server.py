@@ -0,0 +1,178 @@
+"""Local fake Ollama HTTP server (the subset of /api used by LLMClient).
+
+Simulates model residency: the first request after the model was unloaded
+pays ``load_seconds``, and the model stays loaded for the request's
+``keep_alive`` (or ``default_keep_alive`` when none is sent), like Ollama.
+Replies are produced by a FakeOllama and streamed as NDJSON, with the
+usual timing/token statistics on the final chunk.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.fake_llm import FakeOllama
+
+_DURATION_RE = re.compile(r"^(-?\d+(?:\.\d+)?)([smh]?)$")
+
+
+def parse_keep_alive(value, default):
+    """Seconds the model stays loaded; None means forever."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    match = _DURATION_RE.match(str(value).strip())
+    if not match:
+        return default
+    amount = float(match.group(1))
+    if amount < 0:
+        return None
+    return amount * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fake=None, load_seconds=1.0, default_keep_alive=300.0, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.fake = fake or FakeOllama()
+        self.load_seconds = load_seconds
+        self.default_keep_alive = default_keep_alive
+        self.loaded_until = 0.0  # monotonic deadline; None = forever
+        self.model_name = None
+        self.loads = 0
+        self.connections = 0
+        self.aborted = 0  # streams stopped because the client went away
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def is_loaded(self):
+        return self.loaded_until is None or time.monotonic() < self.loaded_until
+
+    def ensure_loaded(self, keep_alive):
+        """Load the model if needed; returns the load time paid by this request."""
+        with self._lock:
+            load = 0.0
+            if not self.is_loaded():
+                time.sleep(self.load_seconds)
+                self.loads += 1
+                load = self.load_seconds
+            seconds = parse_keep_alive(keep_alive, self.default_keep_alive)
+            self.loaded_until = None if seconds is None else time.monotonic() + seconds
+            return load
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            name = self.server.model_name
+            models = [{"name": name, "model": name}] if name and self.server.is_loaded() else []
+            self._send_json({"models": models})
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        body = self._read_json()
+        model = body.get("model", "")
+        self.server.model_name = model
+        start = time.perf_counter()
+        load = self.server.ensure_loaded(body.get("keep_alive"))
+        now = datetime.now(timezone.utc).isoformat()
+
+        if self.path == "/api/generate":
+            self._send_json({"model": model, "created_at": now, "response": "", "done": True,
+                             "load_duration": int(load * 1e9), "total_duration": int((time.perf_counter() - start) * 1e9)})
+            return
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        messages = body.get("messages", [])
+        stream = body.get("stream", True)
+        prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        eval_start = time.perf_counter()
+        if not stream:
+            reply = self.server.fake.chat(model=model, messages=messages, stream=False)
+            self._send_json({"model": model, "created_at": now, "message": reply["message"], "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        eval_count = 0
+        chunks = self.server.fake.chat(model=model, messages=messages, stream=True)
+        try:
+            for chunk in chunks:
+                content = chunk["message"]["content"]
+                if chunk.get("done"):
+                    break
+                eval_count += 1
+                self._write_chunk({"model": model, "created_at": now,
+                                   "message": {"role": "assistant", "content": content}, "done": False})
+        except (BrokenPipeError, ConnectionResetError):
+            # Like Ollama: the client closed the connection, stop generating
+            with self.server._lock:
+                self.server.aborted += 1
+            self.close_connection = True
+            return
+        finally:
+            chunks.close()
+        eval_duration = time.perf_counter() - eval_start
+        self._write_chunk({
+            "model": model, "created_at": now, "message": {"role": "assistant", "content": ""},
+            "done": True, "done_reason": "stop",
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": int(prompt_chars / 3.5) + 1,
+            "prompt_eval_duration": 0,
+            "eval_count": eval_count,
+            "eval_duration": int(eval_duration * 1e9),
+        })
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
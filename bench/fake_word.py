@@ -0,0 +1,298 @@
+"""In-memory stand-in for the Word COM object model, counting COM round-trips.
+
+Only the surface used by realTime is implemented. Every access to a
+capitalized attribute (property get/set or method lookup) counts as one
+cross-process COM call, which is what dominates real Word automation time.
+
+Range positions follow Word rather than Content.Text offsets: a table's
+end-of-cell or end-of-row mark ("\\r\\x07" in the text) is one position, and
+hidden field codes take positions but no text. With
+TextRetrievalMode.IncludeFieldCodes set, a range's Text has them, like Word.
+"""
+import bisect
+import random
+import re
+
+_RUN_RE = re.compile(rb"([^\x00])\1*")
+_CELL_MARK_RE = re.compile("\r\x07")
+
+
+class ComCounter:
+    def __init__(self):
+        self.calls = 0
+
+
+class _ComObject:
+    def __getattribute__(self, name):
+        if name[:1].isupper():
+            object.__getattribute__(self, "_counter").calls += 1
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[:1].isupper():
+            object.__getattribute__(self, "_counter").calls += 1
+        object.__setattr__(self, name, value)
+
+
+class FakeFind(_ComObject):
+    def __init__(self, rng):
+        object.__setattr__(self, "_counter", rng._counter)
+        object.__setattr__(self, "_rng", rng)
+
+    def Execute(self, FindText="", Forward=True, MatchCase=False, **kwargs):
+        rng = self._rng
+        doc = rng._doc
+        haystack = doc.text if MatchCase else doc.lowered
+        needle = (FindText if MatchCase else FindText.lower()).replace("^^", "^")
+        search_from = rng._end if rng._found else rng._start
+        idx = haystack.find(needle, doc._offset(search_from), doc._offset(rng._limit))
+        if idx < 0 or not needle:
+            return False
+        object.__setattr__(rng, "_start", doc._position(idx))
+        object.__setattr__(rng, "_end", doc._position(idx + len(needle) - 1) + 1)
+        object.__setattr__(rng, "_found", True)
+        return True
+
+
+class FakeTextRetrievalMode(_ComObject):
+    def __init__(self, counter):
+        object.__setattr__(self, "_counter", counter)
+        object.__setattr__(self, "IncludeFieldCodes", False)
+
+
+class FakeRange(_ComObject):
+    def __init__(self, doc, start, end):
+        object.__setattr__(self, "_counter", doc._counter)
+        object.__setattr__(self, "_doc", doc)
+        object.__setattr__(self, "_start", start)
+        object.__setattr__(self, "_end", end)
+        object.__setattr__(self, "_limit", doc._positions)
+        object.__setattr__(self, "_found", False)
+        object.__setattr__(self, "_mode", FakeTextRetrievalMode(doc._counter))
+
+    @property
+    def Text(self):
+        doc = self._doc
+        if object.__getattribute__(self._mode, "IncludeFieldCodes"):
+            return doc._coded()[0][doc._coded_index(self._start):doc._coded_index(self._end)]
+        return doc.text[doc._offset(self._start):doc._offset(self._end)]
+
+    @property
+    def TextRetrievalMode(self):
+        return self._mode
+
+    @property
+    def Start(self):
+        return self._start
+
+    @property
+    def End(self):
+        return self._end
+
+    @property
+    def Duplicate(self):
+        return FakeRange(self._doc, self._start, self._end)
+
+    @property
+    def Find(self):
+        return FakeFind(self)
+
+    @property
+    def HighlightColorIndex(self):
+        return self._doc.highlights.get((self._start, self._end), 0)
+
+    @HighlightColorIndex.setter
+    def HighlightColorIndex(self, color):
+        doc = self._doc
+        doc.highlights[(self._start, self._end)] = color
+        start, end = doc._offset(self._start), doc._offset(self._end)
+        doc.colors[start:end] = bytes([color]) * (end - start)
+
+    def MoveEnd(self, Unit=1, Count=1):
+        object.__setattr__(self, "_end", min(self._limit, self._end + Count))
+        return Count
+
+    def Collapse(self, Direction=0):
+        object.__setattr__(self, "_start", self._end)
+
+    def Move(self, Unit=1, Count=1):
+        pos = min(self._limit, self._end + Count)
+        object.__setattr__(self, "_start", pos)
+        object.__setattr__(self, "_end", pos)
+        return Count
+
+
+class FakeApplication(_ComObject):
+    def __init__(self, counter):
+        object.__setattr__(self, "_counter", counter)
+        object.__setattr__(self, "ScreenUpdating", True)
+
+
+class FakeWordDocument(_ComObject):
+    """Fake ``Word.Document``: paragraphs are separated by '\\r' like in Content.Text.
+
+    ``field_codes`` maps a text offset to the hidden field characters
+    (field code and its begin/separator/end marks) placed before it.
+    ``highlights`` logs every HighlightColorIndex assignment by range;
+    ``colors`` holds the resulting highlight of each text character and
+    follows the text through ``edit()``, as formatting does in Word.
+    """
+
+    def __init__(self, text, name="fake.docx", field_codes=None):
+        counter = ComCounter()
+        object.__setattr__(self, "_counter", counter)
+        object.__setattr__(self, "Name", name)
+        object.__setattr__(self, "TrackRevisions", True)
+        object.__setattr__(self, "Application", FakeApplication(counter))
+        object.__setattr__(self, "highlights", {})
+        self._set(text, bytearray(len(text)), dict(field_codes or {}))
+
+    def _set(self, text, colors, field_codes):
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "lowered", text.lower())
+        object.__setattr__(self, "colors", colors)
+        object.__setattr__(self, "field_codes", field_codes)
+        # Text offset of every Range position, plus the end; None while they are the same
+        starts = None
+        if field_codes or "\x07" in text:
+            events = sorted([(offset, 0) for offset in field_codes]
+                            + [(m.start(), 1) for m in _CELL_MARK_RE.finditer(text)])
+            starts = []
+            pos = 0
+            for offset, is_mark in events:
+                starts.extend(range(pos, offset))
+                if is_mark:
+                    starts.append(offset)
+                    pos = offset + 2
+                else:
+                    starts.extend([offset] * len(field_codes[offset]))
+                    pos = offset
+            starts.extend(range(pos, len(text) + 1))
+        object.__setattr__(self, "_starts", starts)
+        object.__setattr__(self, "_positions", len(text) if starts is None else len(starts) - 1)
+        object.__setattr__(self, "_coded_text", None)
+
+    def _coded(self):
+        """The text with field codes included, and the Range position of each table mark in it."""
+        if self._coded_text is None:
+            pieces, previous = [], 0
+            for offset in sorted(self.field_codes):
+                pieces += [self.text[previous:offset], self.field_codes[offset]]
+                previous = offset
+            pieces.append(self.text[previous:])
+            coded = "".join(pieces)
+            marks = [m.start() - k for k, m in enumerate(_CELL_MARK_RE.finditer(coded))]
+            object.__setattr__(self, "_coded_text", (coded, marks))
+        return self._coded_text
+
+    def _coded_index(self, position):
+        """Index in the coded text of Range position ``position``: a table mark is one position for two characters."""
+        return position + bisect.bisect_left(self._coded()[1], position)
+
+    def _offset(self, position):
+        """Text offset of Range position ``position``."""
+        return position if self._starts is None else self._starts[min(position, self._positions)]
+
+    def _position(self, offset):
+        """Range position of the text character at ``offset``."""
+        return offset if self._starts is None else bisect.bisect_right(self._starts, offset) - 1
+
+    @property
+    def com_calls(self):
+        return self._counter.calls
+
+    def set_text(self, text):
+        """Simulate an edit made in Word (not a COM call)."""
+        self._set(text, bytearray(len(text)), {})
+
+    def edit(self, start, end, new_text):
+        """Simulate typing ``new_text`` over text offsets ``start:end`` in Word (not a COM call).
+
+        Typed characters take the highlight of the character before them,
+        like text typed at the end of a highlighted word. Fields inside the
+        replaced text are deleted with it.
+        """
+        inherited = self.colors[start - 1] if 0 < start <= len(self.colors) else 0
+        colors = self.colors[:start] + bytes([inherited]) * len(new_text) + self.colors[end:]
+        text = self.text[:start] + new_text + self.text[end:]
+        delta = len(new_text) - (end - start)
+        field_codes = {offset if offset <= start else offset + delta: code
+                       for offset, code in self.field_codes.items() if offset <= start or offset >= end}
+        self._set(text, colors, field_codes)
+
+    def highlighted_runs(self):
+        """``(start, end, color)`` for every run of highlighted text characters."""
+        return [(m.start(), m.end(), m.group()[0]) for m in _RUN_RE.finditer(bytes(self.colors))]
+
+    def AcceptAllRevisions(self):
+        pass
+
+    @property
+    def Content(self):
+        return FakeRange(self, 0, self._positions)
+
+    def Range(self, Start=0, End=None):
+        return FakeRange(self, Start, self._positions if End is None else End)
+
+
+def word_text_from_markdown(md_text):
+    """Turn bench Markdown into Word-like Content.Text (one '\\r' per paragraph)."""
+    paragraphs = [p.strip().lstrip("#").strip() for p in md_text.split("\n\n") if p.strip()]
+    return "\r".join(paragraphs) + "\r"
+
+
+def add_tables_and_fields(text, seed=0, table_every=7, link_every=5):
+    """Give Word-like ``text`` the structures whose Range positions differ from text offsets.
+
+    Adds a table of contents (a TOC field whose entries hold HYPERLINK and
+    PAGEREF fields) at the top, turns every ``table_every``-th paragraph into
+    a two-cell table row and puts a HYPERLINK field around a word in the
+    middle of every ``link_every``-th paragraph. Returns ``(text,
+    field_codes)`` for FakeWordDocument.
+    """
+    rng = random.Random(seed)
+    paragraphs = text.split("\r")[:-1]
+    field_codes = {}
+    out = []
+    length = 0
+
+    def field(offset, code):
+        field_codes[offset] = field_codes.get(offset, "") + "\x13" + code + "\x14"
+
+    def field_end(offset):
+        field_codes[offset] = field_codes.get(offset, "") + "\x15"
+
+    headings = [p for p in paragraphs if p[:1].isdigit() and "Exigences" in p][:20]
+    for i, heading in enumerate(headings):
+        if i == 0:
+            field(length, ' TOC \\o "1-3" \\h \\z \\u ')
+        field(length, f' HYPERLINK \\l "_Toc{1000 + i}" ')
+        entry = f"{heading}\t{i + 3}"
+        field(length + len(heading) + 1, f" PAGEREF _Toc{1000 + i} \\h ")
+        field_end(length + len(entry))
+        field_end(length + len(entry))
+        out.append(entry + "\r")
+        length += len(entry) + 1
+    if headings:
+        field_end(length - 1)  # the TOC field ends before its last paragraph mark
+
+    for i, paragraph in enumerate(paragraphs):
+        if i % link_every == link_every - 1:
+            words = [m.start() for m in re.finditer(r"(?<= )\w{4,}(?= )", paragraph)]
+            if words:
+                at = words[len(words) // 2]
+                word_end = paragraph.index(" ", at)
+                field(length + at, f' HYPERLINK "https://intranet.example/{rng.randint(1, 999)}" ')
+                field_end(length + word_end)
+        if i % table_every == table_every - 1:
+            row = f"Réf. {i}\r\x07{paragraph}\r\x07\r\x07"
+            # The cell text starts after the first cell; offsets of the fields above move with it
+            shift = len(f"Réf. {i}\r\x07")
+            for offset in sorted((o for o in field_codes if o >= length), reverse=True):
+                field_codes[offset + shift] = field_codes.pop(offset)
+            out.append(row)
+            length += len(row)
+        else:
+            out.append(paragraph + "\r")
+            length += len(paragraph) + 1
+    return "".join(out), field_codes
@@ -0,0 +1,264 @@
+"""End-to-end benchmark suite: conversion, extraction, matching and the /process-docx/ endpoint.
+
+Usage:
+    python -m bench.suite [--pages 1,10,100,500] [--quick] [--output bench_results.json]
+    python -m bench.suite --compare baseline.json [--tolerance 0.2]
+
+Documents are synthetic French cahiers des charges (.docx and Markdown)
+with French typography (« », “ ”, ’, non-breaking spaces). The LLM is the
+deterministic bench.fake_llm.FakeOllama streaming its JSON at --tps tokens
+per second, and the result cache is off. Every scenario runs in a fresh
+process so its peak RSS is its own.
+
+Results (p50/p95/mean latency, throughput, peak RSS) are written as JSON.
+With --compare, the new results are checked against a stored baseline and
+the exit status is 1 when a latency, throughput or memory figure is worse
+by more than --tolerance.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench.corpus import docx_from_markdown, synthetic_markdown
+from bench.fake_word import word_text_from_markdown
+
+SCENARIOS = ("conversion", "extraction", "matching", "endpoint")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (0 < q <= 100)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # KiB on Linux
+
+
+def llm_style(sentence):
+    """What the LLM typically returns as source_sentence: straight quotes and apostrophes, plain spaces."""
+    return (sentence.replace("\u2019", "'").replace("\u00ab\u00a0", '"').replace("\u00a0\u00bb", '"')
+            .replace("\u201c", '"').replace("\u201d", '"').replace("\u00a0", " "))
+
+
+# ---------- Scenarios ----------
+# Each returns the latency of every operation in seconds plus extra fields; throughput
+# is ops / total latency unless the scenario reports its own "wall_s" (concurrent load).
+
+def bench_conversion(pages, repeats, **_):
+    import integrated1
+
+    md_text, _ = synthetic_markdown(pages, typography=True)
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"cahier_{pages}p.docx")
+        with open(path, "wb") as f:
+            f.write(docx_from_markdown(md_text))
+        integrated1.convert_to_markdown(path, save_md=False)  # warm-up: loads MarkItDown's converters
+        for _ in range(repeats):
+            start = time.perf_counter()
+            converted, _ = integrated1.convert_to_markdown(path, save_md=False)
+            latencies.append(time.perf_counter() - start)
+        size = os.path.getsize(path)
+    return latencies, {"docx_bytes": size, "markdown_chars": len(converted)}
+
+
+def bench_extraction(pages, repeats, tps, **_):
+    import integrated1
+    from bench.fake_llm import FakeOllama, install
+
+    md_text, requirements = synthetic_markdown(pages, typography=True)
+    fake = install(FakeOllama(tokens_per_second=tps, extract=True))
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stories = integrated1.extract_user_stories(md_text).get("user_stories", [])
+        latencies.append(time.perf_counter() - start)
+    found = {llm_style(s["source_sentence"]) for s in stories}
+    recall = sum(llm_style(r) in found for r in requirements) / max(1, len(requirements))
+    return latencies, {"llm_calls": fake.calls // repeats, "stories": len(stories), "recall": round(recall, 3)}
+
+
+def bench_matching(pages, repeats, **_):
+    from sentence_matching import SentenceIndex
+
+    md_text, requirements = synthetic_markdown(pages, typography=True)
+    doc_text = word_text_from_markdown(md_text)
+    queries = [llm_style(r) for r in requirements]
+    SentenceIndex(doc_text).match_many(queries[:10])  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        matches = SentenceIndex(doc_text).match_many(queries)
+        latencies.append(time.perf_counter() - start)
+    matched = sum(m is not None for m in matches)
+    return latencies, {"queries": len(queries), "matched": matched}
+
+
+def bench_endpoint(pages, requests, concurrency, tps, **_):
+    import httpx
+
+    import backend_api
+    from bench.fake_llm import FakeOllama, install
+    from worker_pool import JobLimiter
+
+    md_text, _ = synthetic_markdown(pages, typography=True)
+    docx = docx_from_markdown(md_text)
+    install(FakeOllama(tokens_per_second=tps, extract=True))
+    backend_api.job_limiter = JobLimiter(max_concurrent=concurrency, max_queued=requests)
+
+    async def one(client):
+        start = time.perf_counter()
+        response = await client.post("/process-docx/", files={"file": ("cahier.docx", docx)})
+        assert response.status_code == 200 and "user_stories" in response.text, response.status_code
+        return time.perf_counter() - start
+
+    async def load():
+        transport = httpx.ASGITransport(app=backend_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def bounded():
+                async with semaphore:
+                    return await one(client)
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*[bounded() for _ in range(requests)])
+            return latencies, time.perf_counter() - start
+
+    latencies, wall = asyncio.run(load())
+    return latencies, {"concurrency": concurrency, "wall_s": round(wall, 4)}
+
+
+def _run_scenario(name, params):
+    func = globals()[f"bench_{name}"]
+    latencies, extra = func(**params)
+    wall = extra.get("wall_s") or sum(latencies)
+    result = {
+        "ops": len(latencies),
+        "p50_s": round(percentile(latencies, 50), 6),
+        "p95_s": round(percentile(latencies, 95), 6),
+        "mean_s": round(sum(latencies) / len(latencies), 6),
+        "throughput_ops_s": round(len(latencies) / wall, 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    result.update(extra)
+    return result
+
+
+def run_isolated(name, params):
+    """Run one scenario in a fresh interpreter so peak RSS is not shared between scenarios."""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_scenario, name, params).result()
+
+
+def run(args):
+    page_sizes = [1, 10] if args.quick else [int(p) for p in args.pages.split(",")]
+    plan = []
+    for pages in page_sizes:
+        repeats = args.repeats if pages <= 100 else 1
+        for name in ("conversion", "extraction", "matching"):
+            if name in args.scenarios:
+                plan.append((f"{name}/{pages}p", name, {"pages": pages, "repeats": repeats, "tps": args.tps}))
+    if "endpoint" in args.scenarios:
+        plan.append((f"endpoint/{args.endpoint_pages}p/c{args.concurrency}", "endpoint", {
+            "pages": args.endpoint_pages, "requests": args.requests, "concurrency": args.concurrency,
+            "tps": args.tps}))
+
+    results = {}
+    for key, name, params in plan:
+        results[key] = run_isolated(name, params)
+        r = results[key]
+        print(f"{key:28} p50 {r['p50_s'] * 1000:9.1f} ms  p95 {r['p95_s'] * 1000:9.1f} ms  "
+              f"{r['throughput_ops_s']:8.2f} ops/s  rss {r['peak_rss_mb']} MB", flush=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"results written to {args.output}")
+    return report
+
+
+# Metric -> True when higher is better
+COMPARED = {"p50_s": False, "p95_s": False, "throughput_ops_s": True, "peak_rss_mb": False}
+
+
+def compare(report, baseline, tolerance):
+    """Print the change of every compared metric; returns the list of regressions."""
+    regressions = []
+    print(f"\n{'scenario':28} {'metric':18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, current in report["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            print(f"{key:28} (not in baseline)")
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            if flag:
+                regressions.append((key, metric, old, new))
+            print(f"{key:28} {metric:18} {old:12.4f} {new:12.4f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1,10,100,500", help="comma-separated document sizes")
+    parser.add_argument("--quick", action="store_true", help="only 1 and 10 pages")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda s: [name for name in s.split(",") if name])
+    parser.add_argument("--repeats", type=int, default=3, help="runs per scenario (1 above 100 pages)")
+    parser.add_argument("--tps", type=float, default=2000.0, help="fake LLM tokens per second")
+    parser.add_argument("--requests", type=int, default=16, help="endpoint: number of uploads")
+    parser.add_argument("--concurrency", type=int, default=4, help="endpoint: concurrent clients")
+    parser.add_argument("--endpoint-pages", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    report = run(args)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nno regression")
+
+
+if __name__ == "__main__":
+    main()
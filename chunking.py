@@ -0,0 +1,94 @@
+import os
+import re
+
+# ---------- Configuration ----------
+# Rough token budget of the document part of one prompt (qwen3 context is shared with the answer).
+CHUNK_TOKEN_BUDGET = int(os.environ.get("CHUNK_TOKEN_BUDGET", "1500"))
+# Tokens of trailing context repeated at the start of the next chunk.
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "100"))
+# French text averages a little under 4 characters per token with the qwen tokenizer.
+CHARS_PER_TOKEN = 3.5
+
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate, good enough for budgeting prompts."""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _blocks(md_text):
+    """Split markdown into paragraph-level blocks, keeping headings as their own block."""
+    blocks = []
+    current = []
+    for line in md_text.splitlines():
+        if _HEADING_RE.match(line) or not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            if line.strip():
+                blocks.append(line)
+        else:
+            current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_oversized(block, budget):
+    """Break a block larger than the budget along sentence boundaries."""
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_SPLIT_RE.split(block):
+        candidate = f"{current} {sentence}".strip()
+        if current and estimate_tokens(candidate) > budget:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_markdown(md_text, token_budget=CHUNK_TOKEN_BUDGET, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Split markdown into token-budgeted chunks on heading/paragraph boundaries.
+
+    The last blocks of each chunk (up to ``overlap_tokens``) are repeated at
+    the start of the next one so a requirement straddling the boundary is
+    seen whole at least once.
+    """
+    blocks = []
+    for block in _blocks(md_text):
+        if estimate_tokens(block) > token_budget:
+            blocks.extend(_split_oversized(block, token_budget))
+        else:
+            blocks.append(block)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    fresh = 0  # blocks in the current chunk that are not overlap
+    for block in blocks:
+        block_tokens = estimate_tokens(block)
+        if fresh and current_tokens + block_tokens > token_budget:
+            chunks.append("\n\n".join(current))
+            # Carry over trailing blocks as overlap
+            overlap = []
+            overlap_size = 0
+            for prev in reversed(current):
+                prev_tokens = estimate_tokens(prev)
+                if overlap_size + prev_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, prev)
+                overlap_size += prev_tokens
+            current = overlap
+            current_tokens = overlap_size
+            fresh = 0
+        current.append(block)
+        current_tokens += block_tokens
+        fresh += 1
+    if fresh:
+        chunks.append("\n\n".join(current))
+    return chunks or [md_text]
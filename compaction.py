@@ -0,0 +1,92 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+
+# ---------- Configuration ----------
+PROMPT_COMPACTION = os.environ.get("PROMPT_COMPACTION", "1") != "0"
+# Bumped whenever the output of compact_markdown() changes (part of the extraction cache key).
+COMPACTION_VERSION = "1"
+# A short line seen this many times is a running header/footer, not content.
+BOILERPLATE_MIN_REPEATS = 3
+BOILERPLATE_MAX_CHARS = 80
+
+# French typography normalized once, before the text is sent to the LLM. Quotes
+# and apostrophes become what the model writes back anyway; sentence_matching
+# maps the same characters and drops the spaces inside guillemets too, so
+# highlighting is unaffected.
+_TYPOGRAPHY = str.maketrans({
+    "\xa0": " ", "\u202f": " ", "\u2009": " ",  # nbsp, narrow nbsp, thin space
+    "’": "'", "‘": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "\xad": None,
+})
+_GUILLEMETS_RE = re.compile(r"\u00ab\s*|\s*\u00bb")
+
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)|<img\b[^>]*>", re.I)
+_TOC_LINK_RE = re.compile(r"\[[^\]]*\]\(#_Toc[^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_HTML_TAG_RE = re.compile(r"</?(?:br|span|div|p|u|sup|sub|font)\b[^>]*>", re.I)
+_EMPHASIS_RE = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_ESCAPE_RE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|<>])")
+
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?(\s*:?-+:?\s*\|)+\s*(:?-+:?\s*)?$")
+_RULE_RE = re.compile(r"^([-*_])(\s*\1){2,}$")
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*\d+(?:\s*(?:/|sur|of)\s*\d+)?|\d+\s*(?:/|sur)\s*\d+)$", re.I)
+_DOT_LEADER_RE = re.compile(r"(?:\.{4,}|\u2026{2,})\s*\d+$")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+
+def normalize_typography(text):
+    text = unicodedata.normalize("NFC", text).translate(_TYPOGRAPHY)
+    return _GUILLEMETS_RE.sub('"', text)
+
+
+def _table_row(line):
+    """A Markdown table row as plain cells: "| a |  | b |" -> "a | b"."""
+    cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+    return " | ".join(cell for cell in cells if cell)
+
+
+def compact_markdown(md_text):
+    """Strip what costs prompt tokens without carrying requirements.
+
+    Removes images, link targets, table of contents entries, HTML leftovers,
+    bold markers, Markdown escapes, table pipes and separator rows, horizontal
+    rules, page numbers and repeated short lines (running headers/footers);
+    collapses whitespace and normalizes typography. Headings and paragraph
+    breaks are kept, since chunking splits on them.
+    """
+    text = normalize_typography(md_text)
+    text = _HTML_COMMENT_RE.sub("", text)
+    text = _IMAGE_RE.sub("", text)
+    text = _TOC_LINK_RE.sub("", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _EMPHASIS_RE.sub(r"\2", text)
+
+    lines = []  # (line, is_table_row)
+    for line in text.splitlines():
+        line = _SPACES_RE.sub(" ", line).strip()
+        table_row = line.startswith("|")
+        if table_row:
+            if _TABLE_SEPARATOR_RE.match(line):
+                continue
+            line = _table_row(line)
+        elif _RULE_RE.match(line) or _PAGE_NUMBER_RE.match(line) or _DOT_LEADER_RE.search(line):
+            continue
+        lines.append((_ESCAPE_RE.sub(r"\1", line), table_row))
+
+    # Repeated short lines are headers/footers; headings, sentences and table cells are kept
+    counts = Counter(line for line, table_row in lines if not table_row)
+    kept = []
+    for line, table_row in lines:
+        boilerplate = (line and not table_row and counts[line] >= BOILERPLATE_MIN_REPEATS
+                       and len(line) <= BOILERPLATE_MAX_CHARS
+                       and not line.startswith("#") and not line.endswith((".", "!", "?")))
+        if boilerplate:
+            continue
+        if not line and (not kept or not kept[-1]):
+            continue  # at most one blank line between blocks
+        kept.append(line)
+    return "\n".join(kept).strip()
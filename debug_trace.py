@@ -0,0 +1,80 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+import contextlib
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+# off: nothing recorded (default) | summary: one record per step | full: also raw texts
+DEBUG_TRACE_LEVEL = os.environ.get("DEBUG_TRACE_LEVEL", "off")
+DEBUG_TRACE_DIR = os.environ.get("DEBUG_TRACE_DIR", "debug_traces")
+
+LEVELS = {"off": 0, "summary": 1, "full": 2}
+# Request ids become file names; anything else (e.g. "../x" from X-Request-ID) gets a fresh id
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class DebugTrace:
+    """Per-request debug trace buffered in memory and written once as JSON lines.
+
+    Records are only built when the trace level allows them, and the file
+    (``<DEBUG_TRACE_DIR>/<request_id>.jsonl``) is opened a single time on
+    flush(), so concurrent requests never share or clobber a log file.
+    """
+
+    def __init__(self, request_id=None, level=None, directory=None):
+        if not request_id or not _REQUEST_ID_RE.fullmatch(request_id):
+            request_id = uuid.uuid4().hex[:12]
+        self.request_id = request_id
+        self.level = LEVELS.get(level or DEBUG_TRACE_LEVEL, 0)
+        self.directory = directory or DEBUG_TRACE_DIR
+        self._records = []
+        self._lock = threading.Lock()
+
+    def enabled(self, level="summary"):
+        """True when records of ``level`` are kept; use it to skip building costly fields."""
+        return self.level >= LEVELS[level]
+
+    def event(self, name, level="summary", **fields):
+        """Record one step; a no-op below the configured level."""
+        if self.level < LEVELS[level]:
+            return
+        record = {"ts": round(time.time(), 6), "request_id": self.request_id, "event": name}
+        record.update(fields)
+        with self._lock:
+            self._records.append(record)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{self.request_id}.jsonl")
+
+    def flush(self):
+        """Append the buffered records to this request's file in one write."""
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+        except OSError as e:
+            logger.warning("Could not write debug trace %s: %s", self.path, str(e))
+
+
+@contextlib.contextmanager
+def ensure_trace(trace=None):
+    """Yield ``trace``, or a fresh one that is flushed on exit when none was given."""
+    if trace is not None:
+        yield trace
+        return
+    trace = DebugTrace()
+    try:
+        yield trace
+    finally:
+        trace.flush()
@@ -0,0 +1,279 @@
+import io
+import os
+import copy
+import bisect
+import logging
+import zipfile
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from sentence_matching import locate_sentences
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+HIGHLIGHT_WORKERS = int(os.environ.get("HIGHLIGHT_WORKERS", "0")) or None  # None: one per CPU
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+W = "{%s}" % W_NS
+DOCUMENT_PART = "word/document.xml"
+
+# WdColorIndex values (what get_word_color_constant returns) -> w:highlight values
+HIGHLIGHT_VALUES = {
+    1: "black",
+    2: "blue",
+    3: "cyan",
+    4: "green",
+    5: "magenta",
+    6: "red",
+    7: "yellow",
+    8: "white",
+    9: "darkBlue",
+    10: "darkCyan",
+    11: "darkGreen",
+    12: "darkMagenta",
+    13: "darkRed",
+    14: "darkYellow",
+    15: "darkGray",
+    16: "lightGray",
+}
+
+# Not part of the main story text Word returns from Content.Text: deleted revisions
+# (the COM path accepts all revisions first), text boxes and duplicate fallback markup.
+_SKIP = {W + "del", W + "moveFrom", W + "txbxContent", "{%s}Fallback" % MC_NS}
+# Run children that carry text, and the character Word reports for the non-w:t ones
+_RUN_CHARS = {W + "t": None, W + "tab": "\t", W + "br": "\v", W + "cr": "\v"}
+# w:rPr children that must come after w:highlight (CT_RPr is an ordered sequence)
+_AFTER_HIGHLIGHT = {W + name for name in (
+    "u", "effect", "bdr", "shd", "fitText", "vertAlign", "rtl", "cs", "em", "lang",
+    "eastAsianLayout", "specVanish", "oMath", "rPrChange",
+)}
+
+
+def _paragraphs(element):
+    for child in element:
+        if child.tag == W + "p":
+            yield child
+        elif child.tag not in _SKIP:
+            yield from _paragraphs(child)
+
+
+def _runs(element):
+    for child in element:
+        if child.tag == W + "r":
+            yield child
+        elif child.tag not in _SKIP:
+            yield from _runs(child)
+
+
+def _child_text(child):
+    text = _RUN_CHARS.get(child.tag, "")
+    return (child.text or "") if text is None else text
+
+
+def document_text(body):
+    """Main-story text of ``body`` with "\\r" between paragraphs, like Word's Content.Text.
+
+    Also returns the text segments as ``(start, run, child)`` tuples sorted by
+    start, one per text-bearing run child, to map offsets back to the XML.
+    """
+    parts = []
+    segments = []
+    pos = 0
+    for paragraph in _paragraphs(body):
+        for run in _runs(paragraph):
+            for child in run:
+                text = _child_text(child)
+                if text:
+                    segments.append((pos, run, child))
+                    parts.append(text)
+                    pos += len(text)
+        parts.append("\r")
+        pos += 1
+    return "".join(parts), segments
+
+
+def _set_highlight(run, value):
+    rpr = run.find(W + "rPr")
+    if rpr is None:
+        rpr = etree.SubElement(run, W + "rPr")
+        run.insert(0, rpr)
+    highlight = rpr.find(W + "highlight")
+    if highlight is None:
+        highlight = etree.SubElement(rpr, W + "highlight")
+        for i, child in enumerate(rpr):
+            if child.tag in _AFTER_HIGHLIGHT:
+                rpr.insert(i, highlight)
+                break
+    highlight.set(W + "val", value)
+
+
+def _split_run(run, coverage):
+    """Replace ``run`` by one run per content piece; returns the new runs.
+
+    ``coverage`` maps a child of ``run`` to ``[(lo, hi, value), ...]`` ranges
+    within that child's text to highlight; later ranges win on overlap.
+    """
+    rpr = run.find(W + "rPr")
+    parent = run.getparent()
+    index = parent.index(run)
+    new_runs = []
+
+    def new_run(value):
+        # SubElement reuses the document's "w" prefix instead of redeclaring the namespace
+        piece = etree.SubElement(parent, run.tag, attrib=dict(run.attrib))
+        parent.insert(index + len(new_runs), piece)
+        if rpr is not None:
+            piece.append(copy.deepcopy(rpr))
+        if value:
+            _set_highlight(piece, value)
+        new_runs.append(piece)
+        return piece
+
+    for child in list(run):
+        if child is rpr:
+            continue
+        ranges = coverage.get(child)
+        text = _child_text(child)
+        if child.tag != W + "t" or not ranges:
+            value = None
+            for lo, hi, v in ranges or ():
+                if lo <= 0 and hi >= len(text):
+                    value = v
+            new_run(value).append(child)
+            continue
+        cuts = sorted({0, len(text)} | {lo for lo, _, _ in ranges} | {hi for _, hi, _ in ranges})
+        for lo, hi in zip(cuts, cuts[1:]):
+            value = None
+            for a, b, v in ranges:
+                if a <= lo and hi <= b:
+                    value = v
+            t = etree.SubElement(new_run(value), W + "t")
+            t.text = text[lo:hi]
+            t.set(XML_SPACE, "preserve")
+
+    parent.remove(run)
+    return new_runs
+
+
+def _text_only(run):
+    children = [child for child in run if child.tag != W + "rPr"]
+    return len(children) == 1 and children[0].tag == W + "t"
+
+
+def _merge_runs(runs):
+    """Merge adjacent text-only runs among ``runs`` that share the same formatting."""
+    previous = None
+    for run in runs:
+        if run.getparent() is None:
+            continue
+        if (previous is not None and previous.getnext() is run and _text_only(previous) and _text_only(run)
+                and previous.attrib == run.attrib
+                and _rpr_key(previous) == _rpr_key(run)):
+            t = previous.find(W + "t")
+            t.text = (t.text or "") + (run.find(W + "t").text or "")
+            t.set(XML_SPACE, "preserve")
+            run.getparent().remove(run)
+            continue
+        previous = run
+
+
+def _rpr_key(run):
+    rpr = run.find(W + "rPr")
+    return b"" if rpr is None else etree.tostring(rpr)
+
+
+def highlight_document_xml(xml, sentences, color_consts, threshold=85):
+    """Highlight sentences in a ``word/document.xml``; returns (xml bytes, spans).
+
+    Sentences are located with the same normalization and matching as the COM
+    batch path (``locate_sentences`` over the paragraph text). Runs that a
+    match only partly covers are split at the match boundaries, the covered
+    pieces get ``w:highlight``, and pieces left with identical formatting are
+    merged back together.
+    """
+    root = etree.fromstring(xml)
+    body = root.find(W + "body")
+    text, segments = document_text(body)
+    starts = [start for start, _, _ in segments]
+
+    # Deduplicate sentences while keeping each one's colour
+    pairs = list(dict.fromkeys(zip(sentences, color_consts)))
+    spans = locate_sentences(text, [sentence for sentence, _ in pairs], threshold=threshold)
+
+    coverage = {}  # run -> {child: [(lo, hi, value)]}
+    for (_, color), span in zip(pairs, spans):
+        if span is None:
+            continue
+        start, end, _ = span
+        value = HIGHLIGHT_VALUES.get(color, "yellow")
+        i = max(0, bisect.bisect_right(starts, start) - 1)
+        while i < len(segments) and segments[i][0] < end:
+            seg_start, run, child = segments[i]
+            seg_end = seg_start + len(_child_text(child))
+            if seg_end > start:
+                lo, hi = max(start, seg_start) - seg_start, min(end, seg_end) - seg_start
+                coverage.setdefault(run, {}).setdefault(child, []).append((lo, hi, value))
+            i += 1
+
+    touched = []
+    for run, by_child in coverage.items():
+        content = [child for child in run if _child_text(child)]
+        whole = [
+            ranges[-1][2] for child in content
+            for ranges in [by_child.get(child)]
+            if ranges and len(ranges) == 1 and ranges[0][:2] == (0, len(_child_text(child)))
+        ]
+        if len(whole) == len(content) and len(set(whole)) == 1:
+            # Fully covered by a single match: no need to split
+            _set_highlight(run, whole[0])
+            touched.append(run)
+        else:
+            touched.extend(_split_run(run, by_child))
+    _merge_runs(touched)
+
+    matched = sum(span is not None for span in spans)
+    logger.debug("OOXML highlight: %d/%d sentence(s) matched, %d run(s) touched", matched, len(pairs), len(touched))
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True), spans
+
+
+def highlight_docx(docx, sentences, color_consts, threshold=85):
+    """Return a copy of a .docx (bytes or path) with the sentences highlighted, as bytes.
+
+    Headless alternative to ``realTime.highlight_sentences_batch``: no Word
+    instance, only ``word/document.xml`` is rewritten, every other part is
+    copied unchanged.
+    """
+    source = io.BytesIO(docx) if isinstance(docx, (bytes, bytearray)) else docx
+    output = io.BytesIO()
+    with zipfile.ZipFile(source) as zin, zipfile.ZipFile(output, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            if item.filename == DOCUMENT_PART:
+                data, _ = highlight_document_xml(data, sentences, color_consts, threshold)
+            zout.writestr(item, data)
+    return output.getvalue()
+
+
+def _highlight_job(job, threshold):
+    docx, sentences, color_consts = job
+    return highlight_docx(docx, sentences, color_consts, threshold)
+
+
+def highlight_docx_many(jobs, workers=HIGHLIGHT_WORKERS, threshold=85):
+    """Highlight many documents in a process pool.
+
+    ``jobs`` is a list of ``(docx, sentences, color_consts)``; returns the
+    highlighted .docx bytes in the same order.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    if workers == 1 or len(jobs) == 1:
+        return [_highlight_job(job, threshold) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(functools.partial(_highlight_job, threshold=threshold), jobs))
@@ -1,146 +1,415 @@
+import io
 import os
 import json
 import re
+import time
 import logging
-import win32com.client as win32
-import numpy as np
-from markitdown import MarkItDown
-import ollama
-import realTime
-from rapidfuzz import process
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from chunking import estimate_tokens, split_markdown
+from compaction import COMPACTION_VERSION, PROMPT_COMPACTION, compact_markdown
+from prefilter import PREFILTER_ENABLED, select_passages
+from result_cache import result_cache, sha256_hex
+from debug_trace import ensure_trace
+from metrics import GENERATIONS_CANCELLED, RequestMetrics
+from llm_client import get_llm_client
+from llm_scheduler import GenerationCancelled, RequestContext, llm_scheduler
 
 # ---------- Logging ----------
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-if not hasattr(np, "float"):
-    np.float = float
+# Number of chunks of one document sent to the LLM at the same time.
+EXTRACTION_FAN_OUT = int(os.environ.get("EXTRACTION_FAN_OUT", "2"))
+
+# Heavy dependencies (MarkItDown and its models, rapidfuzz, lxml) are imported by
+# the functions that use them, so importing this module (and backend_api) stays
+# cheap and works on Linux. Highlighting in a running Word is in word_app.
+
+class ExtractionError(Exception):
+    """An LLM call failed or its reply held no usable JSON (raised with ``strict=True`` only)."""
+
 
 # ---------- Utilities ----------
+@functools.lru_cache(maxsize=8)
+def sentence_index(doc_text):
+    """Normalized, split and indexed doc_text; built once per distinct text."""
+    from sentence_matching import SentenceIndex
+    return SentenceIndex(doc_text)
+
+
 def fuzzy_find(sentence, doc_text, threshold=85):
     """Find closest fuzzy match of a sentence in doc_text."""
-    match, score, _ = process.extractOne(sentence, doc_text.split("."))
-    if score >= threshold:
-        return match
+    match = sentence_index(doc_text).match(sentence, threshold=threshold)
+    if match:
+        return match[0]
     return None
 
 
 # ---------- LLM prompt ----------
-LLM_PROMPT_TEMPLATE = """Voici un extrait d'un cahier des charges en français :
-
-{doc_text}
+# The instructions go first, as a system message identical for every request,
+# so Ollama keeps their evaluated prefix in its KV cache from one prompt (or
+# chunk) to the next and only the document part is evaluated again.
+LLM_SYSTEM_PROMPT = """Tu reçois un extrait d'un cahier des charges en français.
 
 Ta tâche :
 1. Extrait les *user stories* du texte.
 2. Pour chaque user story, indique la phrase originale du cahier des charges que tu as utilisée.
 3. Donne la sortie en JSON structuré avec le format suivant :
 
-{{
+{
   "user_stories": [
-    {{
+    {
       "story": "En tant que [utilisateur], je veux [objectif] afin de [raison].",
       "source_sentence": "..."
-    }}
+    }
   ]
-}}
+}
 
-IMPORTANT : Réponds UNIQUEMENT avec du JSON valide. 
+IMPORTANT : Réponds UNIQUEMENT avec du JSON valide.
 Utilise exactement la phrase du cahier des charges comme source_sentence sans la modifier.
-Assure-toi que tous les caractères spéciaux, comme le backslash (\), soient correctement échappés (ex. \\).
+Assure-toi que tous les caractères spéciaux, comme le backslash (\\), soient correctement échappés (ex. \\\\).
 N’ajoute pas de texte, pas d’explications, pas de code block Markdown.
-La sortie doit commencer par {{ et se terminer par }}.
+La sortie doit commencer par { et se terminer par }.
 """
+LLM_USER_PROMPT_TEMPLATE = """Voici un extrait d'un cahier des charges en français :
+
+{doc_text}
+
+Réponds uniquement avec le JSON demandé."""
+
+
+def build_messages(text):
+    """Chat messages for one extraction: static system prompt, then the document."""
+    return [
+        {"role": "system", "content": LLM_SYSTEM_PROMPT},
+        {"role": "user", "content": LLM_USER_PROMPT_TEMPLATE.format(doc_text=text)},
+    ]
+
+
+def prepare_document(md_text, trace=None, metrics=None):
+    """The Markdown actually sent to the LLM, prepared once per document.
+
+    Compacts it (see compaction.compact_markdown) unless PROMPT_COMPACTION is
+    off, then keeps only the requirement-like passages (see
+    prefilter.select_passages) when PREFILTER is on. The estimated token
+    counts and the prefilter keep-ratio go to the trace and request metrics.
+    """
+    metrics = metrics or RequestMetrics(enabled=False)
+    text = md_text
+    if PROMPT_COMPACTION:
+        with metrics.stage("compaction"):
+            text = compact_markdown(text)
+    if PREFILTER_ENABLED:
+        with metrics.stage("prefilter"):
+            text, stats = select_passages(text)
+        metrics.set(prefilter_keep_ratio=stats["keep_ratio"])
+        if trace is not None:
+            trace.event("prefilter", **stats)
+        logger.debug("Prefilter kept %d/%d sentence(s), %.0f%% of the text",
+                     stats["kept_units"], stats["units"], 100.0 * stats["keep_ratio"])
+    if text is md_text:
+        return md_text
+    before, after = estimate_tokens(md_text), estimate_tokens(text)
+    metrics.set(document_tokens_raw=before, document_tokens=after)
+    if trace is not None:
+        trace.event("document_prepared", chars_before=len(md_text), chars_after=len(text),
+                    tokens_before=before, tokens_after=after)
+    logger.debug("Prompt preparation: ~%d -> ~%d document tokens (%.0f%% saved)",
+                 before, after, 100.0 * (before - after) / before)
+    return text
+
+
+def extraction_key(text):
+    """Cache key of an extraction: document text + model/format + prompt + compaction."""
+    client = get_llm_client()
+    prompt = LLM_SYSTEM_PROMPT + LLM_USER_PROMPT_TEMPLATE + (COMPACTION_VERSION if PROMPT_COMPACTION else "")
+    return sha256_hex("\0".join([client.model, client.format or "", sha256_hex(prompt), text]))
 
 
 # ---------- DOCX → Markdown ----------
-def convert_to_markdown(docx_path):
-    """Convert a Word .docx file to markdown text + save .md file."""
-    md = MarkItDown()
+def _markitdown():
+    """A MarkItDown converter; its import (magika, numpy, ...) happens on the first conversion."""
+    import numpy as np
+    if not hasattr(np, "float"):
+        np.float = float
+    from markitdown import MarkItDown
+    return MarkItDown()
+
+
+def convert_to_markdown(docx_path, save_md=True):
+    """Convert a Word .docx file to markdown text (+ save .md file unless save_md is False)."""
+    md = _markitdown()
     result = md.convert(docx_path)
+    if not save_md:
+        return result.text_content, None
     output_file = os.path.splitext(docx_path)[0] + ".md"
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(result.text_content)
     return result.text_content, output_file
 
 
+def _as_buffered_stream(stream, in_memory_limit=1024 * 1024):
+    """MarkItDown wants an io.BufferedIOBase; adapt e.g. a SpooledTemporaryFile without copying large files."""
+    if isinstance(stream, io.BufferedIOBase):
+        return stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size <= in_memory_limit:
+        return io.BytesIO(stream.read())
+    # Large upload: read it through a duplicate of the (already auto-deleted) temp file's descriptor
+    buffered = os.fdopen(os.dup(stream.fileno()), "rb")
+    buffered.seek(0)
+    return buffered
+
+
+def convert_stream_to_markdown(stream, file_extension=".docx"):
+    """Convert a binary file-like object (e.g. an upload) to markdown text, without a .md side-file."""
+    md = _markitdown()
+    buffered = _as_buffered_stream(stream)
+    try:
+        result = md.convert_stream(buffered, file_extension=file_extension)
+    finally:
+        if buffered is not stream:
+            buffered.close()
+    return result.text_content
+
+
 # ---------- LLM Extraction ----------
-def stream_llm_response(text):
-    """Stream the LLM's thinking process."""
-    prompt = LLM_PROMPT_TEMPLATE.format(doc_text=text)
-    stream = ollama.chat(
-        model="qwen3:1.7b",
-        messages=[{"role": "user", "content": prompt}],
-        stream=True
-    )
-
-    raw_reply = ""
-    for chunk in stream:
-        delta = chunk.get("message", {}).get("content", "")
-        raw_reply += delta
-        yield delta
-    
+def stream_llm_response(text, metrics=None, context=None):
+    """Stream the LLM's thinking process.
+
+    Waits for a model slot from the LLM scheduler first. Cancelling ``context``
+    aborts the stream at once, even while the prompt is still being evaluated
+    (the connection is shut down, which makes Ollama stop), and
+    GenerationCancelled is raised.
+    """
+    metrics = metrics or RequestMetrics(enabled=False)
+    context = context or RequestContext()
+    queued = time.perf_counter()
+    with llm_scheduler.slot(context):
+        metrics.add_stage("llm_queue", time.perf_counter() - queued)
+        start = time.perf_counter()
+        stream = get_llm_client().chat_stream(build_messages(text))
+        context.on_cancel(stream.abort)
+        raw_reply = ""
+        try:
+            for chunk in stream:
+                delta = chunk.get("message", {}).get("content", "")
+                if delta and not raw_reply:
+                    metrics.first_token(time.perf_counter() - start)
+                if chunk.get("done"):
+                    metrics.record_llm_stats(chunk)
+                raw_reply += delta
+                yield delta
+            if stream.aborted:
+                GENERATIONS_CANCELLED.inc(stage="running")
+                context.check()
+        finally:
+            context.remove_callback(stream.abort)
+            stream.close()
+
     return raw_reply
 
-def extract_user_stories(text):
-    """Call LLM to extract user stories from text."""
-    log_file = "llm_extraction_debug.log"
-    with open(log_file, "w", encoding="utf-8") as f:
-        f.write("=== LLM Extraction Debug Log ===\n\n")
-    
-    def log_debug(msg):
-        logger.debug(msg)
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"{msg}\n")
-    
-    try:
-        log_debug("1. Starting LLM request...")
-        
-        # Get the complete response
-        raw_reply = "".join([chunk for chunk in stream_llm_response(text)])
-
-        log_debug("\n2. Raw LLM response received:")
-        log_debug("-" * 40)
-        log_debug(raw_reply)
-        log_debug("-" * 40)
-
-        # sanitize JSON escapes
-        sanitized_reply = re.sub(r'(?<!\\)\\(?![\\/"bfnrt])', r'\\\\', raw_reply)
-        log_debug("\n3. After JSON escape sanitization:")
-        log_debug("-" * 40)
-        log_debug(sanitized_reply)
-        log_debug("-" * 40)
-
-        # extract JSON block - look for proper JSON structure
-        match = re.search(r'{\s*"[^"]+"\s*:[\s\S]*}', sanitized_reply)
-        if not match:
-            error_msg = "No valid JSON object found in LLM response"
-            log_debug(f"\n4. ERROR: {error_msg}")
-            raise ValueError(error_msg)
-
-        clean_json = match.group(0).strip()
-        
-        log_debug("\n4. Extracted and cleaned JSON:")
-        log_debug("-" * 40)
-        log_debug(clean_json)
-        log_debug("-" * 40)
-
-        # Try to parse JSON and log any issues
+
+_BAD_ESCAPE_RE = re.compile(r'(?<!\\)\\(?![\\/"bfnrt])')
+_JSON_BLOCK_RE = re.compile(r'{\s*"[^"]+"\s*:[\s\S]*}')
+
+
+def parse_user_stories(raw_reply, trace=None, strict=False):
+    """Recover the user_stories JSON from an already-collected raw LLM reply.
+
+    An unusable reply gives no stories, or raises ExtractionError with ``strict``.
+    """
+    with ensure_trace(trace) as trace:
         try:
-            parsed = json.loads(clean_json)
-            log_debug("\n5. Successfully parsed JSON!")
-            return parsed
-        except json.JSONDecodeError as e:
-            log_debug(f"\n5. JSON Parse Error!")
-            log_debug(f"Error position: line {e.lineno}, column {e.colno}")
-            log_debug(f"Error message: {str(e)}")
-            log_debug(f"Character at error position: {clean_json[e.pos:e.pos+10]}...")
-            raise
-    except Exception as e:
-        logger.error("Error extracting user stories: %s", str(e))
-        return {"user_stories": []}
+            trace.event("llm_reply", chars=len(raw_reply))
+            trace.event("llm_reply_raw", level="full", text=raw_reply)
+
+            # sanitize JSON escapes
+            sanitized_reply = _BAD_ESCAPE_RE.sub(r'\\\\', raw_reply)
+            trace.event("escape_sanitization", level="full", text=sanitized_reply)
+
+            # extract JSON block - look for proper JSON structure
+            match = _JSON_BLOCK_RE.search(sanitized_reply)
+            if not match:
+                error_msg = "No valid JSON object found in LLM response"
+                trace.event("json_block_missing", error=error_msg)
+                raise ValueError(error_msg)
+
+            clean_json = match.group(0).strip()
+            trace.event("json_block", chars=len(clean_json))
+            trace.event("json_block_text", level="full", text=clean_json)
+
+            # Try to parse JSON and log any issues
+            try:
+                parsed = json.loads(clean_json)
+                trace.event("json_parsed", stories=len(parsed.get("user_stories", [])) if isinstance(parsed, dict) else 0)
+                return parsed
+            except json.JSONDecodeError as e:
+                trace.event(
+                    "json_parse_error",
+                    error=str(e),
+                    line=e.lineno,
+                    column=e.colno,
+                    context=clean_json[e.pos:e.pos + 10],
+                )
+                raise
+        except Exception as e:
+            if strict:
+                raise ExtractionError(f"unusable LLM reply: {e}") from e
+            logger.error("Error extracting user stories: %s", str(e))
+            return {"user_stories": []}
+
+
+def _normalize_source(sentence):
+    return " ".join(sentence.split()).casefold()
+
+
+def _story_key(story):
+    return _normalize_source(story.get("source_sentence", "")) or _normalize_source(story.get("story", ""))
+
+
+def merge_user_stories(partials):
+    """Merge per-chunk user_stories lists, dropping duplicates on source_sentence."""
+    merged = []
+    seen = set()
+    for stories in partials:
+        for story in stories:
+            key = _story_key(story)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(story)
+    return merged
+
+
+def _extract_chunk(chunk, trace, metrics, context):
+    """Stories of one chunk, possibly none; raises when the LLM call or its reply failed."""
+    key = extraction_key(chunk)
+    cached = result_cache.get("chunk_stories", key)
+    if cached is not None:
+        trace.event("chunk_cache_hit", key=key)
+        return cached
+    raw_reply = "".join([delta for delta in stream_llm_response(chunk, metrics, context)])
+    with metrics.stage("json_recovery"):
+        stories = parse_user_stories(raw_reply, trace=trace, strict=True).get("user_stories", [])
+    # Most chunks of a specification hold no requirement: that answer is worth keeping too
+    result_cache.set("chunk_stories", key, stories)
+    return stories
+
+
+def iter_chunked_extraction(text, fan_out=EXTRACTION_FAN_OUT, chunks=None, trace=None, metrics=None,
+                            context=None, strict=False):
+    """Extract user stories chunk by chunk, running up to ``fan_out`` chunks in parallel.
+
+    Yields ``("story", {...})`` for each story not seen in an earlier chunk,
+    then ``("progress", {...})``, as every chunk finishes; finally
+    ``("result", {"user_stories": [...]})`` with the merged, de-duplicated
+    list in document order. Raises GenerationCancelled once ``context`` is
+    cancelled; chunks not started yet are dropped. A failed chunk is logged
+    and skipped, its progress event carrying the ``error``, or raises
+    ExtractionError with ``strict``.
+    """
+    metrics = metrics or RequestMetrics(enabled=False)
+    context = context or RequestContext()
+    with ensure_trace(trace) as trace:
+        chunks = chunks if chunks is not None else split_markdown(text)
+        trace.event("chunked_extraction", chunks=len(chunks), fan_out=fan_out)
+        partials = [[] for _ in chunks]
+        emitted = set()
+        with ThreadPoolExecutor(max_workers=max(1, fan_out)) as pool:
+            futures = {pool.submit(_extract_chunk, chunk, trace, metrics, context): idx
+                       for idx, chunk in enumerate(chunks)}
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    idx = futures[future]
+                    progress = {"chunk": idx + 1, "done": done, "total": len(chunks)}
+                    try:
+                        partials[idx] = future.result()
+                    except GenerationCancelled:
+                        trace.event("extraction_cancelled", done=done - 1, total=len(chunks))
+                        raise
+                    except Exception as e:
+                        logger.error("Error extracting chunk %d: %s", idx + 1, str(e))
+                        trace.event("chunk_error", chunk=idx + 1, error=str(e))
+                        if strict:
+                            raise ExtractionError(f"chunk {idx + 1}/{len(chunks)}: {e}") from e
+                        progress["error"] = str(e)
+                    for story in partials[idx]:
+                        key = _story_key(story)
+                        if key not in emitted:
+                            emitted.add(key)
+                            yield "story", story
+                    progress["stories"] = len(partials[idx])
+                    yield "progress", progress
+            finally:
+                # Cancelled or abandoned by the consumer: do not start the remaining chunks
+                for future in futures:
+                    future.cancel()
+        merged = merge_user_stories(partials)
+        trace.event("chunks_merged", stories=len(merged), before_dedup=sum(len(p) for p in partials))
+        yield "result", {"user_stories": merged}
+
+
+def extract_user_stories(text, fan_out=EXTRACTION_FAN_OUT, trace=None, metrics=None, context=None,
+                         strict=False):
+    """Call LLM to extract user stories from text, chunking large documents.
+
+    Failures give an empty list, or raise ExtractionError with ``strict``.
+    """
+    metrics = metrics or RequestMetrics(enabled=False)
+    with ensure_trace(trace) as trace:
+        text = prepare_document(text, trace, metrics)
+        key = extraction_key(text)
+        cached = result_cache.get("stories", key)
+        if cached is not None:
+            trace.event("extraction_cache_hit", key=key)
+            return cached
+
+        trace.event("extraction_start", chars=len(text))
+        chunks = split_markdown(text)
+        if len(chunks) > 1:
+            result = {"user_stories": []}
+            failed = 0
+            for kind, payload in iter_chunked_extraction(text, fan_out=fan_out, chunks=chunks, trace=trace,
+                                                         metrics=metrics, context=context, strict=strict):
+                if kind == "result":
+                    result = payload
+                elif kind == "progress" and "error" in payload:
+                    failed += 1
+            if failed:
+                # Stories of the other chunks only: not cached, the next run asks again for the missing ones
+                trace.event("extraction_incomplete", failed_chunks=failed, total=len(chunks))
+                return result
+        else:
+            try:
+                # Get the complete response
+                raw_reply = "".join([chunk for chunk in stream_llm_response(text, metrics, context)])
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                logger.error("Error extracting user stories: %s", str(e))
+                trace.event("llm_error", error=str(e))
+                if strict:
+                    raise ExtractionError(f"LLM call failed: {e}") from e
+                return {"user_stories": []}
+            with metrics.stage("json_recovery"):
+                try:
+                    result = parse_user_stories(raw_reply, trace=trace, strict=True)
+                except ExtractionError as e:
+                    if strict:
+                        raise
+                    logger.error("Error extracting user stories: %s", str(e))
+                    return {"user_stories": []}
+
+        result_cache.set("stories", key, result)
+        return result
+
 
 # ---------- Word Highlighting ----------
 def get_word_color_constant(name):
@@ -164,22 +433,25 @@ def get_word_color_constant(name):
     return color_map.get(name, 7)
 
 
-def rehighlight_in_word(docx_path, stories):
-    """Re-highlight sentences inside a Word document."""
-    try:
-        sentences = [us["source_sentence"] for us in stories if us.get("source_sentence")]
-        color_consts = [
-            get_word_color_constant(us.get("color_name", "wdYellow"))
-            for us in stories
-        ]
+def highlight_targets(stories):
+    """Sentences to highlight and their Word colour constants."""
+    stories = [us for us in stories if us.get("source_sentence")]
+    sentences = [us["source_sentence"] for us in stories]
+    color_consts = [
+        get_word_color_constant(us.get("color_name", "wdYellow"))
+        for us in stories
+    ]
+    return sentences, color_consts
+
+
+def rehighlight_docx(docx, stories):
+    """Highlight the stories' source sentences in a .docx (bytes or path) without Word.
 
-        word = realTime.get_word_app()
-        doc = realTime.open_doc_in_word(docx_path)
-        realTime.highlight_sentences_in_doc(doc, sentences, color_consts)
-        return True
-    except Exception as e:
-        logger.error("Word highlighting error: %s", str(e))
-        return False
+    Returns the highlighted document as bytes.
+    """
+    from docx_highlight import highlight_docx
+    sentences, color_consts = highlight_targets(stories)
+    return highlight_docx(docx, sentences, color_consts)
 
 
 # ---------- Example usage ----------
@@ -188,6 +460,7 @@ if __name__ == "__main__":
     if os.path.exists(test_file):
         md_text, _ = convert_to_markdown(test_file)
         stories = extract_user_stories(md_text)
+        from word_app import rehighlight_in_word
         rehighlight_in_word(test_file, stories.get("user_stories", []))
         print(json.dumps(stories, indent=2, ensure_ascii=False))
     else:
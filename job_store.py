@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_DAYS", "7")) * 86400
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+INTERRUPTED = "interrupted"  # the server stopped while the job was queued or running
+FINISHED = (DONE, FAILED, INTERRUPTED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    error TEXT,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobNotFoundError(KeyError):
+    """Raised for an unknown job id."""
+
+
+class JobStore:
+    """SQLite-backed store for extraction jobs and their event log.
+
+    Each job keeps an ordered list of events numbered 1, 2, ... which is what
+    SSE clients resume from with ``Last-Event-ID``. The final result is
+    written together with its terminal event in one transaction, so a reader
+    never sees a finished job with a missing result.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, retention_seconds=JOB_RETENTION_SECONDS):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recover(self):
+        """Startup housekeeping: close jobs orphaned by a restart and drop expired ones."""
+        now = time.time()
+        message = "Server restarted before the job finished"
+        with self._lock, self._conn:
+            orphans = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))]
+            for job_id in orphans:
+                self._append(job_id, "error", {"error": message})
+                self._conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                                   (INTERRUPTED, message, now, job_id))
+            expired = 0
+            if self.retention_seconds:
+                expired = self._conn.execute(
+                    "DELETE FROM jobs WHERE updated_at < ?", (now - self.retention_seconds,)
+                ).rowcount
+        if orphans or expired:
+            logger.info("Job store: %d interrupted job(s), %d expired job(s) removed", len(orphans), expired)
+
+    def create(self, source=None):
+        """Register a new queued job and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, source, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, source, now, now),
+            )
+        return job_id
+
+    def set_status(self, job_id, status):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                               (status, time.time(), job_id))
+
+    def _append(self, job_id, event, data):
+        seq = self._conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+        self._conn.execute(
+            "INSERT INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+            (job_id, seq, event, json.dumps(data, ensure_ascii=False)),
+        )
+        return seq
+
+    def append_event(self, job_id, event, data):
+        """Append one event to the job's log; returns its sequence number."""
+        with self._lock, self._conn:
+            return self._append(job_id, event, data)
+
+    def finish(self, job_id, result=None, error=None):
+        """Store the outcome and its terminal ``result``/``error`` event atomically."""
+        status = FAILED if error else DONE
+        with self._lock, self._conn:
+            self._append(job_id, "error" if error else "result", {"error": error} if error else result)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, result = ?, updated_at = ? WHERE id = ?",
+                (status, error, None if error else json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        """Job summary as a dict, with the decoded result when finished."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def events_after(self, job_id, after=0):
+        """Return ``(status, [(seq, event, data), ...])`` for events newer than ``after``."""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise JobNotFoundError(job_id)
+            rows = self._conn.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return row["status"], [(r["seq"], r["event"], json.loads(r["data"])) for r in rows]
@@ -0,0 +1,217 @@
+import os
+import time
+import queue
+import logging
+import threading
+import contextlib
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+LLM_MODEL = os.environ.get("LLM_MODEL", "qwen3:1.7b")
+LLM_HOST = os.environ.get("OLLAMA_HOST") or None  # None: ollama's default (localhost:11434)
+LLM_KEEP_ALIVE = os.environ.get("LLM_KEEP_ALIVE", "30m")  # how long Ollama keeps the model loaded
+LLM_NUM_CTX = int(os.environ.get("LLM_NUM_CTX", "0")) or None
+LLM_NUM_PREDICT = int(os.environ.get("LLM_NUM_PREDICT", "0")) or None
+LLM_FORMAT = os.environ.get("LLM_FORMAT", "")  # "json" to constrain the reply to JSON
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "600"))
+# Health checks use their own connection with this timeout, so a hung server fails them fast
+LLM_HEALTH_TIMEOUT = float(os.environ.get("LLM_HEALTH_TIMEOUT", "2"))
+
+
+# ---------- Abortable streams ----------
+class ChatStream:
+    """Chat chunks read by a helper thread, so the stream can be given up at any moment.
+
+    ``abort()`` can be called from any thread, even while Ollama is still
+    evaluating the prompt: iteration stops at once and, for a real Ollama
+    client, the HTTP connection is shut down so the server stops working on it.
+    """
+
+    _END = object()
+
+    def __init__(self, chunks, connections=None):
+        self._chunks = chunks
+        self._connections = connections
+        self._queue = queue.SimpleQueue()
+        self._aborted = threading.Event()
+        self._thread = threading.Thread(target=self._read, name="llm-stream", daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        if self._connections is not None:
+            self._connections.watch()
+        try:
+            if self._aborted.is_set():
+                return
+            for chunk in self._chunks:
+                self._queue.put((chunk, None))
+                if self._aborted.is_set():
+                    break
+            self._queue.put((self._END, None))
+        except Exception as e:
+            self._queue.put((self._END, e))
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                with contextlib.suppress(Exception):
+                    close()
+            if self._connections is not None:
+                self._connections.unwatch()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._aborted.is_set():
+            raise StopIteration
+        chunk, error = self._queue.get()
+        if error is not None and not self._aborted.is_set():
+            raise error
+        if chunk is self._END or self._aborted.is_set():
+            raise StopIteration
+        return chunk
+
+    @property
+    def aborted(self):
+        return self._aborted.is_set()
+
+    def abort(self):
+        """Stop the stream now; safe to call from another thread."""
+        self._aborted.set()
+        self._queue.put((self._END, None))  # wake the reader of the stream
+        if self._connections is not None and self._thread.ident is not None:
+            self._connections.abort(self._thread.ident)
+
+    def close(self):
+        """Release the stream; aborts it when it was not read to the end."""
+        if self._thread.is_alive():
+            self.abort()
+
+
+class LLMClient:
+    """Long-lived Ollama client: one pooled HTTP connection set, fixed model and options.
+
+    Create it once (the FastAPI lifespan does) and call ``warm_up()`` so the
+    model is loaded and pinned with ``keep_alive`` before the first request.
+    ``client`` can be any object with ollama.Client's ``chat``/``generate``/``ps``
+    methods, e.g. a fake in benchmarks.
+    """
+
+    def __init__(self, model=LLM_MODEL, host=LLM_HOST, keep_alive=LLM_KEEP_ALIVE, num_ctx=LLM_NUM_CTX,
+                 num_predict=LLM_NUM_PREDICT, format=LLM_FORMAT, timeout=LLM_TIMEOUT, client=None,
+                 health_timeout=LLM_HEALTH_TIMEOUT):
+        self.model = model
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.num_predict = num_predict
+        self.format = format or None
+        self._connections = None
+        self._probe = client
+        if client is None:
+            import ollama  # deferred: pulls in httpx/pydantic, only needed once a request is made
+            from llm_transport import AbortableTransport, Connections
+            self._connections = Connections()
+            client = ollama.Client(host=host, timeout=timeout, transport=AbortableTransport(self._connections))
+            self._probe = ollama.Client(host=host, timeout=health_timeout)
+        self._client = client
+        self.ready = False
+        self.warmup_seconds = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def options(self):
+        """Ollama generation options derived from the configuration."""
+        options = {}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        if self.num_predict:
+            options["num_predict"] = self.num_predict
+        return options
+
+    def chat_stream(self, messages):
+        """ChatStream of the chat chunks for ``messages`` with the configured model and options."""
+        return ChatStream(self._client.chat(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            format=self.format,
+            options=self.options() or None,
+            keep_alive=self.keep_alive,
+        ), self._connections)
+
+    def warm_up(self):
+        """Load the model into memory and pin it with keep_alive; returns True when ready."""
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                # An empty prompt only loads the model, it generates nothing.
+                self._client.generate(model=self.model, prompt="", keep_alive=self.keep_alive,
+                                      options=self.options() or None)
+            except Exception as e:
+                self.ready = False
+                self.last_error = str(e)
+                logger.error("LLM warm-up failed for %s: %s", self.model, str(e))
+                return False
+            self.warmup_seconds = time.perf_counter() - start
+            self.ready = True
+            self.last_error = None
+            logger.info("Model %s loaded in %.2fs", self.model, self.warmup_seconds)
+            return True
+
+    def is_loaded(self):
+        """Ask the server whether the model is currently resident in memory (``health_timeout``)."""
+        response = self._probe.ps()
+        models = getattr(response, "models", None)
+        if models is None:
+            models = response.get("models", [])
+        names = {(m.get("model") or m.get("name")) for m in models}
+        return self.model in names
+
+    def health(self, require_loaded=True):
+        """Readiness report for the /health endpoint.
+
+        Ready once the model is resident on the server, whether warm_up() or
+        an earlier request loaded it. With ``require_loaded=False`` (no
+        warm-up at startup, the first request loads it) a reachable server
+        is enough.
+        """
+        report = {
+            "model": self.model,
+            "warmup_seconds": self.warmup_seconds,
+            "keep_alive": self.keep_alive,
+            "error": self.last_error,
+        }
+        reachable = True
+        try:
+            report["loaded"] = self.is_loaded()
+        except Exception as e:
+            reachable = False
+            report["loaded"] = False
+            report["error"] = str(e)
+        if report["loaded"]:
+            report["error"] = None  # a failed warm-up no longer matters
+        report["ready"] = report["loaded"] or (reachable and not require_loaded)
+        report["status"] = "ok" if report["ready"] else ("error" if report["error"] else "warming")
+        return report
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_llm_client():
+    """The process-wide LLMClient, created on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = LLMClient()
+        return _default_client
+
+
+def set_llm_client(client):
+    """Replace the process-wide LLMClient (startup configuration, benchmarks)."""
+    global _default_client
+    with _default_lock:
+        _default_client = client
+    return client
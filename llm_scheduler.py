@@ -0,0 +1,180 @@
+import os
+import time
+import itertools
+import threading
+import contextlib
+
+from metrics import GENERATIONS_CANCELLED, LLM_QUEUE_WAIT
+
+# ---------- Configuration ----------
+# Generations sent to the model at the same time: match Ollama's parallel slots
+# (OLLAMA_NUM_PARALLEL), the extra requests would only queue inside Ollama.
+LLM_MAX_ACTIVE = int(os.environ.get("LLM_MAX_ACTIVE", os.environ.get("OLLAMA_NUM_PARALLEL", "4")))
+# A batch generation waiting this long is served like an interactive one, so it cannot starve.
+LLM_BATCH_AGING_SECONDS = float(os.environ.get("LLM_BATCH_AGING_SECONDS", "60"))
+
+MAX_TRACKED_CLIENTS = 1024
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+
+class GenerationCancelled(Exception):
+    """Raised in a generation whose request was cancelled (e.g. the client disconnected)."""
+
+
+class RequestContext:
+    """Who a generation is for, how urgent it is, and whether it is still wanted.
+
+    Passed down to every LLM call of a request. ``cancel()`` is safe from any
+    thread: a queued generation gives up its place at once, a running one
+    stops at its next token and closes the Ollama stream.
+    """
+
+    def __init__(self, client_id="anonymous", priority=INTERACTIVE):
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+        self.client_id = client_id
+        self.priority = priority
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Call ``callback`` when the request is cancelled (now if it already is)."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        """Forget a callback given to on_cancel() that is no longer needed."""
+        with self._lock:
+            with contextlib.suppress(ValueError):
+                self._callbacks.remove(callback)
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise GenerationCancelled(f"request of {self.client_id} cancelled")
+
+
+class _Ticket:
+    __slots__ = ("context", "seq", "queued_at")
+
+    def __init__(self, context, seq):
+        self.context = context
+        self.seq = seq
+        self.queued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Admission of generations to the model, at most ``max_active`` at a time.
+
+    A free slot goes to the waiting generation with, in order: the highest
+    priority (interactive before batch, batch promoted after
+    ``aging_seconds``), the client with the fewest running generations, the
+    client served longest ago, then the oldest request. So one client
+    sending many chunks cannot hold every slot while another one waits.
+    """
+
+    def __init__(self, max_active=LLM_MAX_ACTIVE, aging_seconds=LLM_BATCH_AGING_SECONDS):
+        self.max_active = max(1, max_active)
+        self.aging_seconds = aging_seconds
+        self.running = 0
+        self._waiting = []
+        self._active = {}  # client id -> running generations
+        self._last_grant = {}  # client id -> grant number
+        self._seq = itertools.count()
+        self._grants = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def waiting(self):
+        with self._cond:
+            return len(self._waiting)
+
+    def _key(self, ticket, now):
+        context = ticket.context
+        priority = PRIORITIES[context.priority]
+        if now - ticket.queued_at >= self.aging_seconds:
+            priority = PRIORITIES[INTERACTIVE]
+        return (priority, self._active.get(context.client_id, 0),
+                self._last_grant.get(context.client_id, -1), ticket.seq)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _acquire(self, context):
+        ticket = _Ticket(context, next(self._seq))
+        # One callback per waiting generation, dropped again below: a context shared by
+        # many generations (a batch run) must not collect one per chunk
+        wake = self._wake
+        context.on_cancel(wake)
+        with self._cond:
+            self._waiting.append(ticket)
+            granted = False
+            try:
+                while True:
+                    if context.cancelled:
+                        GENERATIONS_CANCELLED.inc(stage="queued")
+                        context.check()
+                    if self.running < self.max_active:
+                        now = time.monotonic()
+                        if min(self._waiting, key=lambda t: self._key(t, now)) is ticket:
+                            granted = True
+                            break
+                    # Aged batch tickets must be reconsidered even if nothing else happens
+                    self._cond.wait(self.aging_seconds if self.aging_seconds > 0 else None)
+            finally:
+                self._waiting.remove(ticket)
+                context.remove_callback(wake)
+                if not granted:
+                    # This ticket may have been next in line for a free slot: let the others look
+                    self._cond.notify_all()
+            self.running += 1
+            self._active[context.client_id] = self._active.get(context.client_id, 0) + 1
+            self._last_grant[context.client_id] = next(self._grants)
+            if len(self._last_grant) > MAX_TRACKED_CLIENTS:
+                # Forget the clients served longest ago
+                recent = sorted(self._last_grant.items(), key=lambda item: item[1])[-MAX_TRACKED_CLIENTS // 2:]
+                self._last_grant = dict(recent)
+            self._cond.notify_all()  # another slot may still be free for the next in line
+        LLM_QUEUE_WAIT.observe(time.monotonic() - ticket.queued_at, priority=context.priority)
+
+    def _release(self, context):
+        with self._cond:
+            self.running -= 1
+            remaining = self._active.get(context.client_id, 1) - 1
+            if remaining:
+                self._active[context.client_id] = remaining
+            else:
+                self._active.pop(context.client_id, None)
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, context):
+        """Block until ``context`` may generate; raises GenerationCancelled if it is cancelled first."""
+        self._acquire(context)
+        try:
+            yield
+        finally:
+            self._release(context)
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,149 @@
+import socket
+import threading
+import contextlib
+
+import httpcore
+import httpx
+
+# HTTP transport of LLMClient's ollama.Client, imported with ollama when the
+# client is created. It is httpx's default transport with one difference: the
+# connection pool's network backend lets ChatStream.abort() shut down the
+# socket a stream is waiting on, from another thread.
+
+
+# ---------- Network backend ----------
+class Connections:
+    """httpcore network backend that knows which socket each chat stream thread is using.
+
+    A thread waiting for Ollama's first bytes cannot be woken by closing its
+    socket, only by shutting it down; ``abort(thread_id)`` does that from
+    the cancelling thread, and Ollama stops evaluating the prompt.
+    """
+
+    _ABORTED = object()
+
+    def __init__(self):
+        self._backend = httpcore.SyncBackend()
+        self._threads = {}  # watched thread id -> stream it last wrote to
+        self._lock = threading.Lock()
+
+    def connect_tcp(self, *args, **kwargs):
+        return _TrackedStream(self, self._backend.connect_tcp(*args, **kwargs))
+
+    def connect_unix_socket(self, *args, **kwargs):
+        return _TrackedStream(self, self._backend.connect_unix_socket(*args, **kwargs))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+    def watch(self):
+        with self._lock:
+            self._threads[threading.get_ident()] = None
+
+    def unwatch(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def used(self, stream):
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                return
+            aborted = self._threads[ident] is self._ABORTED
+            if not aborted:
+                self._threads[ident] = stream
+        if aborted:
+            stream.shutdown()  # aborted before its request was even sent
+
+    def abort(self, thread_id):
+        with self._lock:
+            if thread_id not in self._threads:
+                return
+            stream = self._threads[thread_id]
+            self._threads[thread_id] = self._ABORTED
+        if stream is not None and stream is not self._ABORTED:
+            stream.shutdown()
+
+
+class _TrackedStream:
+    """httpcore network stream reporting its writes to Connections."""
+
+    def __init__(self, connections, stream):
+        self._connections = connections
+        self._stream = stream
+
+    def read(self, max_bytes, timeout=None):
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        self._connections.used(self)
+        self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, *args, **kwargs):
+        return _TrackedStream(self._connections, self._stream.start_tls(*args, **kwargs))
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+    def shutdown(self):
+        sock = self._stream.get_extra_info("socket")
+        if sock is not None:
+            with contextlib.suppress(OSError):
+                sock.shutdown(socket.SHUT_RDWR)
+
+
+# ---------- Transport ----------
+@contextlib.contextmanager
+def _httpx_errors():
+    """Raise httpcore's errors as the httpx errors of the same name, like httpx's own transport."""
+    try:
+        yield
+    except httpcore.TimeoutException as e:
+        raise getattr(httpx, type(e).__name__, httpx.TimeoutException)(str(e)) from e
+    except (httpcore.NetworkError, httpcore.ProtocolError, httpcore.ProxyError, httpcore.UnsupportedProtocol) as e:
+        raise getattr(httpx, type(e).__name__, httpx.TransportError)(str(e)) from e
+
+
+class _ResponseStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __iter__(self):
+        with _httpx_errors():
+            yield from self._stream
+
+    def close(self):
+        self._stream.close()
+
+
+class AbortableTransport(httpx.BaseTransport):
+    """httpx transport over an httpcore connection pool using ``connections`` as network backend."""
+
+    def __init__(self, connections, max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0):
+        # Pool limits: httpx's defaults
+        self._pool = httpcore.ConnectionPool(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            network_backend=connections,
+        )
+
+    def handle_request(self, request):
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(scheme=request.url.raw_scheme, host=request.url.raw_host, port=request.url.port,
+                             target=request.url.raw_path),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = self._pool.handle_request(core_request)
+        return httpx.Response(status_code=response.status, headers=response.headers,
+                              stream=_ResponseStream(response.stream), extensions=response.extensions)
+
+    def close(self):
+        self._pool.close()
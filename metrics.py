@@ -0,0 +1,221 @@
+import os
+import time
+import bisect
+import threading
+import contextlib
+
+# ---------- Configuration ----------
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500)
+CHARS_BUCKETS = (1000, 5000, 10000, 50000, 100000, 250000, 500000, 1000000, 2500000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Histogram:
+    """Prometheus histogram with optional labels, rendered in the text exposition format."""
+
+    def __init__(self, name, documentation, buckets=DURATION_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter with optional labels."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f"{self.name}_total{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All registered metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "docx_stage_duration_seconds", "Time spent per processing stage.", DURATION_BUCKETS, ("stage",)))
+TIME_TO_FIRST_TOKEN = registry.register(Histogram(
+    "llm_time_to_first_token_seconds", "Time from sending the prompt to the first generated token.",
+    DURATION_BUCKETS))
+PROMPT_TOKENS = registry.register(Histogram(
+    "llm_prompt_tokens", "Prompt tokens evaluated per request.", TOKEN_BUCKETS))
+EVAL_TOKENS = registry.register(Histogram(
+    "llm_eval_tokens", "Tokens generated per request.", TOKEN_BUCKETS))
+TOKENS_PER_SECOND = registry.register(Histogram(
+    "llm_tokens_per_second", "Generation speed reported by Ollama.", RATE_BUCKETS))
+DOCUMENT_CHARS = registry.register(Histogram(
+    "document_markdown_chars", "Markdown size of the processed documents.", CHARS_BUCKETS))
+STORY_COUNT = registry.register(Histogram(
+    "extracted_user_stories", "User stories returned per request.", COUNT_BUCKETS))
+REQUESTS = registry.register(Counter(
+    "docx_requests", "Processed extraction requests by outcome.", ("outcome",)))
+LLM_QUEUE_WAIT = registry.register(Histogram(
+    "llm_queue_wait_seconds", "Time a generation waited for a model slot.", DURATION_BUCKETS, ("priority",)))
+GENERATIONS_CANCELLED = registry.register(Counter(
+    "llm_generations_cancelled", "Generations abandoned because their request was cancelled.", ("stage",)))
+
+
+class RequestMetrics:
+    """Timings and LLM statistics of one request, published once with ``observe()``.
+
+    ``stage()`` accumulates wall time per stage name, ``record_llm_stats()``
+    reads the counters of Ollama's final stream chunk. ``summary()`` is what
+    the ``event: timing`` SSE message carries. Everything is a no-op when
+    disabled, so it can be passed around unconditionally.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = METRICS_ENABLED if enabled is None else enabled
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.values = {}
+        self._eval_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name, seconds):
+        if self.enabled:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, **values):
+        if self.enabled:
+            with self._lock:
+                self.values.update(values)
+
+    def first_token(self, seconds):
+        """Keep the earliest time-to-first-token (chunked extraction streams several prompts)."""
+        if self.enabled:
+            with self._lock:
+                current = self.values.get("time_to_first_token")
+                if current is None or seconds < current:
+                    self.values["time_to_first_token"] = seconds
+
+    def record_llm_stats(self, chunk):
+        """Add the token counts and durations (nanoseconds) of Ollama's final chunk."""
+        if not self.enabled:
+            return
+        get = chunk.get if isinstance(chunk, dict) else lambda name: getattr(chunk, name, None)
+        with self._lock:
+            for field, name in (("prompt_eval_count", "prompt_tokens"), ("eval_count", "eval_tokens")):
+                if get(field):
+                    self.values[name] = self.values.get(name, 0) + get(field)
+            for field, stage in (("load_duration", "model_load"), ("prompt_eval_duration", "prompt_eval"),
+                                 ("eval_duration", "generation")):
+                if get(field):
+                    self.stages[stage] = self.stages.get(stage, 0.0) + get(field) / 1e9
+            if get("eval_duration"):
+                self._eval_seconds += get("eval_duration") / 1e9
+                self.values["tokens_per_second"] = self.values.get("eval_tokens", 0) / self._eval_seconds
+
+    def summary(self):
+        with self._lock:
+            summary = {"stages": {name: round(seconds, 4) for name, seconds in self.stages.items()}}
+            summary.update({k: round(v, 4) if isinstance(v, float) else v for k, v in self.values.items()})
+        summary["total"] = round(time.perf_counter() - self.started, 4)
+        return summary
+
+    def observe(self, outcome="ok"):
+        """Publish this request into the process-wide histograms."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stages = dict(self.stages)
+            values = dict(self.values)
+        for name, seconds in stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage="total")
+        for key, histogram in (("time_to_first_token", TIME_TO_FIRST_TOKEN), ("prompt_tokens", PROMPT_TOKENS),
+                               ("eval_tokens", EVAL_TOKENS), ("tokens_per_second", TOKENS_PER_SECOND),
+                               ("document_chars", DOCUMENT_CHARS), ("stories", STORY_COUNT)):
+            if values.get(key) is not None:
+                histogram.observe(values[key])
+        REQUESTS.inc(outcome=outcome)
@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import zlib
+import logging
+import functools
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+# Off by default: a passage the rules miss never reaches the LLM.
+PREFILTER_ENABLED = os.environ.get("PREFILTER", "0") == "1"
+PREFILTER_THRESHOLD = float(os.environ.get("PREFILTER_THRESHOLD", "1.5"))
+# Sentences (or list items) kept on each side of a hit, within the same paragraph.
+PREFILTER_CONTEXT = int(os.environ.get("PREFILTER_CONTEXT", "1"))
+# Optional classifier weights (JSON written by Classifier.save), added to the rule score.
+PREFILTER_MODEL = os.environ.get("PREFILTER_MODEL", "")
+
+# ---------- Rules ----------
+_A = "['’]"  # straight or typographic apostrophe
+_RULES = [
+    # Modal verbs: "Le système doit...", "L'application devra..."
+    (re.compile(r"\b(?:doit|doivent|devra|devront|devrait|devraient)\b", re.I), 2.0),
+    (re.compile(r"\b(?:permet|permettent|permettre|permettra|permettront)\b", re.I), 1.5),
+    # "L'utilisateur peut...", "les clients pourront..."
+    (re.compile(rf"\b(?:l{_A}|les?\s|la\s)\s*(?:utilisat(?:eur|rice)|client|administrateur|gestionnaire|"
+                r"op[ée]rateur|agent|visiteur|membre)s?\s+(?:peu[tv]|peuvent|pourra|pourront)", re.I), 1.5),
+    (re.compile(r"\bil\s+(?:est|sera)\s+(?:n[ée]cessaire|obligatoire|indispensable|souhaitable|attendu|demand[ée]|"
+                r"exig[ée])\b", re.I), 1.5),
+    # Already written as a user story
+    (re.compile(rf"\ben tant qu(?:e|{_A}).*\bje (?:veux|souhaite|dois)\b", re.I), 3.0),
+    (re.compile(r"\b(?:exigences?|obligatoires?|imp[ée]ratifs?|fonctionnalit[ée]s?)\b", re.I), 0.5),
+    (re.compile(rf"\b(?:le (?:syst[èe]me|logiciel|portail|site)|l{_A}(?:application|outil|interface)|"
+                r"la (?:plateforme|solution))\b", re.I), 0.5),
+]
+LIST_ITEM_BONUS = 0.5
+HEADING_BONUS = 0.5
+HEADING_PENALTY = 1.0
+MIN_WORDS = 4
+
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+_LIST_ITEM_RE = re.compile(r"^(?:[-*+•]|\d+[.)]|[a-z][.)])\s")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+# Section titles that announce requirements, and those that announce context only
+_REQUIREMENT_HEADING_RE = re.compile(
+    r"exigence|fonctionnel|fonctionnalit|besoin|user stor|cas d.utilisation|sp[ée]cification", re.I)
+_CONTEXT_HEADING_RE = re.compile(
+    r"sommaire|table des mati[èe]res|glossaire|d[ée]finition|mentions l[ée]gales|conditions g[ée]n[ée]rales|"
+    r"propri[ée]t[ée] intellectuelle|p[ée]nalit|r[ée]siliation|historique des versions", re.I)
+
+
+def _heading_bonus(heading):
+    if _REQUIREMENT_HEADING_RE.search(heading):
+        return HEADING_BONUS
+    if _CONTEXT_HEADING_RE.search(heading):
+        return -HEADING_PENALTY
+    return 0.0
+
+
+def score_sentence(sentence, heading=""):
+    """Requirement likelihood of one sentence or list item from the rules alone."""
+    if len(sentence.split()) < MIN_WORDS:
+        return 0.0
+    score = sum(weight for pattern, weight in _RULES if pattern.search(sentence))
+    if _LIST_ITEM_RE.match(sentence):
+        score += LIST_ITEM_BONUS
+    return score + _heading_bonus(heading)
+
+
+# ---------- Classifier ----------
+_WORD_RE = re.compile(r"\w+")
+
+
+def _features(text, dims):
+    """Hashed word unigrams and bigrams (crc32, so stable across processes)."""
+    words = _WORD_RE.findall(text.lower())
+    grams = words + [a + " " + b for a, b in zip(words, words[1:])]
+    return [zlib.crc32(gram.encode("utf-8")) % dims for gram in grams]
+
+
+class Classifier:
+    """Tiny logistic regression over hashed n-grams; ``logits()`` scores many sentences at once."""
+
+    def __init__(self, weights, bias=0.0):
+        import numpy as np
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    @property
+    def dims(self):
+        return len(self.weights)
+
+    def _indices(self, sentences):
+        import numpy as np
+        features = [_features(sentence, self.dims) for sentence in sentences]
+        lengths = np.array([len(f) for f in features], dtype=np.int64)
+        indices = np.fromiter((i for f in features for i in f), dtype=np.int64, count=int(lengths.sum()))
+        return indices, lengths
+
+    @staticmethod
+    def _sum_by_sentence(values, lengths):
+        import numpy as np
+        sums = np.zeros(len(lengths), dtype=np.float64)
+        nonempty = lengths > 0
+        if nonempty.any():
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            sums[nonempty] = np.add.reduceat(values, offsets[nonempty])
+        return sums
+
+    def logits(self, sentences):
+        indices, lengths = self._indices(sentences)
+        return self._sum_by_sentence(self.weights[indices], lengths) + self.bias
+
+    @classmethod
+    def train(cls, sentences, labels, dims=4096, epochs=50, learning_rate=1.0, l2=1e-4):
+        """Fit on ``sentences`` with 0/1 ``labels`` by full-batch gradient descent."""
+        import numpy as np
+        model = cls(np.zeros(dims, dtype=np.float32))
+        indices, lengths = model._indices(sentences)
+        y = np.asarray(labels, dtype=np.float64)
+        n = max(1, len(y))
+        for _ in range(epochs):
+            z = model._sum_by_sentence(model.weights[indices], lengths) + model.bias
+            error = 1.0 / (1.0 + np.exp(-z)) - y
+            gradient = np.bincount(indices, weights=np.repeat(error, lengths), minlength=dims) / n
+            model.weights -= (learning_rate * (gradient + l2 * model.weights)).astype(np.float32)
+            model.bias -= learning_rate * float(error.mean())
+        return model
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"bias": self.bias, "weights": [round(float(w), 6) for w in self.weights]}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["weights"], data.get("bias", 0.0))
+
+
+@functools.lru_cache(maxsize=1)
+def get_classifier():
+    """The classifier configured with PREFILTER_MODEL, or None."""
+    if not PREFILTER_MODEL:
+        return None
+    try:
+        return Classifier.load(PREFILTER_MODEL)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Prefilter model %s not loaded: %s", PREFILTER_MODEL, str(e))
+        return None
+
+
+# ---------- Passage selection ----------
+def _units(md_text):
+    """Split Markdown into scored units: (paragraph, line, heading index, text).
+
+    List items and table rows are one unit each, other lines are split into
+    sentences. Headings are returned separately.
+    """
+    headings = []
+    units = []
+    paragraph = 0
+    for line_no, line in enumerate(md_text.splitlines()):
+        line = line.strip()
+        if not line:
+            paragraph += 1
+            continue
+        if _HEADING_RE.match(line):
+            headings.append(line)
+            paragraph += 1
+            continue
+        if _LIST_ITEM_RE.match(line) or " | " in line:
+            pieces = [line]
+        else:
+            pieces = _SENTENCE_SPLIT_RE.split(line)
+        for piece in pieces:
+            units.append((paragraph, line_no, len(headings) - 1, piece))
+    return headings, units
+
+
+def select_passages(md_text, threshold=None, context=None, classifier=None):
+    """Keep the sentences that look like requirements, with a little context around them.
+
+    Every unit scoring at least ``threshold`` is kept together with up to
+    ``context`` neighbours of the same paragraph; the headings of the sections
+    they belong to are kept too. Returns ``(text, stats)``; when nothing
+    scores high enough the document is returned whole.
+    """
+    threshold = PREFILTER_THRESHOLD if threshold is None else threshold
+    context = PREFILTER_CONTEXT if context is None else context
+    classifier = get_classifier() if classifier is None else classifier
+
+    headings, units = _units(md_text)
+    scores = [score_sentence(text, headings[h] if h >= 0 else "") for _, _, h, text in units]
+    if classifier and units:  # False: rules only, even when PREFILTER_MODEL is set
+        scores = [s + float(z) for s, z in zip(scores, classifier.logits([text for _, _, _, text in units]))]
+
+    keep = set()
+    for i, score in enumerate(scores):
+        if score >= threshold:
+            paragraph = units[i][0]
+            keep.update(j for j in range(max(0, i - context), min(len(units), i + context + 1))
+                        if units[j][0] == paragraph)
+
+    blocks = []
+    last_heading = -1
+    previous = None
+    for i, (paragraph, line_no, heading, text) in enumerate(units):
+        if i not in keep:
+            continue
+        if heading != last_heading and heading >= 0:
+            blocks.append([headings[heading]])
+            last_heading = heading
+            previous = None
+        if previous is not None and previous[0] == paragraph and previous[2] == i - 1:
+            blocks[-1].append((" " if previous[1] == line_no else "\n") + text)
+        else:
+            blocks.append([text])
+        previous = (paragraph, line_no, i)
+    text = "\n\n".join("".join(block) for block in blocks)
+
+    stats = {
+        "units": len(units),
+        "kept_units": len(keep),
+        "chars_before": len(md_text),
+        "chars_after": len(text),
+    }
+    if not keep:
+        text = md_text
+        stats["chars_after"] = len(md_text)
+        stats["fallback"] = True
+    stats["keep_ratio"] = round(stats["chars_after"] / max(1, len(md_text)), 4)
+    return text, stats
@@ -1,254 +1,587 @@
 import os
-import sys
-import win32com.client as win32
-from rapidfuzz import process  # Ensure rapidfuzz is imported
-from tkinter import messagebox
-import re  # For better normalization
+import re
+import time
+import bisect
+import itertools
 import unicodedata  # For Unicode NFC normalization
-import datetime  # For timestamp in logs
-
-def get_word_app():
-    try:
-        word = win32.GetActiveObject("Word.Application")
-        print("[info] Attached to running Word instance.")
-    except Exception:
-        print("[info] No running Word found — launching new Word instance.")
-        word = win32.Dispatch("Word.Application")
-        word.Visible = True
-    return word
-
-def open_or_use_active_doc(word, filename="testing_paragraph.docx"):
-    docs = word.Documents
-    print(f"[info] Word has {docs.Count} document(s) open.")
-    
-    # First, try to open the specified file
-    path = os.path.join(os.getcwd(), filename)
-    if not os.path.exists(path):
-        print(f"[error] File not found at: {path}")
-        raise SystemExit(1)
-        
-    # If there are open documents, ask user what to do
-    if docs.Count > 0:
-        doc = word.ActiveDocument
-        doc_name = getattr(doc, 'Name', '<unknown>')
-        if not messagebox.askyesno("Confirm Document", 
-            f"Use currently open document '{doc_name}'?\n\n" +
-            f"Click 'No' to open '{filename}' instead."):
-            # User clicked No - close current document and open new one
-            print(f"[info] Opening file: {path}")
-            return docs.Open(path)
-        return doc
-    
-    # No open documents - just open the specified file
-    print(f"[info] Opening file: {path}")
-    return docs.Open(path)
-
-
-
-
-def highlight_sentences_in_doc(doc, sentences, color_consts, threshold=85, log_file="highlight_log.md"):
-    from win32com.client import constants
-    
-    # Initialize Markdown log
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_file, 'w', encoding='utf-8') as f:
-        f.write(f"# Highlighting Log\n\n**Timestamp:** {timestamp}\n\n**Document:** {doc.Name}\n**Threshold:** {threshold}\n\n")
-        f.write("## Document Preparation\n")
-        f.write("- Track revisions disabled.\n")
-        f.write("- All revisions accepted.\n\n")
+import contextlib
+from sentence_matching import SentenceIndex, ends_sentence, locate_sentences, normalize_text
+from debug_trace import DebugTrace, ensure_trace
+from metrics import RequestMetrics
+
+# Word enum values used below (same as win32com.client.constants once makepy ran)
+WD_CHARACTER = 1
+WD_COLLAPSE_END = 0
+WD_NO_HIGHLIGHT = 0
+WD_FIND_STOP = 0
+
+FIND_MAX_CHARS = 255  # longest FindText Word accepts
+_END_MARKS = "\r\x07"  # paragraph mark; end-of-cell/row marks are "\r\x07" in Content.Text
+_FIELD_CHARS_RE = re.compile("[\x13\x14\x15]")  # field begin, separator and end
+
+# ---------- Watch mode ----------
+# How often the document text is read, and how long it must stay unchanged
+# before the edited paragraphs are matched and highlighted again.
+WATCH_POLL_SECONDS = float(os.environ.get("WATCH_POLL_SECONDS", "0.5"))
+WATCH_DEBOUNCE_SECONDS = float(os.environ.get("WATCH_DEBOUNCE_SECONDS", "1.0"))
+
+# Getting a document from Word (and asking the user which one) is in word_app;
+# everything here takes the document object and imports nothing Windows-only.
+
+
+class WordDocument:
+    """Small facade over a Word COM document used by the batch highlighter.
+
+    Every method maps to a handful of COM calls, so any object exposing
+    the same COM surface (Name, Content.Text, Range(), Application,
+    TextRetrievalMode) can be used instead of a live Word document, e.g. a
+    fake in tests on Linux.
+    """
+
+    def __init__(self, com_doc):
+        self.com_doc = com_doc
+        self._text = ""
+        self._end = None
+        self._positions = None
+        self._anchor_offsets = [0]
+        self._anchor_drifts = [0]
+
+    @property
+    def name(self):
+        return self.com_doc.Name
+
+    def prepare(self):
+        """Precautions for French docs: no tracked changes interfering with ranges."""
+        self.com_doc.TrackRevisions = False
+        self.com_doc.AcceptAllRevisions()
+
+    def text(self):
+        """Whole document text in one COM round-trip.
+
+        Its offsets are not always Range positions; range_of() and
+        highlight() take offsets into the text last returned here.
+        """
+        self._text = self.com_doc.Content.Text
+        self._end = None
+        self._positions = None
+        self._anchor_offsets = [0]
+        self._anchor_drifts = [0]
+        return self._text
+
+    def range_of(self, start, end):
+        """COM Range of ``text()[start:end]``, or None when Word has no such text.
+
+        Offsets drift from Range positions: a table's end-of-cell and
+        end-of-row marks are two characters ("\\r\\x07") in Content.Text but
+        one position, and field codes (TOC, HYPERLINK, PAGEREF...) take
+        positions without being in the text. Both are mapped once per
+        text() (see _map_positions), so a span costs no COM call to place.
+        Only when that map does not add up is the range at the drift found
+        last before ``start``, less the table marks since, read back and
+        compared with the text; when it differs, the text is looked up with
+        Find.
+        """
+        text = self._text
+        while start < end and text[start] in _END_MARKS:
+            start += 1
+        while end > start and text[end - 1] in _END_MARKS:
+            end -= 1
+        expected = normalize_text(text[start:end])
+        if not expected:
+            return None
+        if self._positions is None:
+            self._positions = self._map_positions()
+        if self._positions:
+            return self.com_doc.Range(self._position(start), self._position(end - 1) + 1)
+        i = bisect.bisect_right(self._anchor_offsets, start) - 1
+        anchor = self._anchor_offsets[i], self._anchor_offsets[i] + self._anchor_drifts[i]
+        # Table marks are visible in the text; only fields need Find to be found
+        drift = self._anchor_drifts[i] - text.count("\r\x07", anchor[0], start)
+        rng = self.com_doc.Range(max(0, start + drift), max(0, end + drift))
+        if normalize_text(rng.Text) == expected:
+            self._anchor(start, drift)
+            return rng
+        rng = self._find(start, end, expected, anchor)
+        if rng is None:
+            return None
+        self._anchor(start, rng.Start - start)
+        self._anchor(end, rng.End - end)
+        return rng
+
+    def _map_positions(self):
+        """Range position map of the text last read, or False when Word's text does not add up.
+
+        Reads the document text once more with field codes included: there
+        every Range position is one character, except table marks, which
+        are "\\r\\x07" in both texts. Returns ``(offsets, drifts, marks)``:
+        the text offsets where a run of visible characters starts, the
+        index in the coded text less the offset there, and the offsets of
+        the table marks.
+        """
+        text = self._text
+        rng = self.com_doc.Content
+        rng.TextRetrievalMode.IncludeFieldCodes = True
+        coded = rng.Text
+        if len(coded) - coded.count("\r\x07") != rng.End:
+            return False
+        offsets, drifts = [], []
+        fields = []  # one entry per open field: True while in its code
+        offset = index = 0
+        for match in itertools.chain(_FIELD_CHARS_RE.finditer(coded), [None]):
+            stop = match.start() if match else len(coded)
+            if not any(fields) and stop > index:
+                if not text.startswith(coded[index:stop], offset):
+                    return False
+                offsets.append(offset)
+                drifts.append(index - offset)
+                offset += stop - index
+            if match is None:
+                break
+            char = match.group()
+            if char == "\x13":
+                fields.append(True)
+            elif not fields:
+                return False
+            elif char == "\x14":
+                fields[-1] = False
+            else:
+                fields.pop()
+            index = stop + 1
+        if offset != len(text) or fields:
+            return False
+        marks = [m.start() for m in re.finditer("\r\x07", text)]
+        return offsets or [0], drifts or [0], marks
+
+    def _position(self, offset):
+        """Range position of the text character at ``offset`` (see _map_positions)."""
+        offsets, drifts, marks = self._positions
+        drift = drifts[bisect.bisect_right(offsets, offset) - 1]
+        return offset + drift - bisect.bisect_left(marks, offset - 1)
+
+    def _anchor(self, offset, drift):
+        i = bisect.bisect_left(self._anchor_offsets, offset)
+        if i < len(self._anchor_offsets) and self._anchor_offsets[i] == offset:
+            self._anchor_drifts[i] = drift
+        else:
+            self._anchor_offsets.insert(i, offset)
+            self._anchor_drifts.insert(i, drift)
+
+    def _find(self, start, end, expected, anchor):
+        """Range of ``text[start:end]`` from Find, searching from ``anchor`` (text offset, Range position).
+
+        Its first and last line are looked up, counting the occurrences
+        before it in the text as Word counts them.
+        """
+        text = self._text
+        head_end = min(end, start + FIND_MAX_CHARS)
+        for mark in _END_MARKS:
+            stop = text.find(mark, start, head_end)
+            if stop >= 0:
+                head_end = stop
+        head = self._find_nth(start, head_end, *anchor)
+        if head is None:
+            return None
+        tail_start = max(start, end - FIND_MAX_CHARS, *(text.rfind(mark, start, end) + 1 for mark in _END_MARKS))
+        if tail_start == start:
+            stop = head.End
+        else:
+            tail = self._find_nth(tail_start, end, start, head.Start)
+            if tail is None:
+                return None
+            stop = tail.End
+        rng = self.com_doc.Range(head.Start, stop)
+        return rng if normalize_text(rng.Text) == expected else None
+
+    def _find_nth(self, start, end, search_from, position):
+        """Find ``text[start:end]`` from text offset ``search_from``, which is Range position ``position``."""
+        text = self._text
+        needle = text[start:end]
+        skip = 0
+        found = text.find(needle, search_from)
+        while 0 <= found < start:
+            skip += 1
+            found = text.find(needle, found + len(needle))
+        if found != start:
+            return None
+        if self._end is None:
+            self._end = self.com_doc.Content.End
+        rng = self.com_doc.Range(position, self._end)
+        find_text = needle.replace("^", "^^")  # "^" starts Word's special codes (^p, ^t...)
+        for _ in range(skip + 1):
+            if not rng.Find.Execute(FindText=find_text, Forward=True, MatchCase=True, MatchWholeWord=False,
+                                    MatchWildcards=False, MatchSoundsLike=False, MatchAllWordForms=False,
+                                    Wrap=WD_FIND_STOP):
+                return None
+        return rng
+
+    def highlight(self, start, end, color):
+        """Highlight ``text()[start:end]``; False when it was not found in Word."""
+        rng = self.range_of(start, end)
+        if rng is None:
+            return False
+        rng.HighlightColorIndex = color
+        return True
+
+    @contextlib.contextmanager
+    def screen_updating_disabled(self):
+        app = self.com_doc.Application
+        previous = app.ScreenUpdating
+        app.ScreenUpdating = False
+        try:
+            yield
+        finally:
+            app.ScreenUpdating = previous
+
+
+def highlight_sentences_batch(doc, sentences, color_consts, threshold=85, trace=None, metrics=None):
+    """Highlight all sentences in one pass.
+
+    Reads the document text once, locates every sentence in Python and
+    applies the highlights through ``doc.Range(start, end)`` with screen
+    updating turned off. Returns a ``(start, end, score)`` span or None per
+    unique input sentence.
+    """
+    metrics = metrics or RequestMetrics(enabled=False)
+    with ensure_trace(trace) as trace:
+        word_doc = doc if isinstance(doc, WordDocument) else WordDocument(doc)
+        word_doc.prepare()
+        full_text = word_doc.text()
+
+        # Deduplicate sentences while keeping each one's colour
+        pairs = list(dict.fromkeys(zip(sentences, color_consts)))
+        with metrics.stage("matching"):
+            spans = locate_sentences(full_text, [sentence for sentence, _ in pairs], threshold=threshold)
+        trace.event("batch_located", document_chars=len(full_text), sentences=len(pairs),
+                    matched=sum(span is not None for span in spans))
+
+        highlighted = 0
+        with metrics.stage("highlight"), word_doc.screen_updating_disabled():
+            # In document order, so each range starts from the drift found just before it
+            for (sentence, color), span in sorted(zip(pairs, spans), key=lambda item: item[1] or (-1,)):
+                if span is None:
+                    print(f"  ❌ No match for: {sentence[:50]}...")
+                    trace.event("sentence_result", level="full", sentence=sentence, outcome="no_match")
+                    continue
+                start, end, score = span
+                if not word_doc.highlight(start, end, color):
+                    print(f"  ⚠️ Matched but not found in Word: {sentence[:50]}...")
+                    trace.event("sentence_result", level="full", sentence=sentence, outcome="range_not_found",
+                                start=start, end=end, score=score)
+                    continue
+                trace.event("sentence_result", level="full", sentence=sentence, outcome="highlighted",
+                            start=start, end=end, score=score)
+                highlighted += 1
+        print(f"[info] Highlighted {highlighted}/{len(pairs)} sentence(s) in one pass.")
+        return spans
+
+
+def _paragraphs(text):
+    """Hash and start offset of every '\\r'-separated paragraph (plus the end sentinel)."""
+    paragraphs = text.split("\r")
+    starts = list(itertools.accumulate((len(p) + 1 for p in paragraphs), initial=0))
+    return [hash(p) for p in paragraphs], starts
+
+
+def _sentence_break_before(text, starts, k):
+    """Whether a sentence ends where paragraph ``k`` starts (empty paragraphs do not end one)."""
+    while k > 0:
+        previous = normalize_text(text[starts[k - 1]:starts[k]])
+        if previous:
+            return ends_sentence(previous)
+        k -= 1
+    return True
+
+
+class DocumentWatcher:
+    """Keeps a document highlighted while it is being edited.
+
+    ``start()`` highlights every sentence once, like highlight_sentences_batch,
+    and remembers the span of each (sentence, colour) pair and a hash per
+    paragraph. ``poll()`` reads the text again; once it has stayed unchanged
+    for ``debounce_seconds``, the paragraphs whose hash changed, grown to
+    whole sentences, are cleared and matched again against the sentences
+    found there before, the sentences not found yet and the fuzzy matches
+    a better one could replace. Spans after the edit are shifted, the rest of the document is
+    neither re-matched nor touched through COM. A sentence edited away is
+    only looked for in the edited paragraphs: it loses its highlight rather
+    than moving to a similar sentence elsewhere.
+    """
+
+    def __init__(self, doc, sentences, color_consts, threshold=85,
+                 debounce_seconds=WATCH_DEBOUNCE_SECONDS, trace=None):
+        self.doc = doc if isinstance(doc, WordDocument) else WordDocument(doc)
+        self.pairs = list(dict.fromkeys(zip(sentences, color_consts)))
+        self._keys = [normalize_text(sentence).lower() for sentence, _ in self.pairs]
+        self.spans = [None] * len(self.pairs)  # (start, end, score) per pair
+        self._whole = [False] * len(self.pairs)  # matched exactly as a whole document sentence
+        self.threshold = threshold
+        self.debounce_seconds = debounce_seconds
+        self.trace = trace or DebugTrace()
+        self._text = None
+        self._hashes = []
+        self._starts = [0]
+        self._pending = None  # (text, first seen at) of a change not applied yet
+
+    def start(self):
+        self.doc.prepare()
+        text = self.doc.text()
+        index = SentenceIndex(text)
+        self.spans = locate_sentences(text, [sentence for sentence, _ in self.pairs], threshold=self.threshold,
+                                      index=index)
+        self._whole = self._whole_matches(index)
+        with self.doc.screen_updating_disabled():
+            for color, span in self._in_document_order(range(len(self.pairs))):
+                self.doc.highlight(span[0], span[1], color)
+        self._text = text
+        self._hashes, self._starts = _paragraphs(text)
+        matched = sum(span is not None for span in self.spans)
+        self.trace.event("watch_start", document_chars=len(text), sentences=len(self.pairs), matched=matched)
+        self.trace.flush()
+        print(f"[info] Highlighted {matched}/{len(self.pairs)} sentence(s); watching for edits.")
+        return self.spans
+
+    def _whole_matches(self, index):
+        """Per pair, whether ``index`` has it as a whole sentence, which a full pass prefers to any substring."""
+        sentences = {sentence.lower() for sentence in index.sentences}
+        return [key in sentences for key in self._keys]
+
+    def _in_document_order(self, indexes):
+        """(colour, span) of the matched pairs among ``indexes``, by span start (see WordDocument.range_of)."""
+        matched = [(self.spans[i], self.pairs[i][1]) for i in indexes if self.spans[i] is not None]
+        return [(color, span) for span, color in sorted(matched)]
+
+    def poll(self, now=None):
+        """Read the document once; return the update stats when edits were applied, else None."""
+        now = time.monotonic() if now is None else now
+        text = self.doc.text()
+        if text == self._text:
+            self._pending = None
+            return None
+        if self._pending is None or self._pending[0] != text:
+            self._pending = (text, now)
+            return None
+        if now - self._pending[1] < self.debounce_seconds:
+            return None
+        self._pending = None
+        return self.update(text)
+
+    def watch(self, poll_seconds=WATCH_POLL_SECONDS, stop=None):
+        """Poll until ``stop`` (a threading.Event) is set or Ctrl+C."""
+        try:
+            while stop is None or not stop.is_set():
+                stats = self.poll()
+                if stats:
+                    print(f"[info] {stats['changed_paragraphs']} paragraph(s) changed: "
+                          f"{stats['highlighted']} highlight(s) applied in {stats['seconds'] * 1000:.0f} ms.")
+                if stop is None:
+                    time.sleep(poll_seconds)
+                else:
+                    stop.wait(poll_seconds)
+        except KeyboardInterrupt:
+            print("[info] Stopped watching.")
+
+    def _changed_window(self, text, hashes, starts):
+        """Paragraphs [first, old_end) replaced by [first, new_end), grown to whole sentences."""
+        old_hashes = self._hashes
+        first = 0
+        limit = min(len(old_hashes), len(hashes))
+        while first < limit and old_hashes[first] == hashes[first]:
+            first += 1
+        suffix = 0
+        while suffix < limit - first and old_hashes[-1 - suffix] == hashes[-1 - suffix]:
+            suffix += 1
+        old_end = len(old_hashes) - suffix
+        # A sentence crossing the window's edge (e.g. a heading without a full stop
+        # followed by its paragraph) is split and matched again whole, as a full pass does
+        while True:
+            while not _sentence_break_before(self._text, self._starts, first):
+                first -= 1
+            while not (_sentence_break_before(self._text, self._starts, old_end)
+                       and _sentence_break_before(text, starts, len(hashes) - suffix)):
+                old_end += 1
+                suffix -= 1
+            start, end = self._starts[first], self._starts[old_end]
+            crossing = [span for span in self.spans if span is not None and span[0] < end and span[1] > start
+                        and (span[0] < start or span[1] > end)]
+            if not crossing:
+                break
+            first = min(first, bisect.bisect_right(self._starts, min(s for s, _, _ in crossing)) - 1)
+            old_end = max(old_end, bisect.bisect_left(self._starts, max(e for _, e, _ in crossing)))
+            suffix = len(old_hashes) - old_end
+        return first, old_end, len(hashes) - suffix
+
+    def update(self, text):
+        """Re-match and re-highlight only the paragraphs that differ from the last applied text."""
+        started = time.perf_counter()
+        hashes, starts = _paragraphs(text)
+        first, old_end, new_end = self._changed_window(text, hashes, starts)
+        old_start, old_stop = self._starts[first], self._starts[old_end]
+        new_start, new_stop = starts[first], min(starts[new_end], len(text))
+        delta = len(text) - len(self._text)
+
+        cleared = [(new_start, new_stop)] if new_stop > new_start else []
+        window = text[new_start:new_stop]
+        window_key = normalize_text(window).lower()
+        queries = []
+        for i, span in enumerate(self.spans):
+            if span is None:
+                queries.append(i)
+            elif span[0] < old_stop and span[1] > old_start:
+                self.spans[i] = None
+                self._whole[i] = False
+                queries.append(i)
+            else:
+                if span[0] >= old_stop:
+                    self.spans[i] = span = (span[0] + delta, span[1] + delta, span[2])
+                # An exact match stays unless the window has an occurrence a full pass would prefer:
+                # one before it, or a whole sentence where it is only part of one
+                if span[2] < 100 or (self._keys[i] in window_key and (span[0] >= new_stop or not self._whole[i])):
+                    queries.append(i)
+
+        if window_key and queries:
+            index = SentenceIndex(window)
+            matches = index.match_many([self.pairs[i][0] for i in queries], threshold=self.threshold)
+            whole = self._whole_matches(index)
+            for i, match in zip(queries, matches):
+                if match is None:
+                    continue
+                sentence, score, offset = match
+                start = new_start + offset
+                previous = self.spans[i]
+                if previous is not None:
+                    # Same choice as a full pass: best score, a whole sentence, then first in the document
+                    if (score, whole[i], -start) <= (previous[2], self._whole[i], -previous[0]):
+                        continue
+                    cleared.append(previous[:2])
+                self.spans[i] = (start, start + len(sentence), score)
+                self._whole[i] = whole[i]
+
+        highlighted = 0
+        with self.doc.screen_updating_disabled() if cleared else contextlib.nullcontext():
+            for start, end in sorted(cleared):
+                self.doc.highlight(start, end, WD_NO_HIGHLIGHT)
+            touched = [i for i, span in enumerate(self.spans) if span is not None
+                       and any(span[0] < end and span[1] > start for start, end in cleared)]
+            for color, span in self._in_document_order(touched):
+                highlighted += self.doc.highlight(span[0], span[1], color)
+
+        self._text, self._hashes, self._starts = text, hashes, starts
+        stats = {
+            "changed_paragraphs": new_end - first,
+            "window_chars": new_stop - new_start,
+            "rematched": len(queries),
+            "highlighted": highlighted,
+            "seconds": time.perf_counter() - started,
+        }
+        self.trace.event("watch_update", **stats)
+        self.trace.flush()
+        return stats
+
+
+def highlight_sentences_in_doc(doc, sentences, color_consts, threshold=85, trace=None, metrics=None):
+    with ensure_trace(trace) as trace:
+        _highlight_sentences_in_doc(doc, sentences, color_consts, threshold, trace,
+                                    metrics or RequestMetrics(enabled=False))
+        if trace.enabled():
+            print(f"[info] Detailed logs saved to {trace.path}")
+
+
+def _highlight_sentences_in_doc(doc, sentences, color_consts, threshold, trace, metrics):
+    trace.event("highlight_start", document=doc.Name, threshold=threshold)
 
     # Precautions for French docs
     doc.TrackRevisions = False
     doc.AcceptAllRevisions()
+    trace.event("document_prepared", track_revisions=False, revisions_accepted=True)
 
     full_text = doc.Content.Text
-    # Enhanced normalization: NFC, remove control chars, handle French typography
-    full_text = unicodedata.normalize('NFC', full_text)
-    normalized_full_text = re.sub(r'[\x00-\x08\x0B-\x1F\x7F-\x9F]', '',  # Remove control chars
-                                  re.sub(r'\s+', ' ', full_text
-                                         .replace('\r', ' ').replace('\n', ' ').replace('\xa0', ' ')  # nbsp
-                                         .replace('–', '-').replace('—', '-')
-                                         .replace('«', '"').replace('»', '"')
-                                         .replace('‘', "'").replace('’', "'").replace('“', '"').replace('”', '"')
-                                         .strip()))
-    # Improved sentence splitting for French: handle ellipsis, quotes, and special chars
-    doc_sentences = [s.strip() for s in re.split(r'(?<=[.!?\-"\]])\s+', normalized_full_text) if s.strip()]
-
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write("## Extracted Document Sentences\n")
-        f.write("These are the split sentences from the document after normalization (control chars removed):\n\n")
-        for i, s in enumerate(doc_sentences):
-            f.write(f"- **Sentence {i+1}:** `{s[:100]}...` (length: {len(s)})\n")
-        f.write("\n")
+    # Normalize (control chars, French typography, whitespace) and split once
+    index = SentenceIndex(unicodedata.normalize('NFC', full_text))
+    doc_sentences = index.sentences
+    trace.event("document_sentences", count=len(doc_sentences))
+    if trace.enabled("full"):
+        trace.event("document_sentences_text", level="full", sentences=doc_sentences)
 
     # Deduplicate sentences
     unique_sentences = list(dict.fromkeys(sentences))
     if len(unique_sentences) < len(sentences):
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"## Input Sentences\n- Original count: {len(sentences)}\n- Unique count: {len(unique_sentences)} (duplicates removed)\n\n")
+        trace.event("input_deduplicated", original=len(sentences), unique=len(unique_sentences))
+
+    # Score every input sentence against the document in one go
+    with metrics.stage("matching"):
+        matches = index.match_many(unique_sentences, threshold=threshold)
 
     for idx, (sentence, color) in enumerate(zip(unique_sentences, color_consts)):
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"## Processing Input Sentence {idx + 1}\n")
-            f.write(f"**Original:** `{sentence}`\n\n")
-        
         print(f"[info] Processing sentence {idx + 1}/{len(unique_sentences)}: {sentence[:50]}...")
         
-        sentence = unicodedata.normalize('NFC', sentence)
-        normalized_sentence = re.sub(r'[\x00-\x08\x0B-\x1F\x7F-\x9F]', '',  # Remove control chars
-                                     re.sub(r'\s+', ' ', sentence
-                                            .replace('\xa0', ' ')
-                                            .replace('–', '-').replace('—', '-')
-                                            .replace('«', '"').replace('»', '"')
-                                            .replace('‘', "'").replace('’', "'").replace('“', '"').replace('”', '"')
-                                            .strip()))
+        normalized_sentence = normalize_text(sentence)
         sentence_len = len(normalized_sentence)
+        trace.event("sentence", level="full", index=idx + 1, original=sentence, normalized=normalized_sentence)
 
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"**Normalized:** `{normalized_sentence}` (length: {sentence_len})\n\n")
-
-        match, score, _ = process.extractOne(normalized_sentence, doc_sentences, score_cutoff=threshold)
+        match, score, _ = matches[idx] or (None, 0, None)
 
         if match and score >= threshold:
             print(f"  🔍 Fuzzy match found: {match[:50]}... (score: {score})")
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"### Fuzzy Matching\n- Best match: `{match}`\n- Score: {score}\n\n")
+            trace.event("fuzzy_match", level="full", index=idx + 1, match=match, score=score)
 
             rng = doc.Content.Duplicate
             search_complete = False
+            outcome = "not_found"
             attempt = 0
             while not search_complete:
                 attempt += 1
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(f"### Search Attempt {attempt}\n")
                 
                 found = False
                 if sentence_len > 250:
                     find_text = normalized_sentence[:250]
-                    with open(log_file, 'a', encoding='utf-8') as f:
-                        f.write(f"- Using prefix for long sentence: `{find_text}`\n")
                     found = rng.Find.Execute(FindText=find_text, Forward=True, MatchCase=False, MatchWholeWord=False,
                                              MatchWildcards=False, MatchSoundsLike=False, MatchAllWordForms=False)
                     if found:
-                        rng.MoveEnd(Unit=constants.wdCharacter, Count=sentence_len - 250)
-                        found_text = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', rng.Text)
-                                            .replace('\xa0', ' ').replace('–', '-').replace('—', '-')
-                                            .replace('«', '"').replace('»', '"')
-                                            .replace('‘', "'").replace('’', "'").replace('“', '"').replace('”', '"')
-                                            .strip())
-                        with open(log_file, 'a', encoding='utf-8') as f:
-                            f.write(f"- Extended range text: `{found_text}`\n")
-                            f.write(f"- Comparison: `{found_text}` == `{normalized_sentence}` ?\n")
+                        rng.MoveEnd(Unit=WD_CHARACTER, Count=sentence_len - 250)
+                        found_text = normalize_text(rng.Text)
+                        trace.event("search_attempt", level="full", index=idx + 1, attempt=attempt,
+                                    mode="prefix", found_text=found_text)
                         if found_text == normalized_sentence:
                             rng.HighlightColorIndex = color
                             print(f"  ✅ Highlighted long sentence: {normalized_sentence[:50]}...")
-                            with open(log_file, 'a', encoding='utf-8') as f:
-                                f.write("- **Match!** Highlighted.\n\n")
+                            outcome = "highlighted_prefix"
                             break
                         else:
                             print(f"  ⚠️ Mismatch in extended range: {found_text[:50]}... vs. {normalized_sentence[:50]}...")
-                            with open(log_file, 'a', encoding='utf-8') as f:
-                                f.write("- **Mismatch.** Collapsing range and continuing.\n\n")
-                            rng.Collapse(Direction=constants.wdCollapseEnd)
-                            rng.Move(Unit=constants.wdCharacter, Count=1)
+                            rng.Collapse(Direction=WD_COLLAPSE_END)
+                            rng.Move(Unit=WD_CHARACTER, Count=1)
                     else:
                         search_complete = True
-                        with open(log_file, 'a', encoding='utf-8') as f:
-                            f.write("- No find. Search complete.\n\n")
                 else:
                     find_text = normalized_sentence
-                    with open(log_file, 'a', encoding='utf-8') as f:
-                        f.write(f"- Direct search text: `{find_text}`\n")
                     found = rng.Find.Execute(FindText=find_text, Forward=True, MatchCase=False, MatchWholeWord=False,
                                              MatchWildcards=False, MatchSoundsLike=False, MatchAllWordForms=False)
                     if found:
                         rng.HighlightColorIndex = color
                         print(f"  ✅ Highlighted: {normalized_sentence[:50]}...")
-                        with open(log_file, 'a', encoding='utf-8') as f:
-                            f.write("- **Found and highlighted.**\n\n")
+                        outcome = "highlighted"
                         break
                     else:
                         if sentence_len > 100:
                             half_text = normalized_sentence[:sentence_len//2]
-                            with open(log_file, 'a', encoding='utf-8') as f:
-                                f.write(f"- Fallback: Using half text: `{half_text}`\n")
                             found = rng.Find.Execute(FindText=half_text, Forward=True, MatchCase=False, MatchWholeWord=False,
                                                      MatchWildcards=False, MatchSoundsLike=False, MatchAllWordForms=False)
                             if found:
-                                rng.MoveEnd(Unit=constants.wdCharacter, Count=sentence_len - len(half_text))
-                                found_text = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', rng.Text)
-                                                    .replace('\xa0', ' ').replace('–', '-').replace('—', '-')
-                                                    .replace('«', '"').replace('»', '"')
-                                                    .replace('‘', "'").replace('’', "'").replace('“', '"').replace('”', '"')
-                                                    .strip())
-                                with open(log_file, 'a', encoding='utf-8') as f:
-                                    f.write(f"- Extended fallback text: `{found_text}`\n")
-                                    f.write(f"- Comparison: `{found_text}` == `{normalized_sentence}` ?\n")
+                                rng.MoveEnd(Unit=WD_CHARACTER, Count=sentence_len - len(half_text))
+                                found_text = normalize_text(rng.Text)
+                                trace.event("search_attempt", level="full", index=idx + 1, attempt=attempt,
+                                            mode="half", found_text=found_text)
                                 if found_text == normalized_sentence:
                                     rng.HighlightColorIndex = color
                                     print(f"  ✅ Highlighted via fallback: {normalized_sentence[:50]}...")
-                                    with open(log_file, 'a', encoding='utf-8') as f:
-                                        f.write("- **Fallback match!** Highlighted.\n\n")
+                                    outcome = "highlighted_fallback"
                                     break
                                 else:
                                     print(f"  ⚠️ Fallback mismatch: {found_text[:50]}... vs. {normalized_sentence[:50]}...")
-                                    with open(log_file, 'a', encoding='utf-8') as f:
-                                        f.write("- **Fallback mismatch.**\n\n")
-                            rng.Collapse(Direction=constants.wdCollapseEnd)
-                            rng.Move(Unit=constants.wdCharacter, Count=1)
+                            rng.Collapse(Direction=WD_COLLAPSE_END)
+                            rng.Move(Unit=WD_CHARACTER, Count=1)
                         search_complete = True
-                        with open(log_file, 'a', encoding='utf-8') as f:
-                            f.write("- No find (direct or fallback). Search complete.\n\n")
+            trace.event("sentence_result", index=idx + 1, outcome=outcome, score=score, attempts=attempt)
         else:
             print(f"  ❌ No fuzzy match for: {normalized_sentence[:50]}... (best score: {score})")
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write("### Fuzzy Matching\n- No match above threshold (best score: {score})\n\n".format(score=score))
-
-    print(f"[info] Detailed logs saved to {log_file}")
-
-
-
-def open_doc_in_word(file_path):
-    word = win32.gencache.EnsureDispatch("Word.Application")
-    word.Visible = True
-
-    # Normalize path (avoid dialog issue)
-    abs_path = os.path.abspath(file_path)
-
-    # Check if file is already open
-    for doc in word.Documents:
-        if doc.FullName.lower() == abs_path.lower():
-            print(f"[info] Using already open document: {doc.FullName}")
-            return doc
-
-    # Otherwise, open it fresh
-    doc = word.Documents.Open(abs_path)
-    print(f"[info] Opened new document: {doc.FullName}")
-    return doc
-            
-def main():
-    # Example usage (can be removed if not needed)
-    sentences = [
-        "Le système doit permettre aux clients de créer un compte utilisateur.",
-        "Les utilisateurs doivent pouvoir ajouter des produits à leur panier.",
-    ]
-    color_consts = [
-        win32.constants.wdYellow,
-        win32.constants.wdBrightGreen,
-    ]
-    word = get_word_app()
-    doc = open_or_use_active_doc(word, filename="testing_paragraph.docx")
-    print("[info] Starting highlighting...")
-    highlight_sentences_in_doc(doc, sentences, color_consts)
-    try:
-        doc.Save()
-        print("[info] Document saved.")
-    except Exception as e:
-        print("[warn] Could not save document automatically:", e)
-    print("[done] Finished.")
-    
-    for s in sentences:
-        print(f"[sentence] {repr(s)}")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+            trace.event("sentence_result", index=idx + 1, outcome="no_fuzzy_match", score=score)
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ---------- Configuration ----------
+CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") != "0"
+CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+CACHE_MAX_BYTES = int(float(os.environ.get("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_HOURS", "168")) * 3600
+
+
+def sha256_hex(data):
+    """SHA-256 hex digest of bytes or text (text is UTF-8 encoded)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """Content-addressed JSON cache on disk with TTL and size-bounded LRU eviction.
+
+    Entries live in ``<directory>/<namespace>/<key>.json``. A hit refreshes the
+    file's mtime, and eviction removes the least recently used files until the
+    cache fits in ``max_bytes`` again.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS,
+                 enabled=CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed lazily on first write
+
+    def _path(self, namespace, key):
+        return os.path.join(self.directory, namespace, f"{key}.json")
+
+    def get(self, namespace, key):
+        """Return the cached value or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        path = self._path(namespace, key)
+        try:
+            stat = os.stat(path)
+            if self.ttl_seconds and time.time() - stat.st_mtime > self.ttl_seconds:
+                self._remove(path, stat.st_size)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # LRU: a hit makes the entry recent again
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", path, str(e))
+            self._remove(path, 0)
+            return None
+
+    def set(self, namespace, key, value):
+        """Store a JSON-serializable value under namespace/key."""
+        if not self.enabled:
+            return
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write cache entry %s: %s", path, str(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(payload) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except FileNotFoundError:
+                        continue
+
+    def _scan_size(self):
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _evict(self):
+        """Remove expired, then least recently used entries until under max_bytes."""
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            expired = self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds
+            if not expired and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError:
+                continue
+        self._total_bytes = total
+
+    def _remove(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+
+result_cache = ResultCache()
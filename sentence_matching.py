@@ -0,0 +1,199 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from rapidfuzz import fuzz, process
+
+# ---------- Normalization ----------
+# One-to-one character mapping so positions in the normalized text can be
+# mapped back to the original document. "\x00" marks characters to drop.
+_CHAR_MAP = {
+    "\r": " ", "\n": " ", "\t": " ", "\x0b": " ", "\x0c": " ",
+    "\xa0": " ", "\u202f": " ", "\u2009": " ",  # nbsp, narrow nbsp, thin space (French typography)
+    "–": "-", "—": "-", "\x1e": "-",  # dashes, Word non-breaking hyphen
+    "«": '"', "»": '"', "“": '"', "”": '"',
+    "‘": "'", "’": "'",
+    "\x1f": "\x00", "\xad": "\x00",  # optional hyphens
+}
+for _code in list(range(0x00, 0x09)) + list(range(0x0E, 0x1E)) + list(range(0x7F, 0xA0)):
+    _CHAR_MAP.setdefault(chr(_code), "\x00")
+_CHAR_TABLE = str.maketrans(_CHAR_MAP)
+# « Valider » reads "Valider": the spaces inside guillemets are dropped, as
+# compaction.normalize_typography does for the text sent to the LLM
+_GUILLEMET_SPACE_RE = re.compile(r"(?<=\u00ab)\s+|\s+(?=\u00bb)")
+
+_GAP_RE = re.compile(r"[\s\x00]+")
+_TOKEN_RE = re.compile(r"\w{3,}|\d+")
+# Break after terminal punctuation, optionally followed by a closing quote/bracket.
+# (The historical splitter also broke after any '"' or '-', which cut « guillemets » apart.)
+_SENTENCE_BREAK_RE = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\])]))\s+')
+
+
+def normalize_text(text):
+    """Normalize typography/whitespace the same way for queries and documents."""
+    return normalize_with_offsets(unicodedata.normalize("NFC", text))[0]
+
+
+def normalize_with_offsets(text):
+    """Normalize ``text`` and return (normalized, offsets).
+
+    ``offsets[i]`` is the index in ``text`` of the character that produced
+    ``normalized[i]``, so a span found in the normalized text maps back to
+    the original with ``offsets[start]`` and ``offsets[end - 1] + 1``.
+    """
+    translated = _GUILLEMET_SPACE_RE.sub(lambda m: "\x00" * len(m.group()), text).translate(_CHAR_TABLE)
+    pieces = []
+    offsets = []
+    pos = 0
+    for gap in _GAP_RE.finditer(translated):
+        start, end = gap.span()
+        if start > pos:
+            pieces.append(translated[pos:start])
+            offsets.extend(range(pos, start))
+        if gap.group().strip("\x00") and pieces:  # whitespace collapses to one space, not at the start
+            pieces.append(" ")
+            offsets.append(start)
+        pos = end
+    if pos < len(translated):
+        pieces.append(translated[pos:])
+        offsets.extend(range(pos, len(translated)))
+    normalized = "".join(pieces)
+    if normalized.endswith(" "):
+        normalized = normalized[:-1]
+        offsets.pop()
+    return normalized, offsets
+
+
+def split_sentences_with_spans(normalized):
+    """Split normalized text into sentences, returning (sentence, start, end) triples."""
+    spans = []
+    pos = 0
+    for brk in _SENTENCE_BREAK_RE.finditer(normalized):
+        if brk.start() > pos:
+            spans.append((normalized[pos:brk.start()], pos, brk.start()))
+        pos = brk.end()
+    if pos < len(normalized):
+        spans.append((normalized[pos:], pos, len(normalized)))
+    return spans
+
+
+def ends_sentence(normalized):
+    """Whether split_sentences_with_spans breaks after ``normalized`` when more text follows it."""
+    return _SENTENCE_BREAK_RE.match(normalized + " ", len(normalized)) is not None
+
+
+# ---------- Sentence index ----------
+class SentenceIndex:
+    """A document normalized and split once, ready to match many sentences.
+
+    Matching goes exact sentence -> exact substring -> fuzzy. Fuzzy queries
+    are prefiltered with a token inverted index, then scored in blocks
+    with ``rapidfuzz.process.cdist`` over the union of the block's
+    candidates. Offsets refer to ``doc_text`` as given; it is not NFC
+    normalized (Word and MarkItDown already produce composed text).
+    """
+
+    def __init__(self, doc_text, max_df=0.2):
+        self.doc_text = doc_text
+        normalized, self._offsets = normalize_with_offsets(doc_text)
+        lowered = normalized.lower()
+        self._lowered = lowered if len(lowered) == len(normalized) else normalized
+        spans = split_sentences_with_spans(normalized)
+        self.sentences = [sentence for sentence, _, _ in spans]
+        self._spans = [(start, end) for _, start, end in spans]
+
+        self._by_text = {}
+        self._postings = defaultdict(list)
+        for idx, sentence in enumerate(self.sentences):
+            lowered_sentence = sentence.lower()
+            self._by_text.setdefault(lowered_sentence, idx)
+            for token in set(_TOKEN_RE.findall(lowered_sentence)):
+                self._postings[token].append(idx)
+        # Tokens found in more sentences than this carry no signal (le, les, doit, ...)
+        self._max_postings = max(1, int(len(self.sentences) * max_df))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def _candidates(self, query, limit):
+        """Ids of the sentences sharing the most informative tokens with ``query``."""
+        counts = Counter()
+        for token in set(_TOKEN_RE.findall(query.lower())):
+            posting = self._postings.get(token)
+            if posting and len(posting) <= self._max_postings:
+                counts.update(posting)
+        if not counts:
+            return None
+        return [idx for idx, _ in counts.most_common(limit)]
+
+    def _result(self, norm_start, norm_end, score):
+        start = self._offsets[norm_start]
+        end = self._offsets[norm_end - 1] + 1
+        return self.doc_text[start:end], float(score), start
+
+    def match(self, query, threshold=85):
+        return self.match_many([query], threshold=threshold)[0]
+
+    def match_many(self, queries, threshold=85, max_candidates=32, block_size=8,
+                   scorer=fuzz.WRatio, workers=-1):
+        """Match every query; return ``(sentence, score, offset)`` or None per query.
+
+        ``sentence`` is the matched text as it appears in ``doc_text`` and
+        ``offset`` its start there, so it spans ``offset:offset + len(sentence)``.
+        """
+        results = [None] * len(queries)
+        pending = []
+        for qi, query in enumerate(queries):
+            normalized = normalize_text(query)
+            if not normalized:
+                continue
+            lowered = normalized.lower()
+            idx = self._by_text.get(lowered)
+            if idx is not None:
+                results[qi] = self._result(*self._spans[idx], 100)
+                continue
+            pos = self._lowered.find(lowered)
+            if pos >= 0:
+                results[qi] = self._result(pos, pos + len(normalized), 100)
+                continue
+            pending.append((qi, normalized, self._candidates(normalized, max_candidates)))
+
+        if not self.sentences:
+            return results
+        for block_start in range(0, len(pending), block_size):
+            block = pending[block_start:block_start + block_size]
+            if any(candidates is None for _, _, candidates in block):
+                columns = list(range(len(self.sentences)))
+            else:
+                columns = sorted(set().union(*(candidates for _, _, candidates in block)))
+            scores = process.cdist(
+                [normalized for _, normalized, _ in block],
+                [self.sentences[idx] for idx in columns],
+                scorer=scorer,
+                score_cutoff=threshold,
+                workers=workers,
+            )
+            for row, (qi, _, _) in enumerate(block):
+                best = int(scores[row].argmax())
+                if scores[row][best] >= threshold and scores[row][best] > 0:
+                    results[qi] = self._result(*self._spans[columns[best]], scores[row][best])
+        return results
+
+
+# ---------- Locating sentences ----------
+def locate_sentences(doc_text, sentences, threshold=85, index=None):
+    """Find each sentence in ``doc_text`` and return its character span there.
+
+    Returns one entry per input sentence: ``(start, end, score)`` in
+    ``doc_text`` coordinates, or ``None`` when nothing scores above
+    ``threshold``. An exact (case-insensitive) occurrence wins with score
+    100; otherwise the best fuzzy-matching document sentence is used.
+    """
+    index = index or SentenceIndex(doc_text)
+    spans = []
+    for match in index.match_many(sentences, threshold=threshold):
+        if match is None:
+            spans.append(None)
+        else:
+            sentence, score, start = match
+            spans.append((start, start + len(sentence), score))
+    return spans
@@ -28,9 +28,17 @@ const handleDocumentUpload = async (content: string) => {
   setLlmThinking(""); // Reset the thinking state
 
   try {
-    const extractedStories = await extractRequirementsStream(content, (token: string) => {
-      setLlmThinking(prev => prev + token); // Update the thinking state with each token
-    });
+    setProject(prev => ({ ...prev, userStories: [] }));
+    const extractedStories = await extractRequirementsStream(
+      content,
+      (token: string) => {
+        setLlmThinking(prev => prev + token); // Update the thinking state with each token
+      },
+      (story: UserStory) => {
+        // Render each card as soon as the backend has parsed it
+        setProject(prev => ({ ...prev, userStories: [...prev.userStories, story] }));
+      }
+    );
 
     setProject(prev => ({
       ...prev,
@@ -3,9 +3,33 @@ interface BackendStory {
   source_sentence: string;
 }
 
+function toUserStory(story: BackendStory, index: number) {
+  return {
+    id: `story-${index + 1}`,
+    title: story.story || "",
+    role: story.story?.split(",")[0]?.replace("En tant que", "")?.trim() || "",
+    feature: story.story?.split(",")[1]?.trim() || "",
+    benefit: story.story?.split(",")[2]?.trim() || "",
+    elements: [
+      {
+        id: `element-${index + 1}`,
+        category: "user-story" as const,
+        content: story.story || "",
+        sourceText: story.source_sentence || "",
+        confidence: 1,
+        validated: false,
+      },
+    ],
+    priority: "medium" as const,
+    status: "extracted" as const,
+    modules: [],
+  };
+}
+
 export async function extractRequirementsStream(
   content: string,
-  onToken: (token: string) => void
+  onToken: (token: string) => void,
+  onStory?: (story: ReturnType<typeof toUserStory>) => void
 ) {
   const formData = new FormData();
   formData.append("text_content", content);
@@ -27,6 +51,7 @@ export async function extractRequirementsStream(
 
     const decoder = new TextDecoder();
     let userStories: BackendStory[] = [];
+    let streamedCount = 0;
 
     let lastChunk = "";
     
@@ -42,7 +67,16 @@ export async function extractRequirementsStream(
       lastChunk = messages.pop() || ""; // Keep the incomplete chunk
 
       for (const message of messages) {
-        if (message.startsWith("data: ")) {
+        if (message.startsWith("event: story\ndata: ")) {
+          // A complete story, sent as soon as the model closed its JSON object
+          try {
+            const story: BackendStory = JSON.parse(message.slice("event: story\ndata: ".length));
+            onStory?.(toUserStory(story, streamedCount));
+            streamedCount += 1;
+          } catch {
+            // Ignore malformed story events; the final list is authoritative
+          }
+        } else if (message.startsWith("data: ")) {
           const data = message.slice(6).trim();
           if (data && data !== "---") {
             try {
@@ -62,26 +96,7 @@ export async function extractRequirementsStream(
     }
 
     // Transform the stories into the expected format
-    return userStories.map((story, index) => ({
-      id: `story-${index + 1}`,
-      title: story.story || "",
-      role: story.story?.split(",")[0]?.replace("En tant que", "")?.trim() || "",
-      feature: story.story?.split(",")[1]?.trim() || "",
-      benefit: story.story?.split(",")[2]?.trim() || "",
-      elements: [
-        {
-          id: `element-${index + 1}`,
-          category: "user-story" as const,
-          content: story.story || "",
-          sourceText: story.source_sentence || "",
-          confidence: 1,
-          validated: false,
-        },
-      ],
-      priority: "medium" as const,
-      status: "extracted" as const,
-      modules: [],
-    }));
+    return userStories.map(toUserStory);
   } catch (error) {
     console.error("Stream reading error:", error);
     throw error;
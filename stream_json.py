@@ -0,0 +1,86 @@
+import json
+import re
+
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+_BAD_ESCAPE_RE = re.compile(r'(?<!\\)\\(?![\\/"bfnrtu])')
+
+
+class StoryStreamParser:
+    """Incremental, tolerant parser for the LLM's user_stories JSON.
+
+    Feed it the streamed deltas; ``feed()`` returns every story object
+    (a dict with a ``story`` key) whose closing brace arrived in that delta.
+    It tracks strings/escapes and nesting itself, so it does not care how
+    the reply is cut into deltas, skips ``<think>...</think>`` blocks and
+    any prose around the JSON, and tolerates unescaped backslashes.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.stories = []
+        self._pos = 0
+        self._in_string = False
+        self._escaped = False
+        self._in_think = False
+        self._stack = []  # (opening char, start index) of open containers
+
+    def feed(self, delta):
+        self.buffer += delta
+        found = []
+        buf = self.buffer
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            ch = buf[i]
+            if self._in_think:
+                end = buf.find(_THINK_CLOSE, i)
+                if end < 0:
+                    # Keep a possible partial closing tag for the next delta
+                    i = max(i, n - len(_THINK_CLOSE) + 1)
+                    break
+                self._in_think = False
+                i = end + len(_THINK_CLOSE)
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                i += 1
+                continue
+            if ch == "<" and not self._stack:
+                if buf.startswith(_THINK_OPEN, i):
+                    self._in_think = True
+                    i += len(_THINK_OPEN)
+                    continue
+                if _THINK_OPEN.startswith(buf[i:]):
+                    break  # maybe the start of <think>, wait for more
+            elif ch == '"' and self._stack:
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append((ch, i))
+            elif ch in "}]" and self._stack:
+                opener, start = self._stack.pop()
+                if opener == "{" and ch == "}":
+                    story = self._parse_object(buf[start:i + 1])
+                    if story is not None:
+                        found.append(story)
+            i += 1
+        self._pos = i
+        self.stories.extend(found)
+        return found
+
+    @staticmethod
+    def _parse_object(text):
+        for candidate in (text, _BAD_ESCAPE_RE.sub(r"\\\\", text)):
+            try:
+                value = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(value, dict) and "story" in value:
+                return value
+            return None
+        return None
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import pytest
+
+# Read by the modules at import: keep the job database and cache out of the tree, no warm-up
+_TMP = tempfile.mkdtemp(prefix="project2_tests_")
+os.environ.setdefault("JOB_DB_PATH", os.path.join(_TMP, "jobs.sqlite3"))
+os.environ.setdefault("RESULT_CACHE_DIR", os.path.join(_TMP, "results"))
+os.environ["LLM_WARMUP"] = "0"
+
+
+@pytest.fixture
+def fake_llm():
+    """Install a bench.fake_llm.FakeOllama behind the process-wide LLMClient; returns the installer.
+
+    The installer builds the fake from its keyword arguments unless one is
+    given. The result cache is off unless ``use_cache=True`` is passed;
+    both are restored afterwards.
+    """
+    import llm_client
+    from bench.fake_llm import FakeOllama, install
+    from result_cache import result_cache
+
+    previous, enabled = llm_client.get_llm_client(), result_cache.enabled
+
+    def installer(fake=None, use_cache=False, **kwargs):
+        return install(fake or FakeOllama(**kwargs), use_cache=use_cache)
+
+    yield installer
+    llm_client.set_llm_client(previous)
+    result_cache.enabled = enabled
+
+
+@pytest.fixture
+def api():
+    """A TestClient of the FastAPI app, lifespan included."""
+    from fastapi.testclient import TestClient
+
+    import backend_api
+    with TestClient(backend_api.app) as client:
+        yield client
@@ -0,0 +1,24 @@
+import contextlib
+import io
+
+
+def test_llm_concurrency_applies_to_the_run_only(tmp_path, fake_llm):
+    import batch_extract
+    from llm_scheduler import llm_scheduler
+
+    fake = fake_llm(tokens_per_second=500)
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"doc{i}.md"
+        path.write_text(f"# Document {i}\n\nLe système doit permettre à l'utilisateur {i} de se connecter.\n",
+                        encoding="utf-8")
+        paths.append(str(path))
+    max_active = llm_scheduler.max_active
+    assert max_active > 1
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        totals = batch_extract.run_batch(paths, str(tmp_path / "out.jsonl"), workers=1, documents=4,
+                                         llm_concurrency=1)
+    assert totals["ok"] == 4
+    assert fake.max_active == 1
+    assert llm_scheduler.max_active == max_active
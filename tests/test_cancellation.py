@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from bench.fake_llm import FakeOllama
+
+TOKENS_PER_SECOND = 10
+INTERVAL = 1.0 / TOKENS_PER_SECOND
+SLACK = 0.05  # thread scheduling
+TEXT = "Le système doit permettre aux clients de créer un compte utilisateur."
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+    return time.monotonic()
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """A one-slot LLMScheduler in place of integrated1's."""
+    import integrated1
+    from llm_scheduler import LLMScheduler
+
+    scheduler = LLMScheduler(max_active=1)
+    monkeypatch.setattr(integrated1, "llm_scheduler", scheduler)
+    return scheduler
+
+
+@pytest.fixture
+def ollama_server():
+    from bench.fake_ollama_server import FakeOllamaServer
+
+    server = FakeOllamaServer(fake=FakeOllama(tokens_per_second=TOKENS_PER_SECOND), load_seconds=0).start()
+    yield server
+    server.stop()
+
+
+def _cancel_while_another_waits(scheduler):
+    """Start a generation, cancel it after its first token while a second one waits for the slot.
+
+    Returns the seconds from the cancel until the slot passed on, the
+    exception the cancelled generation ended with and the time of the cancel.
+    """
+    import integrated1
+    from llm_scheduler import GenerationCancelled, RequestContext
+
+    first, second = RequestContext("first"), RequestContext("second")
+    streaming = threading.Event()
+    outcome = {}
+
+    def generate_first():
+        try:
+            for _ in integrated1.stream_llm_response(TEXT, context=first):
+                streaming.set()
+        except Exception as exc:  # noqa: BLE001 - reported to the test
+            outcome["error"] = exc
+
+    def generate_second():
+        try:
+            for _ in integrated1.stream_llm_response(TEXT, context=second):
+                second.cancel()  # the slot was handed over; that is all this one is for
+        except GenerationCancelled:
+            pass
+
+    threads = [threading.Thread(target=generate_first, daemon=True)]
+    threads[0].start()
+    assert streaming.wait(5)
+    threads.append(threading.Thread(target=generate_second, daemon=True))
+    threads[1].start()
+    _wait_for(lambda: scheduler.waiting == 1)
+
+    cancelled = time.monotonic()
+    first.cancel()
+    handed_over = _wait_for(lambda: scheduler.waiting == 0) - cancelled
+    for thread in threads:
+        thread.join(5)
+    return handed_over, outcome.get("error"), cancelled
+
+
+def test_cancelled_generation_frees_its_slot_within_one_token_interval(fake_llm, scheduler):
+    from llm_scheduler import GenerationCancelled
+
+    fake_llm(tokens_per_second=TOKENS_PER_SECOND)
+    handed_over, error, _ = _cancel_while_another_waits(scheduler)
+    assert isinstance(error, GenerationCancelled)
+    assert handed_over <= INTERVAL + SLACK
+
+
+def test_cancelled_http_generation_stops_ollama_within_one_token_interval(fake_llm, scheduler, ollama_server):
+    from llm_client import LLMClient, set_llm_client
+    from llm_scheduler import GenerationCancelled
+
+    fake_llm()  # only for the cache switch and restoring the client
+    set_llm_client(LLMClient(model="fake", host=ollama_server.url))
+    handed_over, error, cancelled = _cancel_while_another_waits(scheduler)
+    assert isinstance(error, GenerationCancelled)
+    assert handed_over <= INTERVAL + SLACK
+    # The fake server only sees the closed socket when a write fails, which is the
+    # second token written after the close
+    assert _wait_for(lambda: ollama_server.aborted >= 1) - cancelled <= 2 * INTERVAL + SLACK
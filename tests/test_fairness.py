@@ -0,0 +1,43 @@
+import time
+
+from bench.fake_llm import FakeOllama
+
+INTERACTIVE_TEXT = "Le système doit permettre de consulter le solde du compte."
+
+
+class StartRecordingOllama(FakeOllama):
+    """FakeOllama remembering when each generation started, by the document it was asked about."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = {}
+
+    def chat(self, model=None, messages=None, stream=False, **kwargs):
+        self.started.setdefault(messages[-1]["content"], time.monotonic())
+        return super().chat(model=model, messages=messages, stream=stream, **kwargs)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_interactive_request_does_not_queue_behind_batch_jobs(api, fake_llm):
+    import backend_api
+    from llm_scheduler import llm_scheduler
+
+    fake = fake_llm(StartRecordingOllama(tokens_per_second=50))  # ~2.5 s per generation
+    assert llm_scheduler.max_active > backend_api.batch_limiter.max_concurrent
+    for i in range(backend_api.batch_limiter.max_concurrent + 2):
+        response = api.post("/jobs", data={"text_content": f"Document {i}. Le système doit répondre."})
+        assert response.status_code == 202
+    _wait_for(lambda: fake.active == backend_api.batch_limiter.max_concurrent)
+
+    sent = time.monotonic()
+    response = api.post("/process-docx/", data={"text_content": INTERACTIVE_TEXT})
+    assert response.status_code == 200
+    started = [t for content, t in fake.started.items() if "solde du compte" in content]
+    assert started and started[0] - sent < 0.5
+
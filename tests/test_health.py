@@ -0,0 +1,68 @@
+import socket
+import time
+
+import pytest
+
+from bench.fake_llm import FakeOllama
+from bench.fake_ollama_server import FakeOllamaServer
+from llm_client import LLMClient, set_llm_client
+
+
+@pytest.fixture
+def server():
+    srv = FakeOllamaServer(fake=FakeOllama(tokens_per_second=0), load_seconds=0.2).start()
+    yield srv
+    srv.stop()
+
+
+@pytest.fixture
+def hung_host():
+    """A server that accepts connections and never answers."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        yield "http://127.0.0.1:%d" % sock.getsockname()[1]
+
+
+def test_ready_once_the_model_is_loaded(server):
+    client = LLMClient(model="fake", host=server.url)
+    assert client.health()["status"] == "warming"
+    assert client.warm_up()
+    report = client.health()
+    assert report["status"] == "ok" and report["loaded"]
+
+
+def test_reachable_is_enough_without_warm_up(server):
+    assert LLMClient(model="fake", host=server.url).health(require_loaded=False)["ready"]
+
+
+def test_unreachable_server_is_an_error():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    report = LLMClient(model="fake", host=f"http://127.0.0.1:{port}").health()
+    assert report["status"] == "error" and not report["ready"]
+
+
+def test_hung_server_fails_within_the_health_timeout(hung_host):
+    client = LLMClient(model="fake", host=hung_host, health_timeout=0.3)
+    start = time.perf_counter()
+    report = client.health()
+    assert time.perf_counter() - start < 2
+    assert report["status"] == "error"
+
+
+def test_health_endpoint_does_not_use_the_worker_pool(api, hung_host, monkeypatch):
+    import llm_client
+    import worker_pool
+
+    previous = llm_client.get_llm_client()
+    set_llm_client(LLMClient(model="fake", host=hung_host, health_timeout=0.3))
+    used = []
+    monkeypatch.setattr(worker_pool._executor, "submit", lambda *args, **kwargs: used.append(args))
+    try:
+        response = api.get("/health")
+    finally:
+        set_llm_client(previous)
+    assert response.status_code == 503
+    assert not used
@@ -0,0 +1,57 @@
+import contextlib
+import io
+import re
+
+import pytest
+
+from bench.corpus import synthetic_markdown
+from bench.fake_word import FakeWordDocument, add_tables_and_fields, word_text_from_markdown
+
+
+class FieldCodesIgnored(FakeWordDocument):
+    """A Word whose TextRetrievalMode has no effect, so the position map does not add up."""
+
+    def _coded(self):
+        return self.text, [m.start() - k for k, m in enumerate(re.finditer("\r\x07", self.text))]
+
+
+@pytest.fixture(scope="module")
+def document():
+    md_text, requirements = synthetic_markdown(10)
+    text, field_codes = add_tables_and_fields(word_text_from_markdown(md_text))
+    assert field_codes and "\x07" in text
+    return text, field_codes, requirements[:60]
+
+
+def _highlight(func, doc, sentences):
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(doc, sentences, [7] * len(sentences))
+    return doc
+
+
+def _wrong(doc, sentences):
+    from sentence_matching import normalize_text
+
+    expected = {normalize_text(sentence) for sentence in sentences}
+    return [doc.Range(s, e).Text for s, e in doc.highlights if normalize_text(doc.Range(s, e).Text) not in expected]
+
+
+@pytest.mark.parametrize("fake", [FakeWordDocument, FieldCodesIgnored])
+def test_batch_highlights_every_sentence_in_tables_and_fields(document, fake):
+    import realTime
+
+    text, field_codes, sentences = document
+    doc = _highlight(realTime.highlight_sentences_batch, fake(text, field_codes=field_codes), sentences)
+    assert len(doc.highlights) == len(sentences)
+    assert _wrong(doc, sentences) == []
+
+
+def test_batch_makes_fewer_com_calls_than_the_find_loop(document):
+    import realTime
+
+    text, field_codes, sentences = document
+    legacy = _highlight(realTime.highlight_sentences_in_doc, FakeWordDocument(text, field_codes=field_codes), sentences)
+    batch = _highlight(realTime.highlight_sentences_batch, FakeWordDocument(text, field_codes=field_codes), sentences)
+    assert len(batch.highlights) == len(legacy.highlights) == len(sentences)
+    # The Range and its HighlightColorIndex per sentence, plus a fixed few for the whole document
+    assert batch.com_calls <= 2 * len(sentences) + 20 < legacy.com_calls
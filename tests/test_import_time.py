@@ -0,0 +1,33 @@
+import os
+import statistics
+
+import pytest
+
+from bench.bench_import_time import DEFERRED, import_times, loaded_modules
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "600"))
+
+
+@pytest.fixture(autouse=True)
+def _repo_root(monkeypatch):
+    # The imports run in fresh interpreters, which find the modules in the working directory
+    monkeypatch.chdir(ROOT)
+
+
+def _packages(module):
+    return {name.split(".")[0] for name in loaded_modules(module)}
+
+
+def test_server_import_is_within_budget():
+    median = statistics.median(import_times("backend_api")["backend_api"][1] / 1000 for _ in range(3))
+    assert median <= IMPORT_BUDGET_MS
+
+
+def test_server_import_defers_heavy_packages():
+    assert not _packages("backend_api") & set(DEFERRED)
+
+
+@pytest.mark.parametrize("module", ["integrated1", "realTime", "batch_extract"])
+def test_core_modules_import_nothing_windows_only(module):
+    assert not _packages(module) & {"win32com", "pythoncom", "tkinter"}
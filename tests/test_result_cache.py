@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from bench.corpus import synthetic_markdown
+from bench.fake_llm import FakeOllama
+from chunking import split_markdown
+
+
+class FlakyOllama(FakeOllama):
+    """FakeOllama whose first ``failures`` chat calls fail."""
+
+    def __init__(self, failures=1, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def chat(self, **kwargs):
+        with self._lock:
+            failing = self.failures > 0
+            self.failures -= failing
+        if failing:
+            self.calls += 1
+            raise ConnectionError("model server went away")
+        return super().chat(**kwargs)
+
+
+@pytest.fixture
+def extract():
+    import integrated1
+    return integrated1.extract_user_stories
+
+
+def test_failed_chunk_is_not_cached_with_the_document(fake_llm, extract):
+    md_text, requirements = synthetic_markdown(4, seed=401)
+    chunks = len(split_markdown(md_text))
+    assert chunks > 1
+    fake = fake_llm(FlakyOllama(failures=1, tokens_per_second=0, extract=True), use_cache=True)
+
+    partial = extract(md_text)["user_stories"]
+    assert fake.calls == chunks
+
+    complete = extract(md_text)["user_stories"]
+    assert fake.calls == chunks + 1  # only the chunk that failed is asked again
+    assert len(complete) > len(partial)
+    assert extract(md_text)["user_stories"] == complete
+    assert fake.calls == chunks + 1
+
+
+def test_chunks_without_stories_are_cached(fake_llm, extract):
+    md_text, _ = synthetic_markdown(4, seed=402, requirements_per_page=0)
+    chunks = len(split_markdown(md_text))
+    fake = fake_llm(tokens_per_second=0, extract=True, use_cache=True)
+
+    assert extract(md_text)["user_stories"] == []
+    assert fake.calls == chunks
+    edited = md_text + "\n\nLe système doit permettre d'exporter les factures.\n"
+    assert len(extract(edited)["user_stories"]) == 1
+    assert fake.calls == chunks + 1
+
+
+def test_unusable_reply_is_not_cached(fake_llm, extract):
+    fake = fake_llm(tokens_per_second=0, use_cache=True)
+    fake.reply = "Je ne sais pas."
+    text = "Le système doit permettre de consulter l'historique des commandes."
+    assert extract(text)["user_stories"] == []
+    assert extract(text)["user_stories"] == []
+    assert fake.calls == 2
+
+
+def test_truncated_reply_is_replayed_but_not_cached(api, fake_llm):
+    fake = fake_llm(tokens_per_second=0, use_cache=True)
+    reply = fake.reply
+    fake.reply = reply[:reply.index("}", reply.index("source_sentence")) + 1]  # first story only
+    text = "Le système doit permettre aux clients de suivre leur livraison."
+    for _ in range(2):
+        body = api.post("/process-docx/", data={"text_content": text}).text
+        assert "event: cache" not in body
+        assert json.loads(body.split("data: ---\n\ndata: ")[1])["user_stories"]
+    assert fake.calls == 2
@@ -0,0 +1,35 @@
+import json
+
+REQUIREMENT = "Le système doit permettre aux clients de créer un compte utilisateur."
+
+
+def _result(body):
+    """The user_stories dict sent after the "---" separator of /process-docx/."""
+    messages = body.split("\n\n")
+    return json.loads(messages[messages.index("data: ---") + 1][len("data: "):])
+
+
+def test_process_docx_calls_the_llm_once(api, fake_llm):
+    fake = fake_llm(tokens_per_second=0)
+    response = api.post("/process-docx/", data={"text_content": REQUIREMENT})
+    assert response.status_code == 200
+    assert fake.calls == 1
+    assert len(_result(response.text)["user_stories"]) == 2
+
+
+def test_process_docx_upload_calls_the_llm_once(api, fake_llm):
+    fake = fake_llm(tokens_per_second=0)
+    with open("temp_testing_paragraph.docx", "rb") as f:
+        response = api.post("/process-docx/", files={"file": ("spec.docx", f)})
+    assert response.status_code == 200
+    assert fake.calls == 1
+    assert _result(response.text)["user_stories"]
+
+
+def test_job_calls_the_llm_once(api, fake_llm):
+    fake = fake_llm(tokens_per_second=0)
+    job = api.post("/jobs", data={"text_content": REQUIREMENT}).json()
+    events = api.get(job["events"]).text  # the stream ends once the job has finished
+    assert "event: result" in events
+    assert api.get(job["result"]).json()["status"] == "done"
+    assert fake.calls == 1
@@ -0,0 +1,61 @@
+import os
+import hashlib
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+# ---------- Configuration ----------
+MAX_UPLOAD_BYTES = int(float(os.environ.get("MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def hash_stream(fileobj, chunk_size=UPLOAD_CHUNK_SIZE):
+    """SHA-256 of a file object read in chunks; the stream is rewound afterwards."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class MaxUploadSizeMiddleware:
+    """Reject request bodies larger than ``max_bytes`` while they are being received.
+
+    A declared Content-Length over the limit is refused before reading
+    anything; chunked bodies are counted as they stream in and aborted with
+    413 as soon as they cross the limit, so an oversized upload is never
+    fully spooled.
+    """
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload larger than {self.max_bytes} bytes"},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload larger than {self.max_bytes} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
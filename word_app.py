@@ -0,0 +1,123 @@
+import os
+import argparse
+import logging
+import win32com.client as win32
+from tkinter import messagebox
+from integrated1 import highlight_targets
+from realTime import WATCH_DEBOUNCE_SECONDS, WATCH_POLL_SECONDS, DocumentWatcher, highlight_sentences_batch
+
+logger = logging.getLogger(__name__)
+
+# Word and dialogs: attaching to a running Word, opening documents, asking the user.
+# The highlighting engine (realTime) and the extraction core (integrated1) do not
+# import this module, so they run on Linux against any object with Word's COM surface.
+
+# ---------- Word application ----------
+def get_word_app():
+    try:
+        word = win32.GetActiveObject("Word.Application")
+        print("[info] Attached to running Word instance.")
+    except Exception:
+        print("[info] No running Word found — launching new Word instance.")
+        word = win32.Dispatch("Word.Application")
+        word.Visible = True
+    return word
+
+def open_or_use_active_doc(word, filename="testing_paragraph.docx"):
+    docs = word.Documents
+    print(f"[info] Word has {docs.Count} document(s) open.")
+    
+    # First, try to open the specified file
+    path = os.path.join(os.getcwd(), filename)
+    if not os.path.exists(path):
+        print(f"[error] File not found at: {path}")
+        raise SystemExit(1)
+        
+    # If there are open documents, ask user what to do
+    if docs.Count > 0:
+        doc = word.ActiveDocument
+        doc_name = getattr(doc, 'Name', '<unknown>')
+        if not messagebox.askyesno("Confirm Document", 
+            f"Use currently open document '{doc_name}'?\n\n" +
+            f"Click 'No' to open '{filename}' instead."):
+            # User clicked No - close current document and open new one
+            print(f"[info] Opening file: {path}")
+            return docs.Open(path)
+        return doc
+    
+    # No open documents - just open the specified file
+    print(f"[info] Opening file: {path}")
+    return docs.Open(path)
+
+
+def open_doc_in_word(file_path):
+    word = win32.gencache.EnsureDispatch("Word.Application")
+    word.Visible = True
+
+    # Normalize path (avoid dialog issue)
+    abs_path = os.path.abspath(file_path)
+
+    # Check if file is already open
+    for doc in word.Documents:
+        if doc.FullName.lower() == abs_path.lower():
+            print(f"[info] Using already open document: {doc.FullName}")
+            return doc
+
+    # Otherwise, open it fresh
+    doc = word.Documents.Open(abs_path)
+    print(f"[info] Opened new document: {doc.FullName}")
+    return doc
+
+
+# ---------- Highlighting stories ----------
+def rehighlight_in_word(docx_path, stories):
+    """Re-highlight sentences inside a Word document."""
+    try:
+        sentences, color_consts = highlight_targets(stories)
+        doc = open_doc_in_word(docx_path)
+        highlight_sentences_batch(doc, sentences, color_consts)
+        return True
+    except Exception as e:
+        logger.error("Word highlighting error: %s", str(e))
+        return False
+
+
+# ---------- Command line ----------
+def main():
+    parser = argparse.ArgumentParser(description="Highlight sentences in a Word document.")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep the highlights up to date while the document is edited (Ctrl+C to stop)")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL_SECONDS, help="seconds between document reads")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help="seconds without edits before highlighting again")
+    args = parser.parse_args()
+    # Example usage (can be removed if not needed)
+    sentences = [
+        "Le système doit permettre aux clients de créer un compte utilisateur.",
+        "Les utilisateurs doivent pouvoir ajouter des produits à leur panier.",
+    ]
+    color_consts = [
+        win32.constants.wdYellow,
+        win32.constants.wdBrightGreen,
+    ]
+    word = get_word_app()
+    doc = open_or_use_active_doc(word, filename="testing_paragraph.docx")
+    print("[info] Starting highlighting...")
+    if args.watch:
+        watcher = DocumentWatcher(doc, sentences, color_consts, debounce_seconds=args.debounce)
+        watcher.start()
+        watcher.watch(poll_seconds=args.poll)
+    else:
+        highlight_sentences_batch(doc, sentences, color_consts)
+    try:
+        doc.Save()
+        print("[info] Document saved.")
+    except Exception as e:
+        print("[warn] Could not save document automatically:", e)
+    print("[done] Finished.")
+    
+    for s in sentences:
+        print(f"[sentence] {repr(s)}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
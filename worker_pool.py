@@ -0,0 +1,104 @@
+import os
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------- Configuration ----------
+# Number of documents processed at the same time (conversion + LLM stream),
+# per limiter: interactive requests and batch jobs each have their own.
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "2"))
+# Number of extra requests allowed to wait for a slot before we answer 429.
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "8"))
+# Threads used for blocking work (MarkItDown, ollama iterator, log writes).
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", str(max(4, MAX_CONCURRENT_JOBS * 4))))
+
+_executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="docx-worker")
+
+_STREAM_DONE = object()
+
+
+class QueueFullError(Exception):
+    """Raised when no slot and no queue place is left for a new job."""
+
+
+# ---------- Offloading helpers ----------
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable in the worker pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, lambda: func(*args, **kwargs))
+
+
+async def iterate_blocking(iterable):
+    """Consume a blocking iterator in the worker pool and yield its items asynchronously."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = False
+
+    def put(item):
+        # The loop may already be closed if the consumer went away during shutdown.
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def pump():
+        try:
+            for item in iterable:
+                if cancelled:
+                    break
+                put(item)
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(iterable, "close", None)
+            if cancelled and close is not None:
+                with contextlib.suppress(Exception):
+                    close()
+            put(_STREAM_DONE)
+
+    loop.run_in_executor(_executor, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The pump notices the flag on its next item and closes the source iterator.
+        cancelled = True
+
+
+# ---------- Admission control ----------
+class JobLimiter:
+    """Bounded concurrency with a bounded waiting queue in front of it."""
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_JOBS, max_queued=MAX_QUEUED_JOBS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._admitted = 0
+
+    @property
+    def admitted(self):
+        return self._admitted
+
+    def admit(self):
+        """Reserve a place (running or queued); raise QueueFullError when full."""
+        if self._admitted >= self.max_concurrent + self.max_queued:
+            raise QueueFullError(
+                f"{self._admitted} jobs already running or queued"
+            )
+        self._admitted += 1
+
+    def release(self):
+        """Give back a place reserved with admit()."""
+        self._admitted -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Wait for a running slot; the admitted place is released on exit."""
+        try:
+            async with self._semaphore:
+                yield
+        finally:
+            self.release()